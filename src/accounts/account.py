@@ -1,31 +1,58 @@
+import copy
 from datetime import date
 from transaction.transaction_states import TransactionState
+from util.money import CENTS_PER_DOLLAR
+from util.money import to_cents
 
 
 class Account:
+    __slots__ = ('_account_balance', '_account_name')
+
+    # Attributes that change while simulating; see get_state/set_state.
+    _state_fields = ('_account_balance',)
+
     def __init__(self, account_name: str) -> None:
         self.reset_balance()
         self.rename(account_name)
 
     def credit(self, amount: float) -> TransactionState:
-        self._account_balance -= amount
-        return TransactionState.TRANSACTION_ACCEPTED
+        return self.credit_cents(to_cents(amount))
 
     def debit(self, amount: float) -> TransactionState:
-        self._account_balance += amount
+        return self.debit_cents(to_cents(amount))
+
+    def credit_cents(self, cents: int) -> TransactionState:
+        self._account_balance -= cents
+        return TransactionState.TRANSACTION_ACCEPTED
+
+    def debit_cents(self, cents: int) -> TransactionState:
+        self._account_balance += cents
         return TransactionState.TRANSACTION_ACCEPTED
 
     def accrue(self, day: date) -> None:
         pass
 
     def get_balance(self) -> float:
+        return self._account_balance / CENTS_PER_DOLLAR
+
+    def get_cents(self) -> int:
         return self._account_balance
 
     def get_name(self):
         return self._account_name
 
     def reset_balance(self):
-        self._account_balance = 0.0
+        self._account_balance = 0
 
     def rename(self, name: str):
         self._account_name = name
+
+    def get_state(self) -> tuple:
+        return tuple(getattr(self, field) for field in self._state_fields)
+
+    def set_state(self, state: tuple) -> None:
+        for field, value in zip(self._state_fields, state):
+            setattr(self, field, value)
+
+    def copy(self):
+        return copy.copy(self)
@@ -0,0 +1,133 @@
+# Closed-form payment schedule of a SimpleLoan, following the same rules
+# as simulating it day by day: interest accrues daily on the balance, each
+# due date bills min(payoff, payment), and the bill is paid the same day.
+# Works in cents with SimpleLoan's rounding; rows are in dollars.
+from datetime import timedelta
+
+from dateutil.relativedelta import relativedelta
+
+from .loan import SimpleLoan
+from util.daterange import parse_date
+from util.money import round_cents
+from util.money import to_cents
+from util.money import to_dollars
+
+
+class AmortizationSchedule:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        # (date, payment, interest, principal, balance) per payment.
+        self.rows = []
+        self.payoff_date = None
+        self.total_interest = 0.0
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame(
+            data=[row[1:] for row in self.rows],
+            columns=['Payment', 'Interest', 'Principal', 'Balance'],
+            index=pd.DatetimeIndex([row[0] for row in self.rows]))
+
+
+def amortize(
+        loan: SimpleLoan,
+        start,
+        extra_payments=(),
+        until=None,
+        max_payments=100000) -> AmortizationSchedule:
+    # Schedule of `loan` from its current state when simulated from
+    # `start`. extra_payments are (date, amount) lump sums paid after that
+    # day's bill, like DailySim.schedule_payment. Stops at payoff, at
+    # `until`, or after max_payments. Without `until`, a loan whose
+    # payment no longer covers its interest, with no extra payments
+    # left, is never paid off: its schedule stops there with no
+    # payoff_date.
+    start = parse_date(start)
+    until = parse_date(until) if until is not None else None
+    extras = sorted((parse_date(day), to_cents(amount))
+                    for day, amount in extra_payments)
+    increment = _get_increment(loan)
+    period_days = loan.get_period_days()
+
+    schedule = AmortizationSchedule(loan.get_name())
+    balance = loan._account_balance
+    interest_due = loan._interest_due
+    due_date = loan._next_due_date
+    last_day = start - timedelta(days=1)
+    payoff = balance + interest_due
+    extra_index = 0
+
+    while payoff > 0 and len(schedule.rows) < max_payments:
+        pay_day = max(due_date, last_day + timedelta(days=1))
+        while extra_index < len(extras) and extras[extra_index][0] < pay_day:
+            day, amount = extras[extra_index]
+            extra_index += 1
+            if day <= last_day or (until is not None and day >= until):
+                continue
+            interest_due += loan._rate * balance * (day - last_day).days
+            last_day = day
+            balance, interest_due = _pay(
+                schedule, day, amount, balance, interest_due)
+            if balance + interest_due <= 0:
+                break
+        payoff = balance + interest_due
+        if payoff <= 0 or (until is not None and pay_day >= until):
+            break
+
+        interest_due += loan._rate * balance * (pay_day - last_day).days
+        payoff = balance + interest_due
+        amount_due = round_cents(payoff) if payoff <= loan._payment \
+            else loan._payment
+        balance, interest_due = _pay(
+            schedule, pay_day, amount_due, balance, interest_due)
+        last_day = pay_day
+        due_date += increment
+
+        while extra_index < len(extras) and extras[extra_index][0] == pay_day:
+            balance, interest_due = _pay(
+                schedule, pay_day, extras[extra_index][1],
+                balance, interest_due)
+            extra_index += 1
+        payoff = balance + interest_due
+        if until is None and extra_index == len(extras) and payoff > 0 \
+                and loan._payment <= loan._rate * balance * period_days:
+            break
+
+    if payoff <= 0 and schedule.rows:
+        schedule.payoff_date = schedule.rows[-1][0]
+    schedule.total_interest = to_dollars(schedule.total_interest)
+    return schedule
+
+
+def get_total_interest(loans, start) -> dict:
+    # Interest each loan costs from `start` at its scheduled payment,
+    # for ranking loans without simulating the chart; infinite for a
+    # loan its payment never pays off.
+    total_interest = {}
+    for loan in loans:
+        schedule = amortize(loan, start)
+        total_interest[loan.get_name()] = schedule.total_interest \
+            if schedule.payoff_date is not None else float('inf')
+    return total_interest
+
+
+def _pay(schedule, day, amount, balance, interest_due):
+    # A full payment as applied by SimpleLoan.debit: the accrued interest
+    # is settled to the cent and the rest of the payment goes to principal.
+    if balance + interest_due <= 0:
+        return balance, interest_due
+    interest = round_cents(interest_due)
+    principal = amount - interest
+    balance -= principal
+    schedule.total_interest += interest
+    schedule.rows.append((day, to_dollars(amount), to_dollars(interest),
+                          to_dollars(principal), to_dollars(balance)))
+    return balance, 0.0
+
+
+def _get_increment(loan: SimpleLoan) -> relativedelta:
+    # Matches SimpleLoan._update_due_date.
+    if loan._payment_timebase == "w":
+        return relativedelta(weeks=loan._payment_frequency)
+    return relativedelta(months=1)
+
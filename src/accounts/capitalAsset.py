@@ -4,6 +4,8 @@ from transaction.transaction_states import TransactionState
 
 
 class DAsset(CheckingAccount):
+    __slots__ = ('_sell_price', '_depreciation_rate')
+
     def __init__(self, name, purchase_price, sell_price, time_years):
         super().__init__(name, purchase_price)
         self._sell_price = sell_price
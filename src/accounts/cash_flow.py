@@ -0,0 +1,165 @@
+# Recurring REVENUE and EXPENSE amounts expanded once over a simulation
+# window, so each day's income and expense totals are array lookups.
+from bisect import bisect_left
+from calendar import monthrange
+from datetime import timedelta
+
+import numpy as np
+
+from util.daterange import parse_date
+from util.money import CENTS_PER_DOLLAR
+
+
+class CashFlowTimeline:
+    # Entries are sorted by day index, then by position in `accounts`;
+    # amounts are whole cents. An account fires on the days
+    # ExpenseRevenueAccount.accrue would: from its next due date, every
+    # time increment, while before its end date.
+    def __init__(self, accounts: list, dates: list, start=0) -> None:
+        self.accounts = list(accounts)
+        self.names = [acnt.get_name() for acnt in self.accounts]
+        self.is_revenue = np.array(
+            [acnt.account_type() == 'REVENUE' for acnt in self.accounts],
+            dtype=bool)
+        self.dates = dates
+        days = len(dates)
+
+        entry_days = []
+        entry_accounts = []
+        entry_cents = []
+        # Per account: day indexes it fires on, its next due date after
+        # the window and its last due date before the window.
+        self._due_days = []
+        self._next_after = []
+        self._last_before = []
+        for k, acnt in enumerate(self.accounts):
+            due_days = []
+            step = _get_step(acnt._time_increment)
+            day = acnt._next_due_date
+            if start < days and day >= dates[start]:
+                while day < acnt._end_date:
+                    day_index = (day - dates[0]).days
+                    if day_index >= days:
+                        break
+                    due_days.append(day_index)
+                    day = step(day)
+            entry_days.extend(due_days)
+            entry_accounts.extend([k] * len(due_days))
+            entry_cents.extend([acnt._amount] * len(due_days))
+            self._due_days.append(due_days)
+            self._next_after.append(day)
+            self._last_before.append(acnt._last_due_date)
+
+        order = np.lexsort((entry_accounts, entry_days))
+        self.entry_days = np.array(entry_days, dtype=np.int64)[order]
+        self.entry_accounts = np.array(entry_accounts, dtype=np.int64)[order]
+        self.entry_cents = np.array(entry_cents, dtype=np.int64)[order]
+        revenue = self.is_revenue[self.entry_accounts]
+        self.income = np.zeros(days, dtype=np.int64)
+        np.add.at(self.income, self.entry_days[revenue],
+                  self.entry_cents[revenue])
+        self.expense = np.zeros(days, dtype=np.int64)
+        np.add.at(self.expense, self.entry_days[~revenue],
+                  self.entry_cents[~revenue])
+        # Python lists for the per-day lookups of the simulation loop.
+        # Entries of day i are [_starts[i], _starts[i + 1]).
+        self._income = self.income.tolist()
+        self._expense = self.expense.tolist()
+        self._starts = np.searchsorted(
+            self.entry_days, np.arange(days + 1)).tolist()
+        self._entry_days = self.entry_days.tolist()
+
+    @classmethod
+    def from_register(cls, register, dates: list, start=0):
+        # Revenue accounts first, then expense accounts, each in chart
+        # order, as get_income and get_expense visit them.
+        return cls(list(register.revenue.values()) +
+                   list(register.expense.values()), dates, start)
+
+    def get_income_cents(self, day_index: int) -> int:
+        return self._income[day_index]
+
+    def get_expense_cents(self, day_index: int) -> int:
+        return self._expense[day_index]
+
+    def has_entries(self, day_index: int) -> bool:
+        return self._starts[day_index] != self._starts[day_index + 1]
+
+    def get_entries(self, day_index: int):
+        # (account positions, cents) of the flows on a day.
+        start = self._starts[day_index]
+        stop = self._starts[day_index + 1]
+        return self.entry_accounts[start:stop], self.entry_cents[start:stop]
+
+    def get_next_day(self, day_index: int):
+        # First day index on or after `day_index` with a flow, or None.
+        i = self._starts[min(day_index, len(self.dates))]
+        if i == len(self._entry_days):
+            return None
+        return self._entry_days[i]
+
+    def sync(self, day_index: int) -> None:
+        # Sets each account's due dates to what daily accrual would have
+        # left after simulating the days before `day_index`.
+        for k, acnt in enumerate(self.accounts):
+            due_days = self._due_days[k]
+            fired = bisect_left(due_days, day_index)
+            acnt.reset_balance()
+            if fired:
+                acnt._last_due_date = self.dates[due_days[fired - 1]]
+            else:
+                acnt._last_due_date = self._last_before[k]
+            if fired < len(due_days):
+                acnt._next_due_date = self.dates[due_days[fired]]
+            else:
+                acnt._next_due_date = self._next_after[k]
+
+    def calendar(self, account=None, start=None, end=None):
+        # DataFrame of the flows of `account` (default: all) dated in
+        # [start, end), in day order.
+        import pandas as pd
+        keep = np.ones(len(self.entry_days), dtype=bool)
+        if account is not None:
+            positions = [k for k, name in enumerate(self.names)
+                         if name == account]
+            keep &= np.isin(self.entry_accounts, positions)
+        if start is not None:
+            keep &= self.entry_days >= self._get_day_index(start)
+        if end is not None:
+            keep &= self.entry_days < self._get_day_index(end)
+
+        accounts = self.entry_accounts[keep]
+        names = np.array(self.names, dtype=object)
+        types = np.where(self.is_revenue, 'REVENUE', 'EXPENSE')
+        days = np.array(self.dates, dtype='datetime64[D]')[
+            self.entry_days[keep]]
+        return pd.DataFrame(
+            data={
+                'Account': names[accounts],
+                'Type': types[accounts],
+                'Amount': self.entry_cents[keep] / CENTS_PER_DOLLAR
+            },
+            index=pd.DatetimeIndex(days, name='Day'))
+
+    def _get_day_index(self, day) -> int:
+        # An empty window has no entries to compare with.
+        if not self.dates:
+            return 0
+        return (parse_date(day) - self.dates[0]).days
+
+
+def _get_step(increment):
+    # Function adding `increment`, a relativedelta of whole months or of
+    # days, to a date the same way relativedelta does, only faster.
+    months = 12 * increment.years + increment.months
+    if not months:
+        delta = timedelta(days=increment.days)
+        return lambda day: day + delta
+
+    def add_months(day):
+        month = day.month - 1 + months
+        year = day.year + month // 12
+        month = month % 12 + 1
+        return day.replace(year=year, month=month,
+                           day=min(day.day, monthrange(year, month)[1]))
+    return add_months
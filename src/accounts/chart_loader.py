@@ -0,0 +1,191 @@
+# Reads and validates a chart of accounts CSV into ChartRow records. The
+# rows of a file are cached by content hash, so repeat runs and sweep
+# workers skip parsing and validation.
+import csv
+import io
+import os
+import pickle
+
+from util.cache import get_cache_dir
+from util.cache import hash_bytes
+from util.cache import read_entry
+from util.cache import write_entry
+from util.daterange import parse_date
+
+COLUMNS = ('Type', 'Name', 'AmountDue', 'NextDate', 'Frequency', 'Timebase',
+           'EndDate', 'Balance', 'Rate')
+# Columns each account type reads; the others may hold anything.
+TYPE_FIELDS = {
+    'REVENUE': ('AmountDue', 'NextDate', 'Frequency', 'Timebase', 'EndDate'),
+    'EXPENSE': ('AmountDue', 'NextDate', 'Frequency', 'Timebase', 'EndDate'),
+    'CASH': ('Balance',),
+    'SAVINGS': ('Rate',),
+    'SIMPLE LOAN': ('AmountDue', 'NextDate', 'Frequency', 'Timebase',
+                    'Balance', 'Rate')
+}
+TIMEBASES = ('m', 'w')
+# Bump when the row layout changes; old cache entries are then ignored.
+ROW_FORMAT = 1
+MAX_REPORTED_ERRORS = 50
+
+
+class ChartRow:
+    # One validated CSV row. Dates are ordinals and amounts dollars, so
+    # a cached chart holds only ints, floats and strings.
+    __slots__ = ('line', 'type', 'name', 'amount_due', 'next_date',
+                 'frequency', 'timebase', 'end_date', 'balance', 'rate')
+
+    def __init__(self, line: int, type: str, name: str) -> None:
+        self.line = line
+        self.type = type
+        self.name = name
+        self.amount_due = None
+        self.next_date = None
+        self.frequency = None
+        self.timebase = None
+        self.end_date = None
+        self.balance = None
+        self.rate = None
+
+    def __getstate__(self):
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def __setstate__(self, state) -> None:
+        for field, value in zip(self.__slots__, state):
+            setattr(self, field, value)
+
+
+def load_chart_rows(path: str, use_cache=True) -> list:
+    # Validated rows of the chart at `path`, in file order. Raises
+    # ValueError listing every invalid row by line number.
+    with open(path, 'rb') as f:
+        content = f.read()
+    if not use_cache:
+        return parse_chart(content, path)
+
+    cache_path = get_cache_dir('charts', hash_bytes(
+        content, b'\0', str(ROW_FORMAT).encode()) + '.pickle')
+    data = read_entry(cache_path)
+    if data is not None:
+        try:
+            return pickle.loads(data)
+        except Exception:
+            # Truncated or from an incompatible version; parse again.
+            pass
+    rows = parse_chart(content, path)
+    write_entry(cache_path, pickle.dumps(rows, pickle.HIGHEST_PROTOCOL))
+    return rows
+
+
+def parse_chart(content: bytes, path='<chart>') -> list:
+    name = os.path.basename(path)
+    try:
+        text = content.decode('utf-8-sig')
+    except UnicodeDecodeError as e:
+        raise ValueError(name + ': not UTF-8 text (' + str(e) + ')')
+    reader = csv.reader(io.StringIO(text, newline=''))
+    header = [column.strip() for column in next(reader, [])]
+    missing = [column for column in COLUMNS if column not in header]
+    if missing:
+        raise ValueError(name + ' line 1: missing column(s) ' +
+                         ', '.join(missing))
+    positions = {column: header.index(column) for column in COLUMNS}
+
+    rows = []
+    errors = []
+    names = {}
+    for fields in reader:
+        fields = [field.strip() for field in fields]
+        if not any(fields):
+            continue
+        line = reader.line_num
+        values = {column: fields[i] if i < len(fields) else ''
+                  for column, i in positions.items()}
+        row_errors = []
+        row = _parse_row(line, values, row_errors)
+        if row is not None and row.name in names:
+            row_errors.append("duplicate Name '" + row.name +
+                              "', first defined on line " +
+                              str(names[row.name]))
+        if row_errors:
+            errors.extend((line, error) for error in row_errors)
+            continue
+        names[row.name] = line
+        rows.append(row)
+
+    if errors:
+        raise ValueError(_format_errors(name, errors))
+    return rows
+
+
+def _parse_row(line: int, values: dict, errors: list):
+    account_type = values['Type']
+    if account_type not in TYPE_FIELDS:
+        errors.append("unknown Type '" + account_type +
+                      "', expected one of " + ', '.join(TYPE_FIELDS))
+        return None
+    if not values['Name']:
+        errors.append('Name is empty')
+        return None
+
+    row = ChartRow(line, account_type, values['Name'])
+    for column in TYPE_FIELDS[account_type]:
+        value = values[column]
+        try:
+            if column in ('AmountDue', 'Balance'):
+                parsed = _parse_dollars(value)
+            elif column in ('NextDate', 'EndDate'):
+                parsed = parse_date(value).toordinal()
+            elif column == 'Frequency':
+                parsed = int(value)
+                if parsed <= 0:
+                    raise ValueError
+            elif column == 'Timebase':
+                parsed = value
+                if parsed not in TIMEBASES:
+                    raise ValueError
+            else:
+                parsed = float(value)
+        except ValueError:
+            errors.append(column + ': ' + _describe(column) + ", got '" +
+                          value + "'")
+            continue
+        setattr(row, _ROW_FIELDS[column], parsed)
+    return row
+
+
+_ROW_FIELDS = {
+    'AmountDue': 'amount_due',
+    'NextDate': 'next_date',
+    'Frequency': 'frequency',
+    'Timebase': 'timebase',
+    'EndDate': 'end_date',
+    'Balance': 'balance',
+    'Rate': 'rate'
+}
+
+
+def _describe(column: str) -> str:
+    if column in ('AmountDue', 'Balance'):
+        return 'expected a dollar amount like $1,234.56'
+    if column in ('NextDate', 'EndDate'):
+        return 'expected a date MM/DD/YYYY'
+    if column == 'Frequency':
+        return 'expected a positive whole number'
+    if column == 'Timebase':
+        return "expected 'm' (months) or 'w' (weeks)"
+    return 'expected a number'
+
+
+def _parse_dollars(value: str) -> float:
+    return float(value.strip('$').replace(',', ''))
+
+
+def _format_errors(name: str, errors: list) -> str:
+    lines = ['{} line {}: {}'.format(name, line, error)
+             for line, error in errors[:MAX_REPORTED_ERRORS]]
+    if len(errors) > MAX_REPORTED_ERRORS:
+        lines.append('... and {} more'.format(
+            len(errors) - MAX_REPORTED_ERRORS))
+    return '{} error(s) in {}:\n'.format(len(errors), name) + \
+        '\n'.join(lines)
@@ -1,71 +1,97 @@
 # Factory for producing a chart of accounts using account and loan objects
-import pandas as pd
+from datetime import date
+
 from .account import Account
 from .loan import SimpleLoan
 from .er import ExpenseRevenueAccount
 from .savings import SavingsAccount
 from .checking import CheckingAccount
+from .chart_loader import ChartRow
+from .chart_loader import load_chart_rows
 
 
 class AccountRegister:
     def __init__(self) -> None:
         self.r = {}
         self.num_loans = 0
+        # Per-type indexes, name -> account in registration order.
+        self.revenue = {}
+        self.expense = {}
+        self.cash = {}
+        self.savings = {}
+        self.loans = {}
+        self.open_loans = {}
 
     def register(self, acnt: Account):
-        self.r[acnt.get_name()] = acnt
-
-    def unregister(self, name: str):
-        self.r.pop(name)
+        name = acnt.get_name()
+        if name in self.r:
+            self.unregister(name)
+        self.r[name] = acnt
 
+        if isinstance(acnt, SimpleLoan):
+            self.loans[name] = acnt
+            self.num_loans += 1
+            if not acnt.is_loan_paid():
+                self.open_loans[name] = acnt
+            acnt.add_paid_listener(self._on_loan_paid)
+        elif isinstance(acnt, ExpenseRevenueAccount):
+            if acnt.account_type() == 'REVENUE':
+                self.revenue[name] = acnt
+            elif acnt.account_type() == 'EXPENSE':
+                self.expense[name] = acnt
+        elif isinstance(acnt, SavingsAccount):
+            self.savings[name] = acnt
+        elif type(acnt) is CheckingAccount:
+            self.cash[name] = acnt
 
-def get_chart_of_accounts(csvFilePath):
-    register = AccountRegister()
-    accounts = pd.read_csv(csvFilePath)
-
-    for index, account in accounts.iterrows():
-        if account['Type'] in ("EXPENSE", "REVENUE"):
-            a = ExpenseRevenueAccount(
-                account['Name'],
-                _convert_dollar_str_to_float(account['AmountDue']),
-                account['Type'],
-                account['NextDate'],
-                account['Timebase'].strip(),
-                int(account['Frequency']),
-                account['EndDate']
-            )
-            register.register(a)
+    def unregister(self, name: str):
+        acnt = self.r.pop(name)
+        for index in (self.revenue, self.expense, self.cash,
+                      self.savings, self.loans, self.open_loans):
+            index.pop(name, None)
+        if isinstance(acnt, SimpleLoan):
+            acnt.remove_paid_listener(self._on_loan_paid)
+            self.num_loans -= 1
 
-        elif account['Type'] == "CASH":
-            register.register(CheckingAccount(
-                account['Name'], _convert_dollar_str_to_float(account['Balance'])))
+    def replace(self, acnt: Account):
+        # Swaps in an account of the same kind, keeping its position.
+        name = acnt.get_name()
+        self.r[name] = acnt
+        for index in (self.revenue, self.expense, self.cash,
+                      self.savings, self.loans, self.open_loans):
+            if name in index:
+                index[name] = acnt
 
-        elif account['Type'] == "SAVINGS":
-            register.register(
-                SavingsAccount(
-                    account['Name'], float(
-                        account['Rate'])))
+    def _on_loan_paid(self, loan: SimpleLoan):
+        self.open_loans.pop(loan.get_name(), None)
 
-        elif account['Type'] == "SIMPLE LOAN":
-            loan = SimpleLoan(
-                account['Name'],
-                _convert_dollar_str_to_float(account['AmountDue']),
-                float(account['Rate']),
-                _convert_dollar_str_to_float(account['Balance']),
-                account['NextDate'],
-                int(account['Frequency']),
-                account['Timebase'].strip()
-            )
-            register.register(loan)
-            register.num_loans += 1
-        else:
-            pass
 
+def get_chart_of_accounts(csvFilePath, use_cache=True):
+    register = AccountRegister()
+    for row in load_chart_rows(csvFilePath, use_cache):
+        register.register(_make_account(row))
     return register
 
 
-def _convert_dollar_str_to_float(dollar_string):
-    dollar_string = dollar_string.strip()
-    dollar_string = dollar_string.strip('$')
-    dollar_string = dollar_string.replace(',', '')
-    return float(dollar_string)
+def _make_account(row: ChartRow) -> Account:
+    if row.type in ('EXPENSE', 'REVENUE'):
+        return ExpenseRevenueAccount(
+            row.name,
+            row.amount_due,
+            row.type,
+            date.fromordinal(row.next_date),
+            row.timebase,
+            row.frequency,
+            date.fromordinal(row.end_date))
+    if row.type == 'CASH':
+        return CheckingAccount(row.name, row.balance)
+    if row.type == 'SAVINGS':
+        return SavingsAccount(row.name, row.rate)
+    return SimpleLoan(
+        row.name,
+        row.amount_due,
+        row.rate,
+        row.balance,
+        date.fromordinal(row.next_date),
+        row.frequency,
+        row.timebase)
@@ -3,15 +3,14 @@ from transaction.transaction_states import TransactionState
 
 
 class CheckingAccount(Account):
+    __slots__ = ()
+
     def __init__(self, name, amount) -> None:
         super().__init__(name)
         super().debit(amount)
 
-    def credit(self, amount: float):
-        transaction_state = TransactionState.TRANSACTION_DECLINED
-        if self._account_balance - amount > 0:
-            super().credit(amount)
-            transaction_state = TransactionState.TRANSACTION_ACCEPTED
-        else:
-            transaction_state = TransactionState.TRANSACTION_DECLINED
-        return transaction_state
+    def credit_cents(self, cents: int) -> TransactionState:
+        if self._account_balance - cents > 0:
+            self._account_balance -= cents
+            return TransactionState.TRANSACTION_ACCEPTED
+        return TransactionState.TRANSACTION_DECLINED
@@ -1,12 +1,18 @@
-from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
 
 from .account import Account
 from transaction.transaction_states import TransactionState
+from util.daterange import parse_date
+from util.money import to_cents
 
 
 class ExpenseRevenueAccount(Account):
+    __slots__ = ('type', '_time_increment', '_next_due_date', '_end_date',
+                 '_last_due_date', '_amount')
+
+    _state_fields = ('_account_balance', '_next_due_date', '_last_due_date')
+
     def __init__(
             self,
             name,
@@ -19,16 +25,15 @@ class ExpenseRevenueAccount(Account):
         super().__init__(name)
         self.type = type
         self._set_time_increment(timebase, frequency)
-        self._next_due_date = datetime.strptime(
-            next_due_date, '%m/%d/%Y').date()
-        self._end_date = datetime.strptime(end_date, '%m/%d/%Y').date()
+        self._next_due_date = parse_date(next_due_date)
+        self._end_date = parse_date(end_date)
         self._last_due_date = None
-        self._amount = amount
+        self._amount = to_cents(amount)
 
     def accrue(self, day):
         if day < self._end_date:
             if day == self._next_due_date:
-                super().debit(self._amount)
+                super().debit_cents(self._amount)
                 self._last_due_date = self._next_due_date
                 self._next_due_date = day + self._time_increment
         else:
@@ -38,8 +43,8 @@ class ExpenseRevenueAccount(Account):
     def account_type(self):
         return self.type
 
-    def debit(self, amount: float) -> TransactionState:
-        return super().credit(amount)
+    def debit_cents(self, cents: int) -> TransactionState:
+        return super().credit_cents(cents)
 
     def _set_time_increment(self, timebase: str, frequency: int):
         if timebase == "m":
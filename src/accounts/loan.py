@@ -1,13 +1,25 @@
-from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
 from .account import Account
 from transaction.transaction_states import TransactionState
 from .constants import PERCENT_TO_DECIMAL
 from .constants import DAYS_PER_YEAR
+from util.daterange import parse_date
+from util.money import CENTS_PER_DOLLAR
+from util.money import round_cents
+from util.money import to_cents
 
 
 class SimpleLoan(Account):
+    # Balance, payment and amount due are whole cents. Interest accrues
+    # in fractional cents and is rounded to a cent when billed or settled.
+    __slots__ = ('_next_due_date', '_payment_timebase', '_payment_frequency',
+                 '_payment', '_cumulative_interest', '_interest_due', '_rate',
+                 '_date', '_amount_due', '_paid_listeners')
+
+    _state_fields = ('_account_balance', '_interest_due', '_amount_due',
+                     '_cumulative_interest', '_next_due_date')
+
     def __init__(self,
                  name: str,
                  payment: float,
@@ -18,20 +30,19 @@ class SimpleLoan(Account):
                  payment_timebase: str) -> None:
 
         super().__init__(name)
-        super().debit(principal)
+        super().debit_cents(to_cents(principal))
 
-        next_due_date = datetime.strptime(
-            first_payment_date, '%m/%d/%Y').date()
-        self._next_due_date = next_due_date
+        self._next_due_date = parse_date(first_payment_date)
         self._payment_timebase = payment_timebase
         self._payment_frequency = payment_freq
-        self._payment = payment
-        self._cumulative_interest = 0.0
-        self._interest_due = 0
+        self._payment = to_cents(payment)
+        self._cumulative_interest = 0
+        self._interest_due = 0.0
 
-        self._rate = rate_in_percent / (PERCENT_TO_DECIMAL * DAYS_PER_YEAR)
+        self.set_rate(rate_in_percent)
         self._date = None
-        self._amount_due = 0.0
+        self._amount_due = 0
+        self._paid_listeners = []
 
     def accrue(self, day) -> None:
 
@@ -42,19 +53,21 @@ class SimpleLoan(Account):
             self._update_amount_due()
             self._update_due_date()
 
-    def debit(self, amount: float) -> TransactionState:
+    def debit_cents(self, cents: int) -> TransactionState:
         # Handle edge cases.
         if self.is_loan_paid():
             return TransactionState.TRANSACTION_DECLINED
 
-        payment_is_a_partial_payment = (amount < self._amount_due)
+        payment_is_a_partial_payment = (cents < self._amount_due)
         if payment_is_a_partial_payment:
-            self._handle_partial_payment(amount)
-            return TransactionState.TRANSACTION_ACCEPTED
-
-        # No Edge Cases. Apply Full Payment.
-        self._apply_full_payment(amount)
+            self._handle_partial_payment(cents)
+        else:
+            # No Edge Cases. Apply Full Payment.
+            self._apply_full_payment(cents)
 
+        if self.is_loan_paid():
+            for listener in self._paid_listeners:
+                listener(self)
         return TransactionState.TRANSACTION_ACCEPTED
 
     def credit(self) -> TransactionState:
@@ -68,48 +81,86 @@ class SimpleLoan(Account):
 
         return transaction_state
 
+    def credit_cents(self, cents: int) -> TransactionState:
+        # Loans can't be the source of a transfer.
+        return TransactionState.TRANSACTION_DECLINED
+
     def get_cumulative_interest(self) -> float:
-        return self._cumulative_interest
+        return self._cumulative_interest / CENTS_PER_DOLLAR
+
+    def get_rate(self) -> float:
+        return self._rate
 
     def get_amt_due(self) -> float:
-        return self._amount_due
+        return self._amount_due / CENTS_PER_DOLLAR
 
     def get_name(self) -> str:
         return super().get_name()
 
     def get_payoff(self) -> float:
-        return self.get_balance() + self._interest_due
+        return (self._account_balance + self._interest_due) \
+            / CENTS_PER_DOLLAR
 
     def is_loan_paid(self) -> bool:
-        return self.get_payoff() <= 0
+        return self._account_balance + self._interest_due <= 0
 
     def is_payment_due(self) -> bool:
         return self._amount_due > 0
 
+    def copy(self):
+        loan = super().copy()
+        loan._paid_listeners = []
+        return loan
+
+    def set_rate(self, rate_in_percent: float) -> None:
+        self._rate = rate_in_percent / (PERCENT_TO_DECIMAL * DAYS_PER_YEAR)
+
+    def add_paid_listener(self, listener) -> None:
+        # listener(loan) is called by the payment that pays the loan off.
+        self._paid_listeners.append(listener)
+
+    def remove_paid_listener(self, listener) -> None:
+        self._paid_listeners.remove(listener)
+
+    def get_next_due_date(self):
+        return self._next_due_date
+
+    def get_period_days(self) -> float:
+        # Average days between due dates.
+        if self._payment_timebase == "w":
+            return 7 * self._payment_frequency
+        return DAYS_PER_YEAR / 12
+
+    def get_daily_interest(self) -> float:
+        return self._rate * self.get_balance()
+
+    def accrue_days(self, days: int) -> None:
+        # Closed form of `days` accruals with no payment coming due.
+        self._interest_due += days * self._rate * self._account_balance
+
 
 # Private Functions
 
 
     def _accrue_interest_due(self) -> None:
-        self._interest_due += self._rate * self.get_balance()
+        self._interest_due += self._rate * self._account_balance
 
-    def _calc_amortized_balance(self, payment: float) -> float:
-        return self._interest_due - payment
+    def _settle_interest(self, payment: int) -> None:
+        interest = round_cents(self._interest_due)
+        self._account_balance += interest - payment
+        self._cumulative_interest += interest
+        self._interest_due = 0.0
 
-    def _handle_partial_payment(self, payment: float) -> None:
+    def _handle_partial_payment(self, payment: int) -> None:
         self._amount_due -= payment
         if self._interest_due > payment and self._interest_due > 0:
             self._cumulative_interest += payment
             self._interest_due -= payment
         else:
-            super().debit(self._calc_amortized_balance(payment))
-            self._cumulative_interest += self._interest_due
-            self._interest_due = 0
-
-    def _apply_full_payment(self, payment: float) -> None:
-        super().debit(self._calc_amortized_balance(payment))
-        self._cumulative_interest += self._interest_due
-        self._interest_due = 0
+            self._settle_interest(payment)
+
+    def _apply_full_payment(self, payment: int) -> None:
+        self._settle_interest(payment)
         self._amount_due = 0
 
     def _update_due_date(self) -> None:
@@ -119,7 +170,8 @@ class SimpleLoan(Account):
             self._next_due_date += relativedelta(months=1)
 
     def _update_amount_due(self) -> None:
-        if self.get_payoff() <= self._payment:
-            self._amount_due = self.get_payoff()
+        payoff = self._account_balance + self._interest_due
+        if payoff <= self._payment:
+            self._amount_due = round_cents(payoff)
         else:
             self._amount_due = self._payment
@@ -0,0 +1,237 @@
+# Struct-of-arrays storage for every SimpleLoan in a chart of accounts.
+import numpy as np
+
+from .loan import SimpleLoan
+from util.money import CENTS_PER_DOLLAR
+
+
+class LoanBook:
+    # Same units as SimpleLoan: whole cents, with interest due in
+    # fractional cents. Whole cents are held in float64 arrays, which is
+    # exact below 2**53 and keeps the daily updates in one dtype.
+    def __init__(self, loans: list) -> None:
+        self.names = [loan.get_name() for loan in loans]
+        self.balance = np.array([loan._account_balance for loan in loans],
+                                dtype=float)
+        self.interest_due = np.array([loan._interest_due for loan in loans],
+                                     dtype=float)
+        self.rate = np.array([loan._rate for loan in loans], dtype=float)
+        self.payment = np.array([loan._payment for loan in loans],
+                                dtype=float)
+        self.amount_due = np.array([loan._amount_due for loan in loans],
+                                   dtype=float)
+        self.cumulative_interest = np.array(
+            [loan._cumulative_interest for loan in loans], dtype=float)
+        self.next_due = np.array([loan._next_due_date for loan in loans],
+                                 dtype='datetime64[D]')
+        # Matches SimpleLoan._update_due_date: weekly loans step by their
+        # frequency in weeks, all others by one calendar month.
+        self._weekly = np.array(
+            [loan._payment_timebase == "w" for loan in loans], dtype=bool)
+        self._weekly_step = np.array(
+            [7 * loan._payment_frequency for loan in loans],
+            dtype='timedelta64[D]')
+        self.views = [BookLoan(self, i, loan) for i, loan in enumerate(loans)]
+
+    @classmethod
+    def from_register(cls, register):
+        # Moves every SimpleLoan in the register into a new book and puts
+        # a BookLoan view in its place.
+        book = cls(list(register.loans.values()))
+        for view in book.views:
+            register.replace(view)
+        return book
+
+    def accrue(self, day) -> None:
+        self.interest_due += self.rate * self.balance
+        due = self.next_due <= np.datetime64(day, 'D')
+        if due.any():
+            self._update_amounts_due(np.flatnonzero(due))
+
+    def accrue_days(self, days: int) -> None:
+        self.interest_due += days * self.rate * self.balance
+
+    def get_payoff(self) -> np.ndarray:
+        return self.balance + self.interest_due
+
+    def get_balances(self, index) -> np.ndarray:
+        # Balances in dollars of the loans at `index`.
+        return self.balance[index] / CENTS_PER_DOLLAR
+
+    def get_next_due_date(self):
+        return self.next_due.min().item()
+
+    def get_states(self) -> list:
+        # SimpleLoan.get_state() of every loan, in book order.
+        return list(zip(
+            self.balance.astype(np.int64).tolist(),
+            self.interest_due.tolist(),
+            self.amount_due.astype(np.int64).tolist(),
+            self.cumulative_interest.astype(np.int64).tolist(),
+            self.next_due.tolist()))
+
+    def get_due(self) -> np.ndarray:
+        # Indexes of open loans with a payment due, in chart order.
+        return np.flatnonzero((self.amount_due > 0) & (self.get_payoff() > 0))
+
+    def pay_due(self, due: np.ndarray) -> float:
+        # Applies the full amount due to each loan in `due`, as
+        # SimpleLoan.debit(get_amt_due()) does, and returns the total in
+        # dollars.
+        payment = self.amount_due[due]
+        interest = _round_cents(self.interest_due[due])
+        self.balance[due] += interest - payment
+        self.cumulative_interest[due] += interest
+        self.interest_due[due] = 0.0
+        self.amount_due[due] = 0.0
+
+        paid = due[self.get_payoff()[due] <= 0]
+        for i in paid:
+            self.views[i].notify_paid()
+        return float(payment.sum()) / CENTS_PER_DOLLAR
+
+    def _update_amounts_due(self, due: np.ndarray) -> None:
+        payoff = self.get_payoff()[due]
+        self.amount_due[due] = np.where(
+            payoff <= self.payment[due], _round_cents(payoff),
+            self.payment[due])
+        weekly = due[self._weekly[due]]
+        self.next_due[weekly] += self._weekly_step[weekly]
+        monthly = due[~self._weekly[due]]
+        if len(monthly):
+            self.next_due[monthly] = _add_month(self.next_due[monthly])
+
+
+class BookLoan(SimpleLoan):
+    # SimpleLoan whose state lives in a LoanBook. The inherited SimpleLoan
+    # methods work unchanged through the properties below; accrual is
+    # done for all loans at once by LoanBook.accrue.
+    __slots__ = ('_book', '_index')
+
+    def __init__(self, book: LoanBook, index: int, loan: SimpleLoan) -> None:
+        self._book = book
+        self._index = index
+        self._account_name = loan.get_name()
+        self._payment_timebase = loan._payment_timebase
+        self._payment_frequency = loan._payment_frequency
+        self._date = loan._date
+        self._paid_listeners = loan._paid_listeners
+
+    def accrue(self, day) -> None:
+        pass
+
+    def copy(self) -> SimpleLoan:
+        # Standalone SimpleLoan with this loan's current state.
+        loan = SimpleLoan.__new__(SimpleLoan)
+        loan._account_name = self._account_name
+        loan._payment_timebase = self._payment_timebase
+        loan._payment_frequency = self._payment_frequency
+        loan._payment = self._payment
+        loan._rate = self._rate
+        loan._date = self._date
+        loan._paid_listeners = []
+        loan.set_state(self.get_state())
+        return loan
+
+    def notify_paid(self) -> None:
+        for listener in self._paid_listeners:
+            listener(self)
+
+    # The getters called every simulated day read the book directly
+    # instead of through one property per field.
+    def get_balance(self) -> float:
+        return self._book.balance.item(self._index) / CENTS_PER_DOLLAR
+
+    def get_cents(self) -> int:
+        return int(self._book.balance.item(self._index))
+
+    def get_amt_due(self) -> float:
+        return self._book.amount_due.item(self._index) / CENTS_PER_DOLLAR
+
+    def get_payoff(self) -> float:
+        book = self._book
+        i = self._index
+        return (book.balance.item(i) + book.interest_due.item(i)) \
+            / CENTS_PER_DOLLAR
+
+    def is_loan_paid(self) -> bool:
+        book = self._book
+        i = self._index
+        return book.balance.item(i) + book.interest_due.item(i) <= 0
+
+    def is_payment_due(self) -> bool:
+        return self._book.amount_due.item(self._index) > 0
+
+    @property
+    def _account_balance(self) -> int:
+        return int(self._book.balance[self._index])
+
+    @_account_balance.setter
+    def _account_balance(self, value: int) -> None:
+        self._book.balance[self._index] = value
+
+    @property
+    def _interest_due(self) -> float:
+        return float(self._book.interest_due[self._index])
+
+    @_interest_due.setter
+    def _interest_due(self, value: float) -> None:
+        self._book.interest_due[self._index] = value
+
+    @property
+    def _amount_due(self) -> int:
+        return int(self._book.amount_due[self._index])
+
+    @_amount_due.setter
+    def _amount_due(self, value: int) -> None:
+        self._book.amount_due[self._index] = value
+
+    @property
+    def _cumulative_interest(self) -> int:
+        return int(self._book.cumulative_interest[self._index])
+
+    @_cumulative_interest.setter
+    def _cumulative_interest(self, value: int) -> None:
+        self._book.cumulative_interest[self._index] = value
+
+    @property
+    def _rate(self) -> float:
+        return float(self._book.rate[self._index])
+
+    @_rate.setter
+    def _rate(self, value: float) -> None:
+        self._book.rate[self._index] = value
+
+    @property
+    def _payment(self) -> int:
+        return int(self._book.payment[self._index])
+
+    @_payment.setter
+    def _payment(self, value: int) -> None:
+        self._book.payment[self._index] = value
+
+    @property
+    def _next_due_date(self):
+        return self._book.next_due[self._index].item()
+
+    @_next_due_date.setter
+    def _next_due_date(self, value) -> None:
+        self._book.next_due[self._index] = value
+
+
+def _round_cents(cents: np.ndarray) -> np.ndarray:
+    # Vector form of util.money.round_cents.
+    return np.floor(cents + 0.5)
+
+
+def _add_month(days: np.ndarray) -> np.ndarray:
+    # Same as adding relativedelta(months=1): keep the day of the month,
+    # clipped to the length of the next month.
+    months = days.astype('datetime64[M]')
+    day_of_month = days - months.astype('datetime64[D]')
+    next_months = months + 1
+    next_month_start = next_months.astype('datetime64[D]')
+    next_month_len = (next_months + 1).astype('datetime64[D]') \
+        - next_month_start
+    return next_month_start \
+        + np.minimum(day_of_month, next_month_len - np.timedelta64(1, 'D'))
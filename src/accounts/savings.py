@@ -1,15 +1,48 @@
+import numpy as np
+
 from .constants import PERCENT_TO_DECIMAL
 from .constants import DAYS_PER_YEAR
 from .checking import CheckingAccount
+from util.money import CENTS_PER_DOLLAR
 
 
 class SavingsAccount(CheckingAccount):
+    __slots__ = ('_rate', '_interest_carry')
+
+    _state_fields = ('_account_balance', '_interest_carry')
+
     def __init__(self, name, rate) -> None:
         super().__init__(name, 0)
+        self.set_rate(rate)
+        # Fraction of a cent of interest earned but not yet posted.
+        self._interest_carry = 0.0
+
+    def set_rate(self, rate) -> None:
         self._rate = rate / (PERCENT_TO_DECIMAL * DAYS_PER_YEAR)
 
     def accrue(self, day):
-        self.debit(self._rate * self.get_balance())
+        # Interest is posted in whole cents; the fraction carries over
+        # and earns interest too, so accrue_days is exact.
+        self._interest_carry += self._rate * (
+            self._account_balance + self._interest_carry)
+        posted = int(self._interest_carry)
+        self._account_balance += posted
+        self._interest_carry -= posted
+
+    def get_balance_path(self, days: int) -> np.ndarray:
+        # Balances in dollars after each of the next `days` accruals.
+        growth = (1.0 + self._rate) ** np.arange(1, days + 1)
+        exact = (self._account_balance + self._interest_carry) * growth
+        return np.trunc(exact) / CENTS_PER_DOLLAR
+
+    def get_unposted_balance(self, days: int) -> float:
+        # Balance in dollars after `days` accruals with the fraction of a
+        # cent kept: never below get_balance_path(days)[days - 1].
+        return (self._account_balance + self._interest_carry) \
+            * (1.0 + self._rate) ** days / CENTS_PER_DOLLAR
 
-    def credit(self, amount: float):
-        return super().credit(amount)
+    def accrue_days(self, days: int) -> None:
+        exact = (self._account_balance + self._interest_carry) \
+            * (1.0 + self._rate) ** days
+        self._account_balance = int(exact)
+        self._interest_carry = exact - self._account_balance
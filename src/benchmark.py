@@ -0,0 +1,236 @@
+# Benchmarks DailySim on synthetic charts of accounts. Loading,
+# simulating and post-processing are timed separately, every engine mode
+# is checked against the daily loop, and timings can be compared with a
+# stored baseline.
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from accounts.chart_of_accounts import get_chart_of_accounts
+from dailysim import DailySim
+from sweep import merge_config
+from util.config import get_config
+from util.synthetic import write_scenario
+
+CASES = {
+    'small': dict(revenue=1, expense=5, loans=2, payments=2, purchases=2,
+                  years=5),
+    'medium': dict(revenue=2, expense=20, loans=8, payments=10,
+                   purchases=10, years=30),
+    'wide': dict(revenue=5, expense=100, loans=50, payments=50,
+                 purchases=20, years=30),
+    'century': dict(revenue=2, expense=10, loans=4, payments=20,
+                    purchases=20, years=100),
+    # Loans paid off early and nothing scheduled: a long steady tail.
+    'retirement': dict(revenue=2, expense=10, loans=4, years=60),
+    # A few monthly flows: most days have nothing due.
+    'sparse': dict(revenue=1, expense=3, loans=1, payments=2, purchases=2,
+                   years=50, weekly=0)
+}
+# Config overrides of each engine mode; 'daily', with loan objects
+# however many loans there are, is the reference.
+MODES = {
+    'daily': {'loan_book': False},
+    'event': {'engine': 'event'},
+    'daily+book': {'loan_book': True},
+    'event+book': {'engine': 'event', 'loan_book': True},
+    'daily+flows': {'cash_flow_timeline': True},
+    'event+flows': {'engine': 'event', 'cash_flow_timeline': True},
+    'daily+steady': {'steady_state': True},
+    'event+steady': {'engine': 'event', 'steady_state': True}
+}
+# Largest difference in any recorded balance, in dollars, for a mode to
+# match the daily loop. The event engine's closed-form savings growth
+# can round a cent differently.
+MATCH_TOLERANCE = 0.01 + 1e-6
+
+
+def run_benchmarks(cases: dict, repeats=3, post_process=True) -> pd.DataFrame:
+    rows = []
+    for name, case in cases.items():
+        with tempfile.TemporaryDirectory() as directory:
+            rows.extend(run_case(
+                name, get_config(write_scenario(directory, **case)),
+                repeats, post_process))
+    return pd.DataFrame(rows)
+
+
+def run_case(name: str, config: dict, repeats: int,
+             post_process: bool) -> list:
+    # Times parsing the CSV, and keeps the chart cache untouched.
+    load_seconds = _best_time(
+        lambda: get_chart_of_accounts(config['accounts'], use_cache=False),
+        repeats)
+    chart = get_chart_of_accounts(config['accounts'], use_cache=False)
+
+    rows = []
+    reference = None
+    for mode, overrides in MODES.items():
+        mode_config = merge_config(config, overrides)
+        seconds = np.inf
+        for _ in range(repeats):
+            ds = DailySim.from_config(mode_config, chart=copy.deepcopy(chart))
+            start = time.perf_counter()
+            ds.simulate()
+            seconds = min(seconds, time.perf_counter() - start)
+
+        if reference is None:
+            reference = ds
+        diff = _get_max_diff(reference, ds)
+        account_days = len(ds.ca.r) * len(ds.sim_results)
+        rows.append({
+            'Case': name,
+            'Mode': mode,
+            'Accounts': len(ds.ca.r),
+            'Days': len(ds.sim_results),
+            'LoadSeconds': load_seconds,
+            'SimulateSeconds': seconds,
+            'PostProcessSeconds': np.nan,
+            'AccountDaysPerSecond': account_days / seconds,
+            'MaxDiff': diff,
+            'Matches': diff <= MATCH_TOLERANCE
+        })
+    if post_process:
+        rows[0]['PostProcessSeconds'] = _time_post_process(reference)
+    return rows
+
+
+def compare_baseline(table: pd.DataFrame, baseline: dict,
+                     threshold: float) -> pd.DataFrame:
+    # Adds the simulate time relative to the baseline, and flags a
+    # regression when it is more than `threshold` slower.
+    table = table.copy()
+    ratios = []
+    for case, mode, seconds in zip(
+            table['Case'], table['Mode'], table['SimulateSeconds']):
+        base = baseline.get(case, {}).get(mode)
+        ratios.append(seconds / base if base else np.nan)
+    table['VsBaseline'] = ratios
+    table['Regression'] = table['VsBaseline'] > 1 + threshold
+    return table
+
+
+def get_baseline(table: pd.DataFrame) -> dict:
+    baseline = {}
+    for case, mode, seconds in zip(
+            table['Case'], table['Mode'], table['SimulateSeconds']):
+        baseline.setdefault(case, {})[mode] = seconds
+    return baseline
+
+
+def load_baseline(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, baseline: dict) -> None:
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+
+
+def main(argv=None) -> int:
+    args = _get_args(argv)
+    cases = {name: CASES[name] for name in args.cases}
+    table = run_benchmarks(cases, args.repeats, not args.no_post_process)
+    baseline = load_baseline(args.baseline)
+    table = compare_baseline(table, baseline, args.threshold)
+    print(table.to_string(index=False))
+    if args.save_baseline:
+        save_baseline(args.baseline, merge_config(
+            baseline, get_baseline(table)))
+
+    failed = False
+    if not table['Matches'].all():
+        print('Engine modes differ from the daily loop.')
+        failed = True
+    if table['Regression'].any():
+        print('Slower than baseline by more than {:.0%}.'.format(
+            args.threshold))
+        failed = True
+    return 1 if failed else 0
+
+
+def _get_max_diff(reference: DailySim, ds: DailySim) -> float:
+    a = reference.sim_results.to_numpy()
+    b = ds.sim_results.to_numpy()
+    if a.shape != b.shape:
+        return np.inf
+    diff = np.abs(a - b).max(initial=0.0)
+    return max(diff, abs(reference.get_cum_int() - ds.get_cum_int()))
+
+
+def _time_post_process(ds: DailySim) -> float:
+    # Times a headless batch run: results and charts saved, nothing shown.
+    from postprocess import post_process
+
+    args = argparse.Namespace(save_results=True, no_plot=False, headless=True)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory, \
+            contextlib.redirect_stdout(io.StringIO()):
+        os.chdir(directory)
+        try:
+            start = time.perf_counter()
+            post_process(args, ds)
+            return time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+
+
+def _best_time(func, repeats: int) -> float:
+    seconds = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        seconds = min(seconds, time.perf_counter() - start)
+    return seconds
+
+
+def _get_args(argv):
+    parser = argparse.ArgumentParser(description='DailySim benchmarks')
+    parser.add_argument(
+        '--cases',
+        nargs='+',
+        choices=list(CASES),
+        default=list(CASES),
+        help='Cases to run.')
+    parser.add_argument(
+        '--repeats',
+        type=int,
+        default=3,
+        help='Runs per timing; the fastest is reported.')
+    parser.add_argument(
+        '--baseline',
+        default='./results/benchmark_baseline.json',
+        help='Baseline timings json path.')
+    parser.add_argument(
+        '--save-baseline',
+        help='Store these timings as the baseline.',
+        action='store_true')
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=0.25,
+        help='Fraction slower than baseline that counts as a regression.')
+    parser.add_argument(
+        '--no-post-process',
+        help='Skip timing post-processing.',
+        action='store_true')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
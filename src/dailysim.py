@@ -1,13 +1,88 @@
-from datetime import datetime as dt
+from bisect import bisect_left
 
-import pandas as pd
+import numpy as np
 
+from accounts.cash_flow import CashFlowTimeline
+from accounts.account import Account
+from accounts.chart_of_accounts import AccountRegister
 from accounts.chart_of_accounts import get_chart_of_accounts
+from accounts.checking import CheckingAccount
 from accounts.er import ExpenseRevenueAccount
 from accounts.loan import SimpleLoan
+from accounts.loan_book import BookLoan
+from accounts.loan_book import LoanBook
+from accounts.savings import SavingsAccount
 from transaction.transaction_states import TransactionState
+from transaction.schedule import Schedule
+from transaction.journal import Journal
 from transaction.transaction import do_transaction
+from transaction.transfer_rules import compile_transfer_rules
+from transaction.transfer_rules import get_default_rules
+from transaction.transfer_rules import get_fallback_accounts
+from util.aggregators import Aggregator
+from util.aggregators import make_aggregator
 from util.daterange import get_date_range
+from util.daterange import parse_date
+from util.money import CENTS_PER_DOLLAR
+from util.profiler import SimProfile
+from util.recorder import ResultRecorder
+from util.recorder import get_days
+from util.recorder import get_sampled_days
+
+# 'event' solves quiet days in closed form. It only pays off when most
+# days are quiet, and otherwise runs the daily loop; see _iter_steps.
+ENGINES = ('daily', 'event')
+# Days of a steady tail whose balances simulate_iter builds at once.
+STEADY_CHUNK_DAYS = 1024
+# Shortest quiet span the event engine solves in closed form.
+MIN_QUIET_DAYS = 3
+# Share of days in quiet spans below which the event engine costs more
+# than it saves, judged from the next QUIET_SAMPLE_DAYS.
+MIN_QUIET_SHARE = 0.5
+QUIET_SAMPLE_DAYS = 366
+# Loans from which DailySim keeps them in a LoanBook by default.
+LOAN_BOOK_MIN_LOANS = 64
+CHGF_MIN = 1000
+# Journal payee of scheduled purchases, which pay into no account.
+PURCHASES = 'Purchases'
+# Methods timed by enable_profile().
+PROFILED_PHASES = (
+    'simulate',
+    'accrue_accounts',
+    'get_income',
+    'get_expense',
+    '_pay_loans',
+    '_pay_book_loans',
+    'execute_scheduled_payments',
+    'execute_scheduled_expenses',
+    'do_transfers',
+    '_get_recorded_balances',
+    '_get_days_to_event',
+    '_get_quiet_span',
+    '_get_quiet_balances')
+
+
+class SimSnapshot:
+    # State of a DailySim before simulating day `day_index`. See
+    # DailySim.snapshot and DailySim.fork.
+    def __init__(
+            self,
+            day_index: int,
+            day,
+            accounts: dict,
+            payments: list,
+            expenses: list,
+            piano_sold: bool,
+            payoff_dates: dict,
+            results) -> None:
+        self.day_index = day_index
+        self.day = day
+        self.accounts = accounts
+        self.payments = payments
+        self.expenses = expenses
+        self.piano_sold = piano_sold
+        self.payoff_dates = payoff_dates
+        self.results = results
 
 
 class DailySim:
@@ -17,100 +92,896 @@ class DailySim:
             sdate: str,
             edate: str,
             fast_payoff=False,
-            max_chgf=7500.0
+            max_chgf=7500.0,
+            engine='daily',
+            record_accounts=None,
+            record_every=1,
+            loan_book=None,
+            chart=None,
+            journal=False,
+            journal_max_entries=None,
+            cash_flow_timeline=False,
+            steady_state=False
     ) -> None:
-        self.ca = get_chart_of_accounts(accountCSVPath)
+        if engine not in ENGINES:
+            raise ValueError("Unknown engine: " + str(engine))
+        if chart is None:
+            chart = get_chart_of_accounts(accountCSVPath)
+        self.ca = chart
+        self._account_csv_path = accountCSVPath
+        self._loan_book = None
+        self._accrued = list(self.ca.r.values())
+        # None picks the book for charts with many loans; below that the
+        # array overhead costs more than looping over loan objects.
+        if loan_book is None:
+            loan_book = len(self.ca.loans) >= LOAN_BOOK_MIN_LOANS
+        if loan_book:
+            self._loan_book = LoanBook.from_register(self.ca)
+            self._accrued = [acnt for acnt in self.ca.r.values()
+                             if not isinstance(acnt, BookLoan)]
+        # Revenue and expense accounts are driven by the timeline, which
+        # is built when the simulation starts.
+        self._cash_flow_timeline = cash_flow_timeline
+        self._cash_flow = None
+        if cash_flow_timeline:
+            flows = set(self.ca.revenue) | set(self.ca.expense)
+            self._accrued = [acnt for acnt in self._accrued
+                             if acnt.get_name() not in flows]
+        # Once steady, the rest of the run is solved by SteadyTail.
+        self._steady_state = steady_state
+        # Without a timeline, the days REVENUE and EXPENSE accounts come
+        # due, for looking up events; see _get_flow_days.
+        self._flow_days = None
+        # Earliest loan due date, kept by the event engine.
+        self._loans_due = None
         self.sdate = sdate
         self.edate = edate
-        self.sim_results = []
-        self._scheduled_payments = []
-        self._scheduled_expenses = []
+        self._sim_results = None
+        self._scheduled_payments = Schedule()
+        self._scheduled_expenses = Schedule()
         self._fast_payoff = fast_payoff
+        self._payoff_order = None
+        self._fgif_reserve = 0.0
+        self._payoff_start = None
         self._piano_sold = False
         self._max_chgf = max_chgf
+        # Compiled from the transfer rules when the simulation starts.
+        self._transfer_rules = None
+        self._expense_fallback = ['FGIF']
+        self._transfer_ops = None
+        self._fallback_accounts = None
+        self._chgf = self.ca.r.get('CHGF')
+        self._fgif = self.ca.r.get('FGIF')
+        self._engine = engine
+        self._record_accounts = record_accounts
+        self._record_every = record_every
+        self.recorder = None
+        self.payoff_dates = {}
+        self._day = None
+        self._day_index = 0
+        self._simulation_dates = None
+        # Transfers go through the journal when it is enabled.
+        self.journal = None
+        self._do_transaction = do_transaction
+        if journal:
+            self.journal = Journal(journal_max_entries)
+            self._do_transaction = self.journal.do_transaction
+        self.profile = None
+        self.aggregators = []
+        self._watched = []
+        for loan in self.ca.loans.values():
+            loan.add_paid_listener(self._on_loan_paid)
+
+    @classmethod
+    def from_config(cls, config: dict, chart=None):
+        ds = cls(
+            config['accounts'],
+            config['start_date'],
+            config['end_date'],
+            fast_payoff=config['fast_payoff_enabled'],
+            max_chgf=config['max_checking_balance'],
+            engine=config.get('engine', 'daily'),
+            record_accounts=config.get('record_accounts'),
+            record_every=config.get('record_every', 1),
+            loan_book=config.get('loan_book'),
+            chart=chart,
+            journal=config.get('journal', False),
+            journal_max_entries=config.get('journal_max_entries'),
+            cash_flow_timeline=config.get('cash_flow_timeline', False),
+            steady_state=config.get('steady_state', False)
+        )
+        ds.apply_overrides(config)
+        for spec in config.get('aggregators') or []:
+            ds.add_aggregator(make_aggregator(spec))
+        return ds
+
+    def apply_overrides(self, overrides: dict) -> None:
+        # Config style overrides. 'payments' and 'purchases' entries are
+        # added to the schedules.
+        if 'fast_payoff_enabled' in overrides:
+            self._fast_payoff = overrides['fast_payoff_enabled']
+        if 'max_checking_balance' in overrides:
+            self._max_chgf = overrides['max_checking_balance']
+            self._transfer_ops = None
+        if 'transfer_rules' in overrides:
+            self._transfer_rules = overrides['transfer_rules']
+            self._transfer_ops = None
+        if 'expense_fallback' in overrides:
+            self._expense_fallback = list(overrides['expense_fallback'])
+            self._transfer_ops = None
+        if 'payoff_order' in overrides:
+            self.set_payoff_order(overrides['payoff_order'])
+        if 'fgif_reserve' in overrides:
+            self._fgif_reserve = overrides['fgif_reserve']
+        if 'payoff_start' in overrides:
+            self._payoff_start = None
+            if overrides['payoff_start'] is not None:
+                self._payoff_start = parse_date(overrides['payoff_start'])
+        if 'payments' in overrides:
+            self.schedule_payments(overrides['payments'].values())
+        if 'purchases' in overrides:
+            self.schedule_expenses(overrides['purchases'].values())
+        for name, rate in overrides.get('rates', {}).items():
+            self.ca.r[name].set_rate(rate)
+
+    def set_payoff_order(self, order) -> None:
+        # Order in which fast payoff targets open loans: a list of loan
+        # names, 'avalanche' (highest rate first), 'snowball' (smallest
+        # payoff first) or None for chart order.
+        loans = list(self.ca.loans.values())
+        if order == 'avalanche':
+            loans.sort(key=lambda loan: -loan.get_rate())
+            order = [loan.get_name() for loan in loans]
+        elif order == 'snowball':
+            loans.sort(key=lambda loan: loan.get_payoff())
+            order = [loan.get_name() for loan in loans]
+        elif order is not None:
+            for name in order:
+                if name not in self.ca.loans:
+                    raise ValueError("Unknown loan in payoff order: " + name)
+        self._payoff_order = order
+
+    def enable_profile(self) -> SimProfile:
+        # Times the phases of each simulated day and counts transfers from
+        # here on. The timed methods are replaced on this instance only.
+        if self.profile is None:
+            self.profile = SimProfile()
+            for phase in PROFILED_PHASES:
+                setattr(self, phase,
+                        self.profile.timed(phase, getattr(self, phase)))
+            self._do_transaction = self.profile.counted(self._do_transaction)
+            self._transfer_ops = None
+            self.profile.counters.setdefault('fgif_fallbacks', 0)
+        return self.profile
+
+    def add_aggregator(self, aggregator: Aggregator) -> Aggregator:
+        # Updates `aggregator` with every day simulated from here on.
+        for name in aggregator.accounts:
+            if name not in self.ca.r:
+                raise ValueError("Unknown account to aggregate: " + name)
+            if name in self.ca.revenue or name in self.ca.expense:
+                raise ValueError(
+                    "Aggregators see revenue and expense accounts only "
+                    "through the day's income and expense: " + name)
+        watched = [acnt.get_name() for acnt in self._watched]
+        for name in aggregator.accounts:
+            if name not in watched:
+                watched.append(name)
+                self._watched.append(self.ca.r[name])
+        aggregator.columns = [watched.index(name)
+                              for name in aggregator.accounts]
+        self.aggregators.append(aggregator)
+        return aggregator
+
+    def get_aggregates(self) -> dict:
+        aggregates = {}
+        for aggregator in self.aggregators:
+            aggregates.update(aggregator.result())
+        return aggregates
+
+    def get_milestones(self) -> list:
+        # (day, text) of every aggregator milestone so far, by day.
+        return sorted((milestone for aggregator in self.aggregators
+                       for milestone in aggregator.milestones),
+                      key=lambda milestone: milestone[0])
+
+    def is_recording(self) -> bool:
+        # False when record_every is None: no daily table is kept.
+        return self._record_every is not None
+
+    def record_into(self, out) -> None:
+        # Records the daily results of the coming run into `out`, an
+        # array of (get_recorded_days(), Income, Expense and recorded
+        # accounts) such as a ScenarioStore slice, instead of a new one.
+        if not self.is_recording():
+            raise ValueError("record_every is None: nothing to record")
+        self.recorder = ResultRecorder(
+            self._start_simulation(), self.get_recorded_accounts(),
+            self._record_every, out=out)
+        self._sim_results = None
+
+    @property
+    def sim_results(self):
+        # DataFrame of the recorded days simulated so far.
+        if self.recorder is None:
+            return []
+        if self._sim_results is None:
+            self._sim_results = self.recorder.to_frame(self._day_index)
+        return self._sim_results
+
+    def simulate(self, until=None) -> None:
+        # Simulates from the current day up to, not including, `until`
+        # (default: the end date). Can be called again to continue.
+        simulation_dates = self._start_simulation()
+        if self.recorder is None and self.is_recording():
+            self.recorder = ResultRecorder(
+                simulation_dates, self.get_recorded_accounts(),
+                self._record_every)
+        recorder = self.recorder
+
+        def is_recorded(day_index):
+            return recorder is not None and recorder.row_of(day_index) >= 0
+
+        steps = self._iter_steps(
+            simulation_dates, is_recorded, self._get_stop_index(until))
+        for day_index, span, income, expense, balances in steps:
+            if recorder is None:
+                continue
+            if span is None:
+                if balances is not None:
+                    recorder.record(
+                        recorder.row_of(day_index), income, expense, balances)
+                continue
+            offsets, rows = recorder.rows_between(day_index, day_index + span)
+            if not len(offsets):
+                continue
+            if balances is None:
+                recorder.record_rows(
+                    rows, 0.0, 0.0, self._get_quiet_balances(span, offsets))
+            else:
+                recorder.record_rows(
+                    rows, income[offsets], expense[offsets],
+                    balances.get_balances(self._recorded_accounts, offsets))
+        if self._cash_flow is not None:
+            self._cash_flow.sync(self._day_index)
+        # Built on first use; batch runs may never need the DataFrame.
+        self._sim_results = None
+
+    def simulate_iter(self, until=None):
+        # Yields (day, income, expense, balances) as they are computed for
+        # each simulated day that sim_results has a row for, or for every
+        # day when record_every is None. Balances follow
+        # get_recorded_accounts().
+        simulation_dates = self._start_simulation()
+        recorded = np.ones(len(simulation_dates), dtype=bool)
+        if self._record_every not in (None, 1):
+            recorded[:] = False
+            recorded[get_sampled_days(
+                simulation_dates, self._record_every)] = True
+        recorded_days = recorded.tolist()
+
+        def is_recorded(day_index):
+            return recorded_days[day_index]
+
+        steps = self._iter_steps(
+            simulation_dates, is_recorded, self._get_stop_index(until))
+        for day_index, span, income, expense, balances in steps:
+            if span is None:
+                if balances is not None:
+                    yield (simulation_dates[day_index], income, expense,
+                           np.asarray(balances, dtype=float))
+                continue
+            offsets = np.flatnonzero(recorded[day_index:day_index + span])
+            if balances is None:
+                quiet = self._get_quiet_balances(span, offsets)
+                for offset, row in zip(offsets.tolist(), quiet):
+                    yield (simulation_dates[day_index + offset], 0.0, 0.0,
+                           row)
+                continue
+            # A steady tail, in chunks of recorded days.
+            for chunk in range(0, len(offsets), STEADY_CHUNK_DAYS):
+                chunk_offsets = offsets[chunk:chunk + STEADY_CHUNK_DAYS]
+                rows = balances.get_balances(
+                    self._recorded_accounts, chunk_offsets)
+                for offset, row in zip(chunk_offsets.tolist(), rows):
+                    yield (simulation_dates[day_index + offset],
+                           float(income[offset]), float(expense[offset]), row)
+        if self._cash_flow is not None:
+            self._cash_flow.sync(self._day_index)
+
+    def snapshot(self, results=True) -> SimSnapshot:
+        if self._cash_flow is not None:
+            self._cash_flow.sync(self._day_index)
+        if not results:
+            results = None
+        elif self.recorder is None:
+            results = None
+        else:
+            rows = self.recorder.rows_before(self._day_index)
+            results = self.recorder.data[:rows].copy()
+        book_states = {}
+        if self._loan_book is not None:
+            book_states = dict(zip(self._loan_book.names,
+                                   self._loan_book.get_states()))
+        return SimSnapshot(
+            self._day_index,
+            self._day,
+            {name: book_states[name] if name in book_states
+             else acnt.get_state() for name, acnt in self.ca.r.items()},
+            list(self._scheduled_payments),
+            list(self._scheduled_expenses),
+            self._piano_sold,
+            dict(self.payoff_dates),
+            results)
+
+    def fork(self, snapshot: SimSnapshot, overrides=None):
+        # New DailySim that continues from `snapshot`, which must have been
+        # taken from this simulation or another fork of it. Aggregators
+        # are not carried over.
+        register = AccountRegister()
+        for name, acnt in self.ca.r.items():
+            clone = acnt.copy()
+            clone.set_state(snapshot.accounts[name])
+            register.register(clone)
+        journal_max_entries = None
+        if self.journal is not None:
+            journal_max_entries = self.journal.max_entries
+
+        ds = DailySim(
+            self._account_csv_path,
+            self.sdate,
+            self.edate,
+            fast_payoff=self._fast_payoff,
+            max_chgf=self._max_chgf,
+            engine=self._engine,
+            record_accounts=self._record_accounts,
+            record_every=self._record_every,
+            loan_book=self._loan_book is not None,
+            chart=register,
+            journal=self.journal is not None,
+            journal_max_entries=journal_max_entries,
+            cash_flow_timeline=self._cash_flow_timeline,
+            steady_state=self._steady_state)
+        ds._payoff_order = self._payoff_order
+        ds._transfer_rules = self._transfer_rules
+        ds._expense_fallback = self._expense_fallback
+        ds._fgif_reserve = self._fgif_reserve
+        ds._payoff_start = self._payoff_start
+        ds._day_index = snapshot.day_index
+        ds._day = snapshot.day
+        ds._scheduled_payments.extend(snapshot.payments)
+        ds._scheduled_expenses.extend(snapshot.expenses)
+        ds._piano_sold = snapshot.piano_sold
+        ds.payoff_dates = dict(snapshot.payoff_dates)
+        if snapshot.results is not None:
+            ds.recorder = ResultRecorder(
+                ds._start_simulation(), ds.get_recorded_accounts(),
+                ds._record_every)
+            ds.recorder.data[:len(snapshot.results)] = snapshot.results
+        if overrides:
+            ds.apply_overrides(overrides)
+        return ds
+
+    def get_cash_flow(self) -> CashFlowTimeline:
+        # Revenue and expense flows from the current day to the end date.
+        if self._cash_flow is not None:
+            return self._cash_flow
+        dates = self._simulation_dates
+        if dates is None:
+            dates = get_date_range(self.sdate, self.edate)
+        return CashFlowTimeline.from_register(self.ca, dates, self._day_index)
+
+    def get_dates(self) -> list:
+        # Every simulated day, from the start date up to the end date.
+        return self._start_simulation()
+
+    def get_monte_carlo(self, spec: dict):
+        # Monte Carlo run of the rest of this simulation from its current
+        # state, drawn as `spec` (a config's monte_carlo section) says.
+        # Imported here so that plain runs never load it.
+        from monte_carlo import MonteCarlo
+        if self._transfer_rules is not None \
+                or self._expense_fallback != ['FGIF']:
+            raise ValueError("Monte Carlo runs support the built-in CHGF "
+                             "and FGIF sweep only")
+        return MonteCarlo(
+            self.ca, self._start_simulation(), self._day_index, spec,
+            list(self._scheduled_payments), list(self._scheduled_expenses),
+            self._max_chgf, CHGF_MIN, self._fast_payoff, self._payoff_order,
+            self._fgif_reserve, self._payoff_start)
+
+    def get_recorded_days(self) -> np.ndarray:
+        # Days that get a row of results, as datetime64[D].
+        dates = self._start_simulation()
+        return get_days(dates)[get_sampled_days(dates, self._record_every)]
+
+    def get_recorded_accounts(self) -> list:
+        if self._record_accounts is None:
+            return list(self.ca.r.keys())
+        return list(self._record_accounts)
+
+    def _start_simulation(self) -> list:
+        record_accounts = self.get_recorded_accounts()
+        for name in record_accounts:
+            if name not in self.ca.r:
+                raise ValueError("Unknown account to record: " + str(name))
+        if self._simulation_dates is None:
+            self._simulation_dates = get_date_range(self.sdate, self.edate)
+        if self._cash_flow_timeline and self._cash_flow is None:
+            self._cash_flow = CashFlowTimeline.from_register(
+                self.ca, self._simulation_dates, self._day_index)
+        self._set_recorded_accounts(record_accounts)
+        if self._transfer_ops is None:
+            self._compile_transfers()
+        return self._simulation_dates
+
+    def _compile_transfers(self) -> None:
+        rules = self._transfer_rules
+        if rules is None:
+            rules = get_default_rules(self._max_chgf, CHGF_MIN)
+        self._transfer_ops = compile_transfer_rules(
+            rules, self.ca, self._do_transaction)
+        self._fallback_accounts = get_fallback_accounts(
+            self._expense_fallback, self.ca)
+
+    def _get_stop_index(self, until) -> int:
+        if until is None:
+            return len(self._simulation_dates)
+        stop = bisect_left(self._simulation_dates, parse_date(until))
+        return max(stop, self._day_index)
+
+    def _iter_steps(self, simulation_dates, is_recorded, stop: int):
+        # Yields (day_index, None, income, expense, balances) for each
+        # stepped day, with balances None when is_recorded(day_index) is
+        # false, (day_index, span, 0, 0, None) for each quiet span of the
+        # event engine and (day_index, span, incomes, expenses, tail) for
+        # a SteadyTail. Spans are advanced only after they have been
+        # yielded so their balances can be read from the start state.
+        if self._engine == 'event' and self._supports_event_engine() \
+                and self._get_quiet_share(stop) >= MIN_QUIET_SHARE:
+            return self._iter_events(simulation_dates, is_recorded, stop)
+        return self._iter_daily(simulation_dates, is_recorded, stop)
+
+    def _get_quiet_share(self, stop: int) -> float:
+        # Estimated share of the days from the current one, up to `stop`
+        # and at most QUIET_SAMPLE_DAYS, in gaps of MIN_QUIET_DAYS or more
+        # between days on which a flow, scheduled item or loan payment
+        # comes due. Loans are taken to stay open.
+        start = self._day_index
+        stop = min(stop, start + QUIET_SAMPLE_DAYS)
+        if stop <= start:
+            return 0.0
+        dates = self._simulation_dates
+        flows = self._cash_flow
+        if flows is None:
+            flows = self._flow_days
+        if flows is None:
+            flows = CashFlowTimeline.from_register(
+                self.ca, dates[:stop], start)
+        due = np.zeros(stop - start + 1, dtype=bool)
+        due[-1] = True
+        days = flows.entry_days
+        due[days[(days >= start) & (days < stop)] - start] = True
+        for schedule in (self._scheduled_payments, self._scheduled_expenses):
+            for day, _ in schedule:
+                day_index = (day - dates[0]).days
+                if start <= day_index < stop:
+                    due[day_index - start] = True
+        for loan in self.ca.open_loans.values():
+            first = max((loan.get_next_due_date() - dates[0]).days, start)
+            days = np.arange(first, stop, loan.get_period_days())
+            due[days.astype(np.int64) - start] = True
+        gaps = np.diff(np.flatnonzero(due), prepend=-1) - 1
+        return gaps[gaps >= MIN_QUIET_DAYS].sum() / (stop - start)
+
+    def _iter_daily(self, simulation_dates, is_recorded, stop: int):
+        while self._day_index < stop:
+            day_index = self._day_index
+            tail = self._get_steady_tail(stop)
+            if tail is not None:
+                yield day_index, tail.days, tail.get_income(), \
+                    tail.get_expense(), tail
+                self._finish_steady_tail(tail)
+                continue
+            step = self._step(
+                day_index, simulation_dates[day_index],
+                is_recorded(day_index))
+            self._day_index = day_index + 1
+            yield step
+
+    def _iter_events(self, simulation_dates, is_recorded, stop: int):
+        # Steps only the days on which something comes due and fills the
+        # quiet days in between with closed-form accrual. Days before
+        # step_until are stepped without looking for a quiet span: the
+        # day after a span has something due, and a span shorter than
+        # MIN_QUIET_DAYS costs more to solve than to step.
+        step_until = self._day_index
+        self._loans_due = None
+        while self._day_index < stop:
+            i = self._day_index
+            day = simulation_dates[i]
+            tail = self._get_steady_tail(stop)
+            if tail is not None:
+                yield i, tail.days, tail.get_income(), tail.get_expense(), \
+                    tail
+                self._finish_steady_tail(tail)
+                continue
+            span = 0
+            if i >= step_until:
+                span = self._get_days_to_event(day, stop - i)
+                if span >= MIN_QUIET_DAYS:
+                    span = self._get_quiet_span(day, span)
+                step_until = i + span + 1
+                if span < MIN_QUIET_DAYS:
+                    span = 0
+            if span == 0:
+                step = self._step(i, day, is_recorded(i))
+                self._day_index = i + 1
+                yield step
+                continue
+
+            yield i, span, 0.0, 0.0, None
+            if self.aggregators:
+                self._update_quiet_aggregators(i, span)
+            for acnt in self.ca.savings.values():
+                acnt.accrue_days(span)
+            if self._loan_book is not None:
+                self._loan_book.accrue_days(span)
+            else:
+                for loan in self.ca.loans.values():
+                    loan.accrue_days(span)
+            self._day_index = i + span
+
+    def _get_steady_tail(self, stop: int):
+        # SteadyTail from the current day when every loan is paid off and
+        # nothing more is scheduled, or None.
+        # Only the built-in sweep has a closed form.
+        if not self._steady_state or self.ca.open_loans \
+                or self._transfer_rules is not None:
+            return None
+        day_index = self._day_index
+        day = self._simulation_dates[day_index]
+        for schedule in (self._scheduled_payments, self._scheduled_expenses):
+            if schedule.next_date(day) is not None:
+                return None
+        if self.journal is not None or not self._supports_event_engine():
+            return None
+        flows = self._cash_flow
+        if flows is None:
+            for acnt in self._get_er_accounts('REVENUE'):
+                if acnt.get_cents():
+                    return None
+            for acnt in self._get_er_accounts('EXPENSE'):
+                if acnt.get_cents():
+                    return None
+            flows = self._get_flow_days()
+        from steady_state import SteadyTail
+        tail = SteadyTail(self.ca, flows, self._simulation_dates, day_index,
+                          stop, self._max_chgf, CHGF_MIN)
+        if tail.days == 0:
+            return None
+        return tail
+
+    def _finish_steady_tail(self, tail) -> None:
+        if self.aggregators:
+            self._update_steady_aggregators(tail)
+        tail.apply()
+        self._accrue_paid_loans(tail.start, tail.stop)
+        self._day_index = tail.stop
+        self._day = self._simulation_dates[tail.stop - 1]
+
+    def _accrue_paid_loans(self, start: int, stop: int) -> None:
+        # Daily accrual of paid off loans over days [start, stop): their
+        # due dates move on and any leftover balance accrues interest.
+        dates = self._simulation_dates
+        if self._loan_book is not None:
+            loans = [self._loan_book] if self._loan_book.names else []
+        else:
+            loans = list(self.ca.loans.values())
+        for loan in loans:
+            day_index = start
+            while day_index < stop:
+                due_index = max(
+                    (loan.get_next_due_date() - dates[0]).days, day_index)
+                if due_index >= stop:
+                    loan.accrue_days(stop - day_index)
+                    break
+                loan.accrue_days(due_index - day_index)
+                loan.accrue(dates[due_index])
+                day_index = due_index + 1
 
-    def simulate(self) -> None:
-        simulation_dates = get_date_range(self.sdate, self.edate)
-        for day in simulation_dates:
-            row = []
-            self.accrue_accounts(day)
-            for acnt in self.ca.r.values():
-                row.append(round(acnt.get_balance(), 2))
-            income = self.get_income(day)
-            expense = self.get_expense(day)
-
-            self.do_transfers(day)
-            row.insert(0, round(income, 2))
-            row.insert(1, round(expense, 2))
-            self.sim_results.append(row)
-
-        header = ['Income', 'Expense']
-        header.extend(list(self.ca.r.keys()))
-        self.sim_results = pd.DataFrame(
-            data=self.sim_results, columns=header, index=simulation_dates)
+    def _update_steady_aggregators(self, tail) -> None:
+        days = self._simulation_dates[tail.start:tail.stop]
+        watched = tail.get_balances(self._watched, np.arange(tail.days))
+        income = tail.get_income()
+        expense = tail.get_expense()
+        quiet = 0
+        for offset in tail.get_flow_offsets() + [tail.days]:
+            for aggregator in self.aggregators:
+                if offset > quiet:
+                    aggregator.update_quiet(
+                        days[quiet:offset], watched[quiet:offset])
+                if offset < tail.days:
+                    aggregator.update(
+                        days[offset], float(income[offset]),
+                        float(expense[offset]), watched[offset].tolist())
+            quiet = offset + 1
+
+    def _step(self, day_index, day, record: bool):
+        self._day = day
+        if self.journal is not None:
+            self.journal.set_day(day)
+        self.accrue_accounts(day)
+        balances = None
+        if record:
+            balances = self._get_recorded_balances()
+        watched = None
+        if self.aggregators:
+            watched = [acnt.get_balance() for acnt in self._watched]
+        income = self.get_income(day)
+        expense = self.get_expense(day)
+
+        self.do_transfers(day)
+        if watched is not None:
+            for aggregator in self.aggregators:
+                aggregator.update(day, income, expense, watched)
+        return day_index, None, income, expense, balances
+
+    def _update_quiet_aggregators(self, day_index: int, span: int) -> None:
+        watched = self._get_quiet_balances(
+            span, np.arange(span), self._watched)
+        days = self._simulation_dates[day_index:day_index + span]
+        for aggregator in self.aggregators:
+            aggregator.update_quiet(days, watched)
+
+    def _get_quiet_balances(self, span: int, offsets,
+                            accounts=None) -> np.ndarray:
+        # Balances of `accounts` (default: the recorded ones) on the given
+        # days of a quiet span that starts from the current state. Only
+        # savings balances change.
+        if accounts is None:
+            accounts = self._recorded_accounts
+        balances = np.empty((len(offsets), len(accounts)))
+        balances[:] = [acnt.get_balance() for acnt in accounts]
+        for col, acnt in enumerate(accounts):
+            if isinstance(acnt, SavingsAccount):
+                balances[:, col] = acnt.get_balance_path(span)[offsets]
+        return balances
+
+    def _set_recorded_accounts(self, names) -> None:
+        recorded = [self.ca.r[name] for name in names]
+        self._recorded_accounts = recorded
+        self._recorded = recorded
+        self._recorded_loans = None
+        if self._loan_book is not None:
+            # Loan balances are read straight from the book's array.
+            is_loan = [isinstance(acnt, BookLoan) for acnt in recorded]
+            self._recorded_loans = (
+                np.flatnonzero(is_loan),
+                np.array([acnt._index for acnt in recorded
+                          if isinstance(acnt, BookLoan)], dtype=np.int64),
+                np.flatnonzero(np.logical_not(is_loan)))
+            self._recorded = [acnt for acnt in recorded
+                              if not isinstance(acnt, BookLoan)]
+        self._recorded_flows = None
+        if self._cash_flow is not None:
+            # Recorded column of each timeline account, or -1. Their
+            # balances are zero except on the days they fire.
+            columns = {acnt.get_name(): col
+                       for col, acnt in enumerate(recorded)}
+            self._recorded_flows = np.array(
+                [columns.get(name, -1) for name in self._cash_flow.names],
+                dtype=np.int64)
+
+    def _get_recorded_balances(self):
+        balances = [acnt.get_balance() for acnt in self._recorded]
+        flows = self._recorded_flows is not None and \
+            self._cash_flow.has_entries(self._day_index)
+        if self._recorded_loans is None and not flows:
+            return balances
+        if self._recorded_loans is None:
+            row = np.array(balances, dtype=float)
+        else:
+            loan_cols, loan_index, other_cols = self._recorded_loans
+            row = np.empty(len(loan_cols) + len(other_cols))
+            row[other_cols] = balances
+            row[loan_cols] = self._loan_book.get_balances(loan_index)
+        if flows:
+            accounts, cents = self._cash_flow.get_entries(self._day_index)
+            columns = self._recorded_flows[accounts]
+            recorded = columns >= 0
+            row[columns[recorded]] = cents[recorded] / CENTS_PER_DOLLAR
+        return row
+
+    def _supports_event_engine(self) -> bool:
+        known = (CheckingAccount, SavingsAccount,
+                 SimpleLoan, BookLoan, ExpenseRevenueAccount)
+        if not all(type(acnt) in known for acnt in self.ca.r.values()):
+            return False
+        return isinstance(self.ca.r.get('FGIF'), SavingsAccount)\
+            and isinstance(self.ca.r.get('CHGF'), CheckingAccount)
+
+    def _get_days_to_event(self, day, span: int) -> int:
+        # Days from `day`, at most `span`, before the next day on which a
+        # flow, loan payment or scheduled item comes due. Flows are looked
+        # up first: on most stepped days one comes due within
+        # MIN_QUIET_DAYS, and a count below that is returned as soon as
+        # known, without the other bounds.
+        day_index = self._get_flow_days().get_next_day(self._day_index)
+        if day_index is not None:
+            span = min(span, day_index - self._day_index)
+            if span < MIN_QUIET_DAYS:
+                return max(span, 0)
+        # A loan's due date only moves on once reached, so the earliest
+        # is kept until then.
+        if self._loans_due is None or self._loans_due < day:
+            self._loans_due = self._get_loans_due()
+        if self._loans_due is not None:
+            span = min(span, (self._loans_due - day).days)
+        for schedule in (self._scheduled_payments, self._scheduled_expenses):
+            next_date = schedule.next_date(day)
+            if next_date is not None:
+                span = min(span, (next_date - day).days)
+        return max(span, 0)
+
+    def _get_loans_due(self):
+        # Earliest next due date of any loan, or None.
+        if self._loan_book is not None:
+            if self._loan_book.names:
+                return self._loan_book.get_next_due_date()
+            return None
+        return min((loan.get_next_due_date()
+                    for loan in self.ca.loans.values()), default=None)
+
+    def _get_flow_days(self) -> CashFlowTimeline:
+        # The run's timeline, or one built once from the current day: the
+        # accounts themselves only move on as they are accrued, and are
+        # settled to zero the day they come due.
+        if self._cash_flow is not None:
+            return self._cash_flow
+        if self._flow_days is None:
+            self._flow_days = CashFlowTimeline.from_register(
+                self.ca, self._simulation_dates, self._day_index)
+        return self._flow_days
+
+    def _get_quiet_span(self, day, span: int) -> int:
+        # Number of days starting at `day`, at most `span` and before the
+        # next event, on which only interest accrues.
+        for loan in self.ca.open_loans.values():
+            if loan.get_amt_due() > 0:
+                return 0
+
+        for op in self._transfer_ops:
+            span = op.get_quiet_span(span)
+            if span == 0:
+                return 0
+
+        if not self._fast_payoff:
+            return span
+        loan = self._get_payoff_target()
+        if loan is None:
+            return span
+        payoff = loan.get_payoff()
+        interest = loan.get_daily_interest()
+        # FGIF grows convexly and the payoff linearly, so when FGIF's
+        # unposted balance is a cent short of triggering on the first
+        # and last days, no day in between triggers.
+        reserve = self._fgif_reserve + 1 / CENTS_PER_DOLLAR
+        if payoff + interest >= \
+                self._fgif.get_unposted_balance(1) - reserve and \
+                payoff + interest * span >= \
+                self._fgif.get_unposted_balance(span) - reserve:
+            return span
+        fgif_path = self._fgif.get_balance_path(span)
+        payoff_path = payoff + interest * np.arange(1, span + 1)
+        triggers = (payoff_path < fgif_path - self._fgif_reserve) \
+            & (payoff_path > 0)
+        if self._payoff_start is not None and self._payoff_start > day:
+            triggers[:(self._payoff_start - day).days] = False
+        if triggers.any():
+            span = int(np.argmax(triggers))
+        return span
 
     def accrue_accounts(self, day) -> None:
-        for acnt in self.ca.r.values():
+        for acnt in self._accrued:
             acnt.accrue(day)
+        if self._loan_book is not None:
+            self._loan_book.accrue(day)
 
     def schedule_payment(
             self,
             accnt_from: str,
             accnt_to: str,
             amt: float,
-            day: str) -> None:
-        self._scheduled_payments.append({'date': dt.strptime(
-            day, "%m/%d/%Y").date(), 'accnt_from': accnt_from, 'accnt_to': accnt_to, 'amt': amt})
+            day) -> None:
+        self._scheduled_payments.add(
+            parse_date(day), (accnt_from, accnt_to, amt))
+
+    def schedule_expense(self, amt: float, day) -> None:
+        self._scheduled_expenses.add(parse_date(day), amt)
+
+    def schedule_payments(self, payments) -> None:
+        # Bulk form of schedule_payment for config style entries with
+        # 'date', 'from', 'to' and 'amount' keys.
+        self._scheduled_payments.extend(
+            (parse_date(pmt['date']), (pmt['from'], pmt['to'], pmt['amount']))
+            for pmt in payments)
 
-    def schedule_expense(self, amt: float, day: str) -> None:
-        self._scheduled_expenses.append(
-            {'date': dt.strptime(day, "%m/%d/%Y").date(), 'amt': amt})
+    def schedule_expenses(self, purchases) -> None:
+        # Bulk form of schedule_expense for entries with 'date' and 'amount'.
+        self._scheduled_expenses.extend(
+            (parse_date(pur['date']), pur['amount']) for pur in purchases)
 
     def execute_scheduled_payments(self, day) -> float:
         sum_amt = 0
-        for _, pmt in enumerate(self._scheduled_payments):
-            if day == pmt['date']:
-                do_transaction(self.ca.r[pmt['accnt_from']],
-                               self.ca.r[pmt['accnt_to']], pmt['amt'])
-
-                sum_amt += pmt['amt']
+        for accnt_from, accnt_to, amt in self._scheduled_payments.pop(day):
+            self._do_transaction(
+                self.ca.r[accnt_from], self.ca.r[accnt_to], amt)
+            sum_amt += amt
         return sum_amt
 
     def execute_scheduled_expenses(self, day) -> float:
         sum_amt = 0
-        for pmt_no, pmt in enumerate(self._scheduled_expenses):
-            if day == pmt['date']:
-                state = self.ca.r['CHGF'].credit(pmt['amt'])
-                if state == TransactionState.TRANSACTION_DECLINED:
-                    fgif_bal = self.ca.r['FGIF'].get_balance()
-                    chgf_bal = self.ca.r['CHGF'].get_balance()
-                    if pmt['amt'] > (fgif_bal + chgf_bal):
-                        msg = "Can't Make Scheduled Expense in the amount of: " + str(pmt['amt']) + ' on ' + str(day) 
-                        raise ValueError(msg)
-                    if pmt['amt'] > fgif_bal:
-                        fgif_pmt = pmt['amt'] - fgif_bal
-                        self.ca.r['FGIF'].reset_balance()
-                        self.ca.r['CHGF'].credit(fgif_pmt)
+        for amt in self._scheduled_expenses.pop(day):
+            state = self._chgf.credit(amt)
+            if state == TransactionState.TRANSACTION_DECLINED:
+                self._record_purchase(day, 'CHGF', amt, state, 1)
+                fallback_bal = sum(acnt.get_balance()
+                                   for acnt in self._fallback_accounts)
+                chgf_bal = self._chgf.get_balance()
+                if amt > (fallback_bal + chgf_bal):
+                    msg = "Can't Make Scheduled Expense in the amount of: " + str(amt) + ' on ' + str(day) 
+                    raise ValueError(msg)
+                if self.profile is not None:
+                    self.profile.count('fgif_fallbacks')
+                # Fallback accounts pay in order, emptying each one they
+                # cannot pay from in full; CHGF pays what is left.
+                remaining = amt
+                for acnt in self._fallback_accounts:
+                    balance = acnt.get_balance()
+                    if remaining > balance:
+                        acnt.reset_balance()
+                        self._record_purchase(day, acnt.get_name(), balance)
+                        remaining -= balance
                     else:
-                        self.ca.r['FGIF'].credit(pmt['amt'])
+                        acnt.credit(remaining)
+                        self._record_purchase(
+                            day, acnt.get_name(), remaining)
+                        remaining = 0
+                        break
+                if remaining > 0:
+                    self._chgf.credit(remaining)
+                    self._record_purchase(day, 'CHGF', remaining)
+            else:
+                self._record_purchase(day, 'CHGF', amt)
 
-                self._scheduled_expenses.pop(pmt_no)
-                sum_amt += pmt['amt']
+            sum_amt += amt
         return sum_amt
 
+    def _record_purchase(
+            self, day, name: str, amount: float,
+            state=TransactionState.TRANSACTION_ACCEPTED,
+            error_no=0) -> None:
+        # Journal entry and transfer count of a scheduled purchase paid
+        # from account `name`.
+        if self.journal is not None:
+            self.journal.record(
+                day, name, PURCHASES, amount, state, error_no)
+        if self.profile is not None:
+            self.profile.count('transactions')
+            if error_no:
+                self.profile.declines[(state.name, error_no)] += 1
+
     def get_open_loan_accounts(self) -> list:
-        open_loans = []
-        for loan in self.get_loan_accounts():
-            if not loan.is_loan_paid():
-                open_loans.append(loan)
-        return open_loans
+        return list(self.ca.open_loans.values())
 
     def get_loan_accounts(self) -> list:
-        loans = []
-        for key in self.ca.r.keys():
-            if isinstance(self.ca.r[key], SimpleLoan):
-                loans.append(self.ca.r[key])
-        return loans
+        return list(self.ca.loans.values())
+
+    def _on_loan_paid(self, loan: SimpleLoan) -> None:
+        self.payoff_dates.setdefault(loan.get_name(), self._day)
+        for aggregator in self.aggregators:
+            aggregator.on_loan_paid(self._day, loan.get_name())
 
     def get_cum_int(self) -> float:
         cum_int = 0
@@ -119,93 +990,205 @@ class DailySim:
         return cum_int
 
     def get_expense(self, day) -> float:
-        expense = 0.0
+        if self._cash_flow is not None:
+            expense = self._pay_timeline_expenses(day)
+        else:
+            expense = self._pay_expense_accounts(
+                day, self._get_er_accounts('EXPENSE'))
+
+        if self._loan_book is not None:
+            expense += self._pay_book_loans(day)
+        else:
+            expense += self._pay_loans(day)
+
+        expense += self.execute_scheduled_payments(day)
+        expense += self.execute_scheduled_expenses(day)
 
-        for expense_account in self._get_er_accounts('EXPENSE'):
+        return expense
+
+    def _pay_expense_accounts(self, day, expense_accounts) -> float:
+        expense = 0.0
+        for expense_account in expense_accounts:
             if expense_account.get_balance() > 0:
                 expense += expense_account.get_balance()
-                ts, error_no = do_transaction(
-                    self.ca.r["CHGF"], expense_account, expense_account.get_balance())
+                ts, error_no = self._do_transaction(
+                    self._chgf, expense_account, expense_account.get_balance())
                 if ts == TransactionState.TRANSACTION_DECLINED:
-                    if self.ca.r["FGIF"].get_balance() >= expense_account.get_balance():
-                       do_transaction(
-                        self.ca.r["FGIF"], expense_account, expense_account.get_balance()) 
+                    if self.profile is not None:
+                        self.profile.count('fgif_fallbacks')
+                    amount = expense_account.get_balance()
+                    fallback = self._get_fallback(amount)
+                    if fallback is not None:
+                       self._do_transaction(fallback, expense_account, amount)
                     else:
                         raise ValueError("Transaction Error! " +
                                      expense_account.get_name() +
                                      ' ' +
                                      str(day) +
                                      ' ' +
-                                     str(self.ca.r["CHGF"].get_balance()) +
+                                     str(self._chgf.get_balance()) +
                                      ' ' +
                                      str(error_no), ' ' +
                                      str(expense_account.get_balance()))
+        return expense
+
+    def _get_fallback(self, amount: float):
+        # First fallback account holding `amount`, or None.
+        for acnt in self._fallback_accounts:
+            if acnt.get_balance() >= amount:
+                return acnt
+        return None
+
+    def _pay_timeline_expenses(self, day) -> float:
+        # Today's expense flows from the timeline, paid from CHGF in one
+        # transfer when it covers them all; otherwise account by account
+        # as _pay_expense_accounts does, with the FGIF fallback.
+        day_index = self._day_index
+        total = self._cash_flow.get_expense_cents(day_index)
+        if total == 0:
+            return 0.0
+        accounts, cents = self._cash_flow.get_entries(day_index)
+        expenses = ~self._cash_flow.is_revenue[accounts]
+        accounts = accounts[expenses]
+        cents = cents[expenses]
+        if self._chgf.get_cents() - total > 0:
+            self._chgf.credit_cents(total)
+            self._record_flows("CHGF", accounts, cents, False)
+            return total / CENTS_PER_DOLLAR
+        due = []
+        for k, amount in zip(accounts, cents):
+            acnt = self._cash_flow.accounts[k]
+            Account.debit_cents(acnt, int(amount))
+            due.append(acnt)
+        return self._pay_expense_accounts(day, due)
 
-        oneshot = False
+    def _record_flows(self, name: str, accounts, cents, is_income: bool):
+        # Journal entries and transfer counts of flows settled in bulk.
+        if self.journal is not None:
+            for k, amount in zip(accounts, cents):
+                flow_name = self._cash_flow.names[k]
+                name_from, name_to = name, flow_name
+                if is_income:
+                    name_from, name_to = flow_name, name
+                self.journal.record(
+                    self._day, name_from, name_to,
+                    amount / CENTS_PER_DOLLAR,
+                    TransactionState.TRANSACTION_ACCEPTED, 0)
+        if self.profile is not None:
+            self.profile.count('transactions', len(accounts))
 
-        for loan in self.get_open_loan_accounts():
-            if self._fast_payoff\
-                    and (loan.get_payoff() < (self.ca.r['FGIF'].get_balance()))\
-                    and (loan.get_payoff() > 0)\
-                    and not oneshot:
-                do_transaction(self.ca.r['FGIF'], loan, loan.get_payoff())
-            oneshot = True
+    def _get_payoff_target(self):
+        # Open loan that fast payoff pays down next, or None.
+        if self._payoff_order is None:
+            return next(iter(self.ca.open_loans.values()), None)
+        for name in self._payoff_order:
+            if name in self.ca.open_loans:
+                return self.ca.open_loans[name]
+        return None
 
+    def _do_fast_payoff(self, day) -> None:
+        if not self._fast_payoff:
+            return
+        if self._payoff_start is not None and day < self._payoff_start:
+            return
+        loan = self._get_payoff_target()
+        if loan is None:
+            return
+        available = self._fgif.get_balance() - self._fgif_reserve
+        if (loan.get_payoff() < available) and (loan.get_payoff() > 0):
+            self._do_transaction(self._fgif, loan, loan.get_payoff())
+
+    def _pay_loans(self, day) -> float:
+        expense = 0.0
+        open_loans = self.get_open_loan_accounts()
+        self._do_fast_payoff(day)
+
+        for loan in open_loans:
             if loan.get_amt_due() > 0:
                 expense += loan.get_amt_due()
-                ts,error_no = do_transaction(self.ca.r["CHGF"], loan, loan.get_amt_due())
+                ts,error_no = self._do_transaction(self._chgf, loan, loan.get_amt_due())
                 if ts == TransactionState.TRANSACTION_DECLINED:
                     raise ValueError("Transaction Error! " +
                                      loan.get_name() +
                                      ' ' +
                                      str(day) +
                                      ' ' +
-                                     str(self.ca.r["CHGF"].get_balance()) +
+                                     str(self._chgf.get_balance()) +
                                      ' ' +
                                      str(error_no), ' ' +
                                      str(loan.get_balance()))
+        return expense
 
-        expense += self.execute_scheduled_payments(day)
-        expense += self.execute_scheduled_expenses(day)
+    def _pay_book_loans(self, day) -> float:
+        # Same payments as _pay_loans, settled as one array operation when
+        # CHGF covers every amount due.
+        self._do_fast_payoff(day)
+
+        book = self._loan_book
+        due = book.get_due()
+        if len(due) == 0:
+            return 0.0
+        total = int(book.amount_due[due].sum())
+        if self._chgf.get_cents() - total > 0:
+            self._chgf.credit_cents(total)
+            if self.journal is not None:
+                for i in due:
+                    self.journal.record(
+                        day, "CHGF", book.names[i],
+                        book.amount_due[i] / CENTS_PER_DOLLAR,
+                        TransactionState.TRANSACTION_ACCEPTED, 0)
+            if self.profile is not None:
+                self.profile.count('transactions', len(due))
+            return book.pay_due(due)
 
+        expense = 0.0
+        for i in due:
+            loan = book.views[i]
+            expense += loan.get_amt_due()
+            ts, error_no = self._do_transaction(
+                self._chgf, loan, loan.get_amt_due())
+            if ts == TransactionState.TRANSACTION_DECLINED:
+                raise ValueError("Transaction Error! " +
+                                 loan.get_name() +
+                                 ' ' +
+                                 str(day) +
+                                 ' ' +
+                                 str(self._chgf.get_balance()) +
+                                 ' ' +
+                                 str(error_no), ' ' +
+                                 str(loan.get_balance()))
         return expense
 
     def do_transfers(self, day) -> None:
-        chgf_balance = self.ca.r["CHGF"].get_balance()
-        chgf_min = 1000
-        if chgf_balance > self._max_chgf:
-            do_transaction(
-                self.ca.r["CHGF"],
-                self.ca.r["FGIF"],
-                chgf_balance - self._max_chgf)
-        elif chgf_balance < chgf_min:
-            amount_required = chgf_min - chgf_balance
-            if self.ca.r["FGIF"].get_balance() >= amount_required:
-                do_transaction(
-                    self.ca.r["FGIF"],
-                    self.ca.r["CHGF"],
-                    amount_required)
-            else:
-                do_transaction(
-                    self.ca.r["FGIF"],
-                    self.ca.r["CHGF"],
-                    self.ca.r["FGIF"].get_balance())
+        for op in self._transfer_ops:
+            op()
 
     def get_income(self, day) -> float:
+        if self._cash_flow is not None:
+            return self._get_timeline_income()
         income = 0.0
         for revenue_account in self._get_er_accounts('REVENUE'):
             if revenue_account.get_balance() > 0:
                 income += revenue_account.get_balance()
-                do_transaction(
+                self._do_transaction(
                     revenue_account,
-                    self.ca.r["CHGF"],
+                    self._chgf,
                     revenue_account.get_balance())
         return income
 
-    def _get_er_accounts(self, account_type: str) -> ExpenseRevenueAccount:
-        rev_accounts = []
-        for key in self.ca.r.keys():
-            if isinstance(self.ca.r[key], ExpenseRevenueAccount):
-                if self.ca.r[key].account_type() == account_type:
-                    rev_accounts.append(self.ca.r[key])
-        return rev_accounts
+    def _get_timeline_income(self) -> float:
+        total = self._cash_flow.get_income_cents(self._day_index)
+        if total == 0:
+            return 0.0
+        self._chgf.debit_cents(total)
+        accounts, cents = self._cash_flow.get_entries(self._day_index)
+        revenue = self._cash_flow.is_revenue[accounts]
+        self._record_flows("CHGF", accounts[revenue], cents[revenue], True)
+        return total / CENTS_PER_DOLLAR
+
+    def _get_er_accounts(self, account_type: str) -> list:
+        if account_type == 'REVENUE':
+            return self.ca.revenue.values()
+        if account_type == 'EXPENSE':
+            return self.ca.expense.values()
+        return []
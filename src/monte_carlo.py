@@ -0,0 +1,713 @@
+# Monte Carlo runs of a DailySim projection: thousands of paths drawn
+# from distributions on flow amounts, missed or late flows and account
+# rates, all advanced together as arrays of shape (paths, accounts):
+#
+#   monte_carlo:
+#     paths: 5000
+#     seed: 7
+#     every: month_end        # days with percentile bands
+#     percentiles: [5, 25, 50, 75, 95]
+#     accounts: [CHGF, FGIF, CreditCard1]
+#     flows:                  # REVENUE and EXPENSE accounts
+#       EXAMPLE_JOB: {sd: 0.05, missed: 0.01, late: 0.05, late_days: 7}
+#       Grocery: {dist: lognormal, sd: 0.2}
+#     rates:                  # SAVINGS and loan accounts, in points
+#       FGIF: {sd: 1.0, walk: 0.25}
+#       CreditCard1: {sd: 2.0}
+#
+# Each occurrence of a flow is scaled by 1 + sd * N(0, 1), floored at
+# zero, or by a mean-one lognormal; it is missed with probability
+# `missed`, else late by 1 to late_days days with probability `late`. A
+# rate is shifted once per path by sd * N(0, 1) and, with `walk`, moves
+# by walk * N(0, 1) on the first of every month; rates never go below
+# zero. A path that cannot pay an expense, a loan payment or a
+# scheduled purchase, where DailySim would raise, is a shortfall: it
+# stops there and is left out of the bands from then on.
+#
+# Days are simulated as DailySim._step does them with the built-in CHGF
+# and FGIF sweep, so a run without distributions reproduces DailySim on
+# every path. Days on which no path has anything due are solved in
+# closed form, as the event engine does.
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+from accounts.cash_flow import CashFlowTimeline
+from accounts.checking import CheckingAccount
+from accounts.constants import DAYS_PER_YEAR
+from accounts.constants import PERCENT_TO_DECIMAL
+from accounts.loan import SimpleLoan
+from accounts.savings import SavingsAccount
+from util.money import CENTS_PER_DOLLAR
+from util.recorder import get_sampled_days
+
+SPEC_KEYS = ('paths', 'seed', 'every', 'percentiles', 'accounts', 'flows',
+             'rates')
+FLOW_KEYS = ('dist', 'sd', 'missed', 'late', 'late_days')
+RATE_KEYS = ('sd', 'walk')
+DISTRIBUTIONS = ('normal', 'lognormal')
+DEFAULT_PATHS = 1000
+DEFAULT_PERCENTILES = [5, 25, 50, 75, 95]
+# Shortfall kinds, in the order of their codes (0 is none).
+SHORTFALLS = ('expense', 'loan', 'purchase')
+RATE_SCALE = PERCENT_TO_DECIMAL * DAYS_PER_YEAR
+
+
+class MonteCarlo:
+    # Built by DailySim.get_monte_carlo from its current day and state;
+    # the register itself is never changed.
+    def __init__(self, register, dates: list, start: int, spec: dict,
+                 payments: list, expenses: list, max_chgf: float,
+                 chgf_min: float, fast_payoff: bool, payoff_order,
+                 fgif_reserve: float, payoff_start) -> None:
+        unknown = set(spec) - set(SPEC_KEYS)
+        if unknown:
+            raise ValueError("Unknown monte_carlo keys: " +
+                             ', '.join(sorted(map(str, unknown))))
+        self.dates = dates
+        self.start = start
+        self.paths = int(spec.get('paths', DEFAULT_PATHS))
+        if self.paths < 1:
+            raise ValueError("monte_carlo paths must be positive")
+        self.seed = spec.get('seed')
+        if self.seed is None:
+            # Drawn here so that the run can be repeated.
+            self.seed = int(np.random.SeedSequence().entropy % 2**32)
+        self.percentiles = list(spec.get('percentiles',
+                                          DEFAULT_PERCENTILES))
+        self._max_chgf = max_chgf
+        self._chgf_min = chgf_min
+        self._fast_payoff = fast_payoff
+        self._fgif_reserve = fgif_reserve
+        self._payoff_start = len(dates)
+        if fast_payoff:
+            self._payoff_start = start
+            if payoff_start is not None:
+                self._payoff_start = max(
+                    start, min(len(dates), (payoff_start - dates[0]).days))
+
+        self.cash_names = list(register.cash)
+        self.savings_names = list(register.savings)
+        self.loan_names = list(register.loans)
+        if 'CHGF' not in register.cash or 'FGIF' not in register.savings:
+            raise ValueError("Monte Carlo runs need a CASH account CHGF "
+                             "and a SAVINGS account FGIF")
+        self._chgf = self.cash_names.index('CHGF')
+        self._fgif = self.savings_names.index('FGIF')
+        loans = list(register.loans.values())
+        savings = list(register.savings.values())
+        self._cash0 = np.array([acnt._account_balance
+                                for acnt in register.cash.values()],
+                               dtype=float)
+        self._savings0 = np.array([acnt._account_balance
+                                   for acnt in savings], dtype=float)
+        self._carry0 = np.array([acnt._interest_carry for acnt in savings])
+        self._savings_pct = np.array([acnt._rate for acnt in savings]) \
+            * RATE_SCALE
+        self._loan0 = np.array([loan.get_state()[:4] for loan in loans],
+                               dtype=float).reshape(len(loans), 4)
+        self._loan_pct = np.array([loan._rate for loan in loans]) \
+            * RATE_SCALE
+        self._payment = np.array([loan._payment for loan in loans],
+                                 dtype=float)
+        if payoff_order is None:
+            payoff_order = self.loan_names
+        self._payoff_order = np.array(
+            [self.loan_names.index(name) for name in payoff_order
+             if name in register.loans], dtype=np.int64)
+
+        self.timeline = CashFlowTimeline.from_register(register, dates,
+                                                       start)
+        self._flows = self._get_flow_specs(spec.get('flows') or {})
+        self._rates = self._get_rate_specs(spec.get('rates') or {})
+        self._payments = self._get_schedule(payments, register)
+        self._expenses = self._get_schedule(
+            [(day, (amount,)) for day, amount in expenses], register)
+        self._loan_due = self._get_loan_due_days(loans)
+        # Day index -> loans billed that day.
+        self._due_on = {}
+        for j, due_days in enumerate(self._loan_due):
+            for day_index in due_days:
+                self._due_on.setdefault(day_index, []).append(j)
+
+        self.accounts = spec.get('accounts')
+        if self.accounts is None:
+            self.accounts = self.cash_names + self.savings_names \
+                + self.loan_names
+        for name in self.accounts:
+            if name not in register.r or name in self.timeline.names:
+                raise ValueError("Monte Carlo bands are kept for CASH, "
+                                 "SAVINGS and loan accounts: " + str(name))
+        sampled = get_sampled_days(dates, spec.get('every', 'month_end'))
+        self.recorded = sampled[sampled >= start]
+
+    def run(self):
+        rng = np.random.default_rng(self.seed)
+        self._set_up(rng)
+        days = len(self.dates)
+        event = self._get_event_days()
+        recorded = np.zeros(days, dtype=bool)
+        recorded[self.recorded] = True
+        rows = []
+        day_index = self.start
+        while day_index < days:
+            if not event[day_index]:
+                stop = day_index + int(np.argmax(event[day_index:]))
+                if not event[day_index:].any():
+                    stop = days
+                span = self._get_quiet_span(day_index, stop - day_index)
+                if span:
+                    self._accrue_days(span)
+                    day_index += span
+                    continue
+            self._step(day_index, rng, event, recorded, rows)
+            day_index += 1
+        return MonteCarloResult(self, rows)
+
+    def _set_up(self, rng) -> None:
+        paths = self.paths
+        self.cash = np.tile(self._cash0, (paths, 1))
+        self.savings = np.tile(self._savings0, (paths, 1))
+        self.carry = np.tile(self._carry0, (paths, 1))
+        self.balance = np.tile(self._loan0[:, 0], (paths, 1))
+        self.interest_due = np.tile(self._loan0[:, 1], (paths, 1))
+        self.amount_due = np.tile(self._loan0[:, 2], (paths, 1))
+        self.cumulative_interest = np.tile(self._loan0[:, 3], (paths, 1))
+        self.savings_pct = np.tile(self._savings_pct, (paths, 1))
+        self.loan_pct = np.tile(self._loan_pct, (paths, 1))
+        for pct, names, (columns, sd, walk) in (
+                (self.savings_pct, self.savings_names, self._rates[0]),
+                (self.loan_pct, self.loan_names, self._rates[1])):
+            if len(columns):
+                pct[:, columns] = np.maximum(
+                    pct[:, columns] + sd * rng.standard_normal(
+                        (paths, len(columns))), 0.0)
+        self._set_rates()
+        # Day index each loan was paid off on, or -1; loans paid before
+        # the run keep -1.
+        self.paid_day = np.full((paths, len(self.loan_names)), -1,
+                                dtype=np.int64)
+        self.failed_day = np.full(paths, -1, dtype=np.int64)
+        self.failed_kind = np.zeros(paths, dtype=np.int8)
+        self.alive = np.ones(paths, dtype=bool)
+        window = max([spec['late_days'] for spec in self._flows.values()
+                      if spec['late']] or [0]) + 1
+        # Flow amounts by day modulo window, with late ones added ahead.
+        self._pending = np.zeros(
+            (window, paths, len(self.timeline.accounts)))
+
+    def _set_rates(self) -> None:
+        self.savings_rate = self.savings_pct / RATE_SCALE
+        self.loan_rate = self.loan_pct / RATE_SCALE
+
+    def _get_event_days(self) -> np.ndarray:
+        # Days on which some path may have more to do than accrue. Late
+        # flows add theirs as they are drawn.
+        days = len(self.dates)
+        event = np.zeros(days, dtype=bool)
+        event[self.timeline.entry_days] = True
+        event[self.recorded] = True
+        for due_days in self._loan_due:
+            event[due_days] = True
+        event[list(self._payments) + list(self._expenses)] = True
+        if self._payoff_start < days:
+            event[self._payoff_start] = True
+        if self._rates[0][2].any() or self._rates[1][2].any():
+            event[[i for i, day in enumerate(self.dates)
+                   if day.day == 1]] = True
+        return event
+
+    def _step(self, day_index, rng, event, recorded, rows) -> None:
+        # One day on every path, in DailySim._step order.
+        if self.dates[day_index].day == 1:
+            self._walk_rates(rng)
+        self._accrue(day_index)
+        if recorded[day_index]:
+            rows.append(self._get_band_values())
+        if self.timeline.has_entries(day_index):
+            self._draw_flows(day_index, rng, event)
+        slot = day_index % len(self._pending)
+        flows = self._pending[slot]
+        revenue = self.timeline.is_revenue
+        self.cash[:, self._chgf] += flows[:, revenue].sum(axis=1)
+        self._pay_flows(day_index, flows)
+        flows[:] = 0.0
+        self._do_fast_payoff(day_index)
+        self._pay_loans(day_index)
+        for name_from, name_to, amount in self._payments.get(day_index, ()):
+            self._pay_scheduled(day_index, name_from, name_to, amount)
+        for amount, in self._expenses.get(day_index, ()):
+            self._pay_purchase(day_index, amount)
+        self._do_transfers()
+
+    def _walk_rates(self, rng) -> None:
+        moved = False
+        for pct, (columns, sd, walk) in ((self.savings_pct, self._rates[0]),
+                                         (self.loan_pct, self._rates[1])):
+            walking = columns[walk > 0]
+            if len(walking):
+                pct[:, walking] = np.maximum(
+                    pct[:, walking] + walk[walk > 0] * rng.standard_normal(
+                        (self.paths, len(walking))), 0.0)
+                moved = True
+        if moved:
+            self._set_rates()
+
+    def _accrue(self, day_index: int) -> None:
+        # SavingsAccount.accrue and LoanBook.accrue.
+        self.carry += self.savings_rate * (self.savings + self.carry)
+        posted = np.trunc(self.carry)
+        self.savings += posted
+        self.carry -= posted
+        self.interest_due += self.loan_rate * self.balance
+        for j in self._due_on.get(day_index, ()):
+            payoff = self.balance[:, j] + self.interest_due[:, j]
+            self.amount_due[:, j] = np.where(
+                payoff <= self._payment[j], np.floor(payoff + 0.5),
+                self._payment[j])
+
+    def _accrue_days(self, days: int) -> None:
+        # Closed form of `days` quiet days.
+        exact = (self.savings + self.carry) \
+            * (1.0 + self.savings_rate) ** days
+        self.savings = np.trunc(exact)
+        self.carry = exact - self.savings
+        self.interest_due += days * self.loan_rate * self.balance
+
+    def _get_quiet_span(self, day_index: int, span: int) -> int:
+        # Days from day_index, up to `span`, before some path would
+        # transfer or pay a loan off early.
+        chgf = self.cash[:, self._chgf]
+        if (self.alive & (chgf > self._max_chgf * CENTS_PER_DOLLAR)).any():
+            return 0
+        growth = (1.0 + self.savings_rate[:, self._fgif, None]) \
+            ** np.arange(1, span + 1)
+        exact = self.savings[:, self._fgif] + self.carry[:, self._fgif]
+        triggers = np.zeros(span, dtype=bool)
+        low = self.alive & (chgf < self._chgf_min * CENTS_PER_DOLLAR)
+        if low.any():
+            fgif = np.trunc(exact[low, None] * growth[low])
+            required = self._chgf_min - chgf[low, None] / CENTS_PER_DOLLAR
+            amount = _to_cents(required)
+            triggers |= ((fgif / CENTS_PER_DOLLAR >= required)
+                         & (fgif - amount > 0)).any(axis=0)
+        if day_index >= self._payoff_start:
+            rows, target = self._get_payoff_targets()
+            if len(rows):
+                fgif = np.trunc(exact[rows, None] * growth[rows])
+                balance = self.balance[rows, target]
+                payoff = (balance + self.interest_due[rows, target])[:, None] \
+                    + (self.loan_rate[rows, target] * balance)[:, None] \
+                    * np.arange(1, span + 1)
+                triggers |= ((payoff / CENTS_PER_DOLLAR <
+                              fgif / CENTS_PER_DOLLAR - self._fgif_reserve)
+                             & (payoff > 0)).any(axis=0)
+        if triggers.any():
+            return int(np.argmax(triggers))
+        return span
+
+    def _get_payoff_targets(self):
+        # (rows, loan columns) of the live paths with an open loan to pay
+        # down early, each path's first in the payoff order.
+        if not len(self._payoff_order):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        is_open = (self.balance + self.interest_due > 0)[:, self._payoff_order]
+        has_target = self.alive & is_open.any(axis=1)
+        rows = np.flatnonzero(has_target)
+        target = self._payoff_order[np.argmax(is_open[rows], axis=1)]
+        return rows, target
+
+    def _draw_flows(self, day_index: int, rng, event) -> None:
+        accounts, cents = self.timeline.get_entries(day_index)
+        window = len(self._pending)
+        for k, amount in zip(accounts.tolist(), cents.tolist()):
+            spec = self._flows.get(k)
+            if spec is None:
+                self._pending[day_index % window, :, k] += amount
+                continue
+            amounts = np.full(self.paths, float(amount))
+            if spec['sd'] > 0:
+                z = rng.standard_normal(self.paths)
+                if spec['dist'] == 'lognormal':
+                    scale = np.exp(spec['sd'] * z - spec['sd'] ** 2 / 2)
+                else:
+                    scale = np.maximum(1.0 + spec['sd'] * z, 0.0)
+                amounts = np.floor(amounts * scale + 0.5)
+            if spec['missed'] > 0:
+                amounts[rng.random(self.paths) < spec['missed']] = 0.0
+            if not spec['late'] > 0:
+                self._pending[day_index % window, :, k] += amounts
+                continue
+            due = np.full(self.paths, day_index)
+            late = rng.random(self.paths) < spec['late']
+            due[late] += rng.integers(
+                1, spec['late_days'] + 1, size=int(late.sum()))
+            # Flows due after the last day are dropped.
+            event[np.unique(due[due < len(event)])] = True
+            np.add.at(self._pending, (due % window, np.arange(self.paths),
+                                      k), amounts)
+
+    def _pay_flows(self, day_index: int, flows: np.ndarray) -> None:
+        # DailySim._pay_timeline_expenses: everything from CHGF when it
+        # covers the total, else account by account with FGIF behind it.
+        expense = ~self.timeline.is_revenue
+        if not flows[:, expense].any():
+            return
+        chgf = self.cash[:, self._chgf]
+        total = flows[:, expense].sum(axis=1)
+        covered = chgf - total > 0
+        chgf[covered] -= total[covered]
+        left = np.flatnonzero(~covered & (total > 0) & self.alive)
+        for k in np.flatnonzero(expense):
+            rows = left[flows[left, k] > 0]
+            if not len(rows):
+                continue
+            amount = flows[rows, k]
+            from_chgf = chgf[rows] - amount > 0
+            chgf[rows[from_chgf]] -= amount[from_chgf]
+            rows, amount = rows[~from_chgf], amount[~from_chgf]
+            fgif = self.savings[rows, self._fgif]
+            from_fgif = fgif >= amount
+            paid = rows[from_fgif & (fgif - amount > 0)]
+            self.savings[paid, self._fgif] -= flows[paid, k]
+            self._fail(rows[~from_fgif], day_index, 'expense')
+            left = left[self.alive[left]]
+
+    def _do_fast_payoff(self, day_index: int) -> None:
+        if day_index < self._payoff_start:
+            return
+        rows, target = self._get_payoff_targets()
+        if not len(rows):
+            return
+        payoff = self.balance[rows, target] + self.interest_due[rows, target]
+        fgif = self.savings[rows, self._fgif]
+        pay = (payoff / CENTS_PER_DOLLAR <
+               fgif / CENTS_PER_DOLLAR - self._fgif_reserve) & (payoff > 0)
+        rows, target, payoff = rows[pay], target[pay], payoff[pay]
+        cents = _to_cents(payoff / CENTS_PER_DOLLAR)
+        self.savings[rows, self._fgif] -= cents
+        self._settle(rows, target, cents, day_index)
+
+    def _pay_loans(self, day_index: int) -> None:
+        for j in range(len(self.loan_names)):
+            amount = self.amount_due[:, j]
+            rows = np.flatnonzero(
+                self.alive & (amount > 0)
+                & (self.balance[:, j] + self.interest_due[:, j] > 0))
+            if not len(rows):
+                continue
+            chgf = self.cash[rows, self._chgf]
+            paid = chgf - amount[rows] > 0
+            self._fail(rows[~paid], day_index, 'loan')
+            rows = rows[paid]
+            cents = amount[rows]
+            self.cash[rows, self._chgf] -= cents
+            self._settle(rows, np.full(len(rows), j), cents, day_index)
+
+    def _settle(self, rows, loans, cents, day_index: int) -> None:
+        # SimpleLoan._apply_full_payment of `cents` on each (row, loan).
+        interest = np.floor(self.interest_due[rows, loans] + 0.5)
+        self.balance[rows, loans] += interest - cents
+        self.cumulative_interest[rows, loans] += interest
+        self.interest_due[rows, loans] = 0.0
+        self.amount_due[rows, loans] = 0.0
+        self._mark_paid(rows, loans, day_index)
+
+    def _mark_paid(self, rows, loans, day_index: int) -> None:
+        paid = (self.balance[rows, loans] + self.interest_due[rows, loans]
+                <= 0) & (self.paid_day[rows, loans] < 0)
+        self.paid_day[rows[paid], loans[paid]] = day_index
+
+    def _pay_scheduled(self, day_index, name_from, name_to, amount) -> None:
+        # DailySim.execute_scheduled_payments: a declined transfer is
+        # skipped, as there.
+        cents = _to_cents(amount)
+        kind, column = name_from
+        balances = self.cash if kind == 'cash' else self.savings
+        rows = np.flatnonzero(self.alive & (balances[:, column] - cents > 0))
+        balances[rows, column] -= cents
+        kind, column = name_to
+        if kind == 'cash':
+            self.cash[rows, column] += cents
+        elif kind == 'savings':
+            self.savings[rows, column] += cents
+        else:
+            self._pay_loan_cents(rows, column, cents, day_index)
+
+    def _pay_loan_cents(self, rows, j: int, cents, day_index) -> None:
+        # SimpleLoan.debit_cents of a scheduled payment.
+        rows = rows[self.balance[rows, j] + self.interest_due[rows, j] > 0]
+        partial = cents < self.amount_due[rows, j]
+        full = rows[~partial]
+        self._settle(full, np.full(len(full), j), cents, day_index)
+        rows = rows[partial]
+        self.amount_due[rows, j] -= cents
+        interest_only = (self.interest_due[rows, j] > cents) \
+            & (self.interest_due[rows, j] > 0)
+        part = rows[interest_only]
+        self.cumulative_interest[part, j] += cents
+        self.interest_due[part, j] -= cents
+        rest = rows[~interest_only]
+        due = self.amount_due[rest, j].copy()
+        self._settle(rest, np.full(len(rest), j), cents, day_index)
+        self.amount_due[rest, j] = due
+
+    def _pay_purchase(self, day_index: int, amount: float) -> None:
+        # DailySim.execute_scheduled_expenses with FGIF as the fallback.
+        cents = _to_cents(amount)
+        chgf = self.cash[:, self._chgf]
+        rows = np.flatnonzero(self.alive)
+        from_chgf = chgf[rows] - cents > 0
+        chgf[rows[from_chgf]] -= cents
+        rows = rows[~from_chgf]
+        fgif = self.savings[rows, self._fgif] / CENTS_PER_DOLLAR
+        short = amount > fgif + chgf[rows] / CENTS_PER_DOLLAR
+        self._fail(rows[short], day_index, 'purchase')
+        rows, fgif = rows[~short], fgif[~short]
+        emptied = amount > fgif
+        drained = rows[emptied]
+        self.savings[drained, self._fgif] = 0.0
+        rest = _to_cents(amount - fgif[emptied])
+        from_chgf = chgf[drained] - rest > 0
+        chgf[drained[from_chgf]] -= rest[from_chgf]
+        rows = rows[~emptied]
+        paid = rows[self.savings[rows, self._fgif] - cents > 0]
+        self.savings[paid, self._fgif] -= cents
+
+    def _do_transfers(self) -> None:
+        # The built-in sweep, as SteadyTail._transfer vectorized.
+        chgf = self.cash[:, self._chgf]
+        fgif = self.savings[:, self._fgif]
+        dollars = chgf / CENTS_PER_DOLLAR
+        high = self.alive & (dollars > self._max_chgf)
+        amount = _to_cents(dollars - self._max_chgf)
+        high &= chgf - amount > 0
+        chgf[high] -= amount[high]
+        fgif[high] += amount[high]
+        required = self._chgf_min - dollars
+        amount = _to_cents(required)
+        low = self.alive & (dollars < self._chgf_min) \
+            & (fgif / CENTS_PER_DOLLAR >= required) & (fgif - amount > 0)
+        chgf[low] += amount[low]
+        fgif[low] -= amount[low]
+
+    def _fail(self, rows, day_index: int, kind: str) -> None:
+        rows = rows[self.alive[rows]]
+        self.alive[rows] = False
+        self.failed_day[rows] = day_index
+        self.failed_kind[rows] = SHORTFALLS.index(kind) + 1
+
+    def _get_band_values(self) -> np.ndarray:
+        # (accounts, paths) balances in dollars, NaN for failed paths.
+        values = np.empty((len(self.accounts), self.paths))
+        for row, name in enumerate(self.accounts):
+            values[row] = self._get_balances(name)
+        values[:, ~self.alive] = np.nan
+        return np.nanpercentile(values, self.percentiles, axis=1).T \
+            if self.alive.any() else \
+            np.full((len(self.accounts), len(self.percentiles)), np.nan)
+
+    def _get_balances(self, name: str) -> np.ndarray:
+        if name in self.cash_names:
+            cents = self.cash[:, self.cash_names.index(name)]
+        elif name in self.savings_names:
+            cents = self.savings[:, self.savings_names.index(name)]
+        else:
+            cents = self.balance[:, self.loan_names.index(name)]
+        return cents / CENTS_PER_DOLLAR
+
+    def _get_flow_specs(self, flows: dict) -> dict:
+        # Timeline position -> spec of every flow account with one.
+        specs = {}
+        for name, spec in flows.items():
+            if name not in self.timeline.names:
+                raise ValueError("Monte Carlo flows are drawn for REVENUE "
+                                 "and EXPENSE accounts: " + str(name))
+            spec = dict(spec or {})
+            unknown = set(spec) - set(FLOW_KEYS)
+            if unknown:
+                raise ValueError("Unknown flow keys for " + name + ": " +
+                                 ', '.join(sorted(map(str, unknown))))
+            spec.setdefault('dist', 'normal')
+            if spec['dist'] not in DISTRIBUTIONS:
+                raise ValueError("Unknown distribution: " + str(spec['dist']))
+            spec.setdefault('sd', 0.0)
+            spec.setdefault('missed', 0.0)
+            spec.setdefault('late', 0.0)
+            spec.setdefault('late_days', 7)
+            if spec['late'] > 0 and spec['late_days'] < 1:
+                raise ValueError("late_days must be at least 1: " + name)
+            specs[self.timeline.names.index(name)] = spec
+        return specs
+
+    def _get_rate_specs(self, rates: dict) -> tuple:
+        # ((columns, sd, walk) of savings, the same of loans), as arrays.
+        specs = ([], [])
+        for name, spec in rates.items():
+            spec = dict(spec or {})
+            unknown = set(spec) - set(RATE_KEYS)
+            if unknown:
+                raise ValueError("Unknown rate keys for " + str(name) + ": "
+                                 + ', '.join(sorted(map(str, unknown))))
+            if name in self.savings_names:
+                specs[0].append((self.savings_names.index(name), spec))
+            elif name in self.loan_names:
+                specs[1].append((self.loan_names.index(name), spec))
+            else:
+                raise ValueError("Monte Carlo rates are drawn for SAVINGS "
+                                 "and loan accounts: " + str(name))
+        return tuple(
+            (np.array([column for column, _ in entries], dtype=np.int64),
+             np.array([spec.get('sd', 0.0) for _, spec in entries],
+                      dtype=float),
+             np.array([spec.get('walk', 0.0) for _, spec in entries],
+                      dtype=float))
+            for entries in specs)
+
+    def _get_schedule(self, entries: list, register) -> dict:
+        # Day index -> scheduled items in the window, with account names
+        # resolved to (kind, column).
+        first = self.dates[0]
+        schedule = {}
+        for day, item in entries:
+            day_index = (day - first).days
+            if not self.start <= day_index < len(self.dates):
+                continue
+            if len(item) == 3:
+                item = (self._get_column(item[0], register, True),
+                        self._get_column(item[1], register, False), item[2])
+            schedule.setdefault(day_index, []).append(item)
+        return schedule
+
+    def _get_column(self, name: str, register, is_source: bool):
+        acnt = register.r.get(name)
+        if isinstance(acnt, SavingsAccount):
+            return 'savings', self.savings_names.index(name)
+        if isinstance(acnt, CheckingAccount):
+            return 'cash', self.cash_names.index(name)
+        if isinstance(acnt, SimpleLoan) and not is_source:
+            return 'loan', self.loan_names.index(name)
+        raise ValueError("Monte Carlo runs schedule payments from CASH or "
+                         "SAVINGS accounts to those or loans: " + str(name))
+
+    def _get_loan_due_days(self, loans: list) -> list:
+        # Day indexes on which each loan bills its next payment, as
+        # LoanBook.accrue would.
+        first = self.dates[0]
+        days = len(self.dates)
+        due_days = []
+        for loan in loans:
+            if loan._payment_timebase == 'w':
+                step = relativedelta(weeks=loan._payment_frequency)
+            else:
+                step = relativedelta(months=1)
+            due = []
+            next_due = loan.get_next_due_date()
+            day_index = self.start
+            while True:
+                day_index = max(day_index, (next_due - first).days)
+                if day_index >= days:
+                    break
+                due.append(day_index)
+                next_due += step
+                day_index += 1
+            due_days.append(due)
+        return due_days
+
+
+class MonteCarloResult:
+    def __init__(self, mc: MonteCarlo, rows: list) -> None:
+        self.paths = mc.paths
+        self.seed = mc.seed
+        self.percentiles = mc.percentiles
+        self.accounts = mc.accounts
+        self.loan_names = mc.loan_names
+        self.dates = mc.dates
+        self.days = np.asarray(mc.dates, dtype='datetime64[D]')[mc.recorded]
+        # (days, accounts, percentiles) of balances in dollars.
+        self.bands = np.array(rows).reshape(
+            len(rows), len(mc.accounts), len(mc.percentiles))
+        self.failed_day = mc.failed_day
+        self.failed_kind = mc.failed_kind
+        self.paid_day = mc.paid_day
+        self.cumulative_interest = \
+            mc.cumulative_interest.sum(axis=1) / CENTS_PER_DOLLAR
+        self.final = {name: mc._get_balances(name)
+                      for name in mc.cash_names + mc.savings_names}
+        self._recorded = mc.recorded
+
+    def get_bands(self, account: str):
+        # DataFrame of the percentiles of one account by day.
+        import pandas as pd
+        return pd.DataFrame(
+            data=self.bands[:, self.accounts.index(account)],
+            columns=self._get_percentile_names(),
+            index=pd.DatetimeIndex(self.days))
+
+    def to_frame(self):
+        # Every band, with (account, percentile) columns.
+        import pandas as pd
+        columns = pd.MultiIndex.from_product(
+            [self.accounts, self._get_percentile_names()])
+        return pd.DataFrame(
+            data=self.bands.reshape(len(self.days), -1).round(2),
+            columns=columns,
+            index=pd.DatetimeIndex(self.days))
+
+    def get_shortfall(self):
+        # Share of paths short by the end of each day, in all and by kind.
+        import pandas as pd
+        failed = self.failed_day >= 0
+        data = {'Shortfall': self._get_share_by_day(failed)}
+        for code, kind in enumerate(SHORTFALLS, 1):
+            data[kind.capitalize()] = self._get_share_by_day(
+                self.failed_kind == code)
+        return pd.DataFrame(data=data, index=pd.DatetimeIndex(self.days))
+
+    def summary(self) -> dict:
+        failed = self.failed_day >= 0
+        alive = ~failed
+        summary = {
+            'Paths': self.paths,
+            'Seed': self.seed,
+            'ShortfallProbability': float(failed.mean())
+        }
+        for code, kind in enumerate(SHORTFALLS, 1):
+            summary['ShortfallProbability ' + kind] = \
+                float((self.failed_kind == code).mean())
+        if failed.any():
+            summary['FirstShortfall'] = self.dates[
+                int(self.failed_day[failed].min())]
+        # Outcomes are over the paths without a shortfall.
+        if not alive.any():
+            return summary
+        for q, name in zip(self.percentiles, self._get_percentile_names()):
+            summary['CumulativeInterest ' + name] = round(float(
+                np.percentile(self.cumulative_interest[alive], q)), 2)
+        for q, name in zip(self.percentiles, self._get_percentile_names()):
+            summary['FGIFFinalBalance ' + name] = round(float(
+                np.percentile(self.final['FGIF'][alive], q)), 2)
+        for j, loan in enumerate(self.loan_names):
+            paid = self.paid_day[alive, j]
+            if not (paid >= 0).any():
+                continue
+            # Loans never paid off sort last.
+            paid = np.where(paid >= 0, paid, len(self.dates))
+            for q, name in zip(self.percentiles,
+                               self._get_percentile_names()):
+                day = int(np.percentile(paid, q, method='nearest'))
+                summary['Payoff ' + loan + ' ' + name] = \
+                    self.dates[day] if day < len(self.dates) else None
+        return summary
+
+    def _get_share_by_day(self, mask: np.ndarray) -> np.ndarray:
+        days = np.sort(self.failed_day[mask])
+        return np.searchsorted(days, self._recorded, side='right') \
+            / self.paths
+
+    def _get_percentile_names(self) -> list:
+        return ['P{:g}'.format(q) for q in self.percentiles]
+
+
+def _to_cents(dollars):
+    # Vector form of util.money.to_cents.
+    return np.floor(np.asarray(dollars) * CENTS_PER_DOLLAR + 0.5)
@@ -0,0 +1,171 @@
+# Searches fast payoff strategies for the lowest cumulative interest.
+import itertools
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dailysim import DailySim
+from sweep import load_chart
+from sweep import merge_config
+from util.config import get_config
+from util.daterange import get_date_range
+from util.daterange import parse_date
+
+STRATEGIES = ('first', 'avalanche', 'snowball')
+
+# Lowest cumulative interest of a finished feasible candidate, shared by
+# all worker processes.
+_best = None
+
+
+def get_candidates(opt: dict) -> list:
+    # Each candidate is a set of DailySim overrides. 'first' targets loans
+    # in chart order, like plain fast payoff.
+    orders = [None if strategy == 'first' else strategy
+              for strategy in opt.get('strategies', STRATEGIES)]
+    orders.extend(opt.get('orders', []))
+    candidates = []
+    for order, reserve, start in itertools.product(
+            orders,
+            opt.get('reserves', [0.0]),
+            opt.get('start_dates', [None])):
+        candidates.append({
+            'fast_payoff_enabled': True,
+            'payoff_order': order,
+            'fgif_reserve': reserve,
+            'payoff_start': start
+        })
+    if opt.get('include_no_payoff', True):
+        candidates.append({'fast_payoff_enabled': False})
+    return candidates
+
+
+def optimize(config: dict, opt: dict, workers=None) -> pd.DataFrame:
+    candidates = get_candidates(opt)
+    if workers is None:
+        workers = opt.get('workers', os.cpu_count())
+    constraints = opt.get('constraints', {})
+    checkpoint_days = opt.get('checkpoint_days', 365)
+
+    best = multiprocessing.Value('d', math.inf)
+    jobs = [(config, candidate, constraints, checkpoint_days)
+            for candidate in candidates]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(best,)) as pool:
+        results = list(pool.map(_run_job, jobs))
+
+    table = pd.DataFrame(results)
+    table['Feasible'] = table['Status'] == 'ok'
+    table = table.sort_values(
+        by=['Feasible', 'CumulativeInterest'], ascending=[False, True])
+    table = table.reset_index(drop=True)
+    table.index.name = 'Rank'
+    return table
+
+
+def evaluate(config: dict, candidate: dict, constraints: dict,
+             checkpoint_days: int, best=None) -> dict:
+    # Runs one candidate in chunks of checkpoint_days. Between chunks the
+    # run stops as 'pruned' once its interest so far already exceeds the
+    # best finished candidate's, since interest paid never decreases, and
+    # as 'infeasible' once CHGF or FGIF drops below its floor. `best` is
+    # the shared lowest interest, by default the pool worker's; called
+    # outside a pool, the candidate is only compared with itself.
+    if best is None:
+        best = _best
+    if best is None:
+        best = multiprocessing.Value('d', math.inf)
+    result = _describe(candidate)
+    run_config = merge_config(config, {
+        'record_accounts': ['CHGF', 'FGIF'],
+        'record_every': 1
+    })
+    ds = DailySim.from_config(
+        run_config, chart=load_chart(run_config['accounts']))
+    ds.apply_overrides(candidate)
+    floors = {name: constraints[key] for name, key in
+              (('CHGF', 'min_chgf'), ('FGIF', 'min_fgif'))
+              if key in constraints}
+    after = constraints.get('after')
+    if after is not None:
+        after = np.datetime64(parse_date(after), 'D')
+
+    dates = get_date_range(run_config['start_date'], run_config['end_date'])
+    checked_rows = 0
+    status = 'ok'
+    for stop in range(checkpoint_days, len(dates) + checkpoint_days,
+                      checkpoint_days):
+        try:
+            ds.simulate(until=dates[stop] if stop < len(dates) else None)
+        except ValueError as e:
+            status = 'infeasible: ' + str(e)
+            break
+        # Checks only the rows this chunk recorded, read from the
+        # recorder without building sim_results.
+        rows = ds.recorder.rows_before(min(stop, len(dates)))
+        if _violates(ds.recorder, checked_rows, rows, floors, after):
+            status = 'infeasible: liquidity'
+            break
+        checked_rows = rows
+        if ds.get_cum_int() > best.value:
+            status = 'pruned'
+            break
+
+    result['Status'] = status
+    result['CumulativeInterest'] = ds.get_cum_int()
+    result['FGIFFinalBalance'] = ds.ca.r['FGIF'].get_balance()
+    result['SimulatedThrough'] = None
+    if len(ds.sim_results):
+        result['SimulatedThrough'] = ds.sim_results.index[-1].date()
+    if status == 'ok':
+        with best.get_lock():
+            if result['CumulativeInterest'] < best.value:
+                best.value = result['CumulativeInterest']
+    return result
+
+
+def load_optimizer(path) -> dict:
+    return get_config(path)
+
+
+def _violates(recorder, start: int, stop: int, floors: dict,
+              after) -> bool:
+    # Whether a recorded balance in rows [start, stop) is below its
+    # floor, rounded to the cent as in sim_results.
+    if after is not None:
+        start = max(start, int(np.searchsorted(recorder.days, after)))
+    if start >= stop:
+        return False
+    for name, floor in floors.items():
+        column = recorder.columns.index(name)
+        if np.round(recorder.data[start:stop, column], 2).min() < floor:
+            return True
+    return False
+
+
+def _describe(candidate: dict) -> dict:
+    order = candidate.get('payoff_order')
+    if not candidate.get('fast_payoff_enabled'):
+        order = 'no fast payoff'
+    elif order is None:
+        order = 'first'
+    elif not isinstance(order, str):
+        order = ' > '.join(order)
+    return {
+        'Order': order,
+        'Reserve': candidate.get('fgif_reserve'),
+        'Start': candidate.get('payoff_start')
+    }
+
+
+def _init_worker(best) -> None:
+    global _best
+    _best = best
+
+
+def _run_job(job) -> dict:
+    return evaluate(*job)
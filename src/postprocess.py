@@ -1,9 +1,14 @@
-from matplotlib import pyplot as plt
 import os
+import sys
 
 from dailysim import DailySim
+from util.aggregators import Rollup
+from util.downsample import downsample
 from util.money import format_currency
 
+# Chart file formats matplotlib writes without extra dependencies.
+PLOT_FORMATS = ('png', 'svg', 'pdf', 'eps', 'ps')
+
 
 def post_process(args, ds: DailySim):
     save_results(args, ds)
@@ -17,6 +22,27 @@ def print_summary(ds: DailySim):
         'FGIF Final Balance: ' +
         format_currency(
             ds.ca.r['FGIF'].get_balance()))
+    for name, value in ds.get_aggregates().items():
+        if isinstance(value, float):
+            value = format_currency(value)
+        print(name + ': ' + str(value))
+    for day, text in ds.get_milestones():
+        print(day.isoformat() + ' ' + text)
+
+
+def post_process_monte_carlo(args, result):
+    if args.save_results:
+        if not os.path.exists('./results'):
+            os.mkdir('./results')
+        result.to_frame().to_csv('./results/monte_carlo.csv')
+        result.get_shortfall().to_csv('./results/monte_carlo_shortfall.csv')
+    for name, value in result.summary().items():
+        if name.startswith('ShortfallProbability'):
+            value = '{:.2%}'.format(value)
+        elif isinstance(value, float):
+            value = format_currency(value)
+        print(name + ': ' + str(value))
+    plot_bands(args, result)
 
 
 def save_results(args, ds: DailySim):
@@ -24,45 +50,163 @@ def save_results(args, ds: DailySim):
     if args.save_results:
         if not os.path.exists('./results'):
             os.mkdir('./results')
-        ds.sim_results.to_csv('./results/results.csv')
-
+        if ds.is_recording():
+            ds.sim_results.to_csv('./results/results.csv')
+        if ds.journal is not None:
+            ds.journal.entries().to_csv('./results/journal.csv')
+        for aggregator in ds.aggregators:
+            if isinstance(aggregator, Rollup):
+                aggregator.to_frame().to_csv(
+                    './results/' + aggregator.name + '.csv')
+
+
+def post_process_table(args, table, name: str):
+    print(table.to_string())
+    if args.save_results:
+        if not os.path.exists('./results'):
+            os.mkdir('./results')
+        table.to_csv('./results/' + name + '.csv')
 
-def plot_results(args, ds: DailySim):
-    accounts = ds.sim_results.iloc[:, -ds.ca.num_loans:]
 
-    chgf = ds.sim_results['CHGF']
+def is_headless(args) -> bool:
+    # Charts are only saved, never shown, when asked for or when there is
+    # no display to show them on (cron, ssh, containers).
+    if getattr(args, 'headless', False):
+        return True
+    if os.name != 'posix' or sys.platform == 'darwin':
+        return False
+    return not (os.environ.get('DISPLAY') or
+                os.environ.get('WAYLAND_DISPLAY'))
 
-    fgif = ds.sim_results['FGIF']
 
-    plt.figure(figsize=[10, 8])
+def get_pyplot(headless: bool):
+    # matplotlib is imported here so that runs without plots never load it.
+    import matplotlib
+    if headless:
+        matplotlib.use('Agg')
+    from matplotlib import pyplot as plt
+    return plt
 
-    plt.title('CHGF Balance Over Time')
-    plt.plot(chgf.index.to_numpy(), chgf.to_numpy(), label='CHGF BALANCE')
-    plt.legend()
-    ax = plt.gca()
-    ax.yaxis.set_major_formatter('${x:1.0f}')
-    if args.save_results:
-        plt.savefig('./results/chgf_v_time.png', format='png')
-
-    plt.figure(figsize=[10, 8])
-    plt.subplot(2, 1, 1)
-    plt.title('Loan Balances Over Time')
-    plt.plot(accounts.index.to_numpy(), accounts.to_numpy())
-    plt.legend(accounts.columns.values.tolist())
-    ax = plt.gca()
-    ax.yaxis.set_major_formatter('${x:1.0f}')
-    plt.subplot(2, 1, 2)
-    plt.title('Gen. Invst. Fund Balance')
-    plt.plot(
-        fgif.index.to_numpy(),
-        fgif.to_numpy(),
-        label='GIF BAL',
-        color='g')
-    ax = plt.gca()
-    ax.yaxis.set_major_formatter('${x:1.0f}')
-    plt.legend()
 
+def plot_results(args, ds: DailySim):
+    if getattr(args, 'no_plot', False):
+        return
+    headless = is_headless(args)
+    if headless and not args.save_results:
+        # Nothing would be shown or saved.
+        return
+    if not ds.is_recording():
+        print('Daily results must be recorded to plot them.')
+        return
+    columns = ds.sim_results.columns
+    if 'CHGF' not in columns or 'FGIF' not in columns:
+        print('CHGF and FGIF must be recorded to plot results.')
+        return
+    figures = get_figures(ds, getattr(args, 'downsample', 'minmax'))
+    formats = getattr(args, 'plot_formats', None) or ['png']
+    directory = './results' if args.save_results else None
+
+    plt = get_pyplot(headless)
+    workers = min(len(figures), os.cpu_count() or 1)
+    if headless and workers > 1:
+        # Each figure is drawn and saved in its own process; forked
+        # workers inherit the already imported pyplot.
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(save_figure, figure, formats,
+                                       directory)
+                           for figure in figures]:
+                future.result()
+        return
+    for figure in figures:
+        draw_figure(plt, figure)
+        if directory is not None:
+            _save(plt, figure[0], formats, directory)
+    if headless:
+        plt.close('all')
+    else:
+        plt.show()
+
+
+def plot_bands(args, result):
+    # Percentile bands of CHGF and FGIF from a Monte Carlo run.
+    if getattr(args, 'no_plot', False):
+        return
+    headless = is_headless(args)
+    if headless and not args.save_results:
+        return
+    method = getattr(args, 'downsample', 'minmax')
+    days = result.days
+    panels = []
+    for name in ('CHGF', 'FGIF'):
+        if name not in result.accounts:
+            continue
+        bands = result.get_bands(name)
+        panels.append((name + ' Percentile Bands', [
+            (label,) + downsample(days, bands[label].to_numpy(), method)
+            + (None,) for label in bands.columns]))
+    if not panels:
+        print('CHGF or FGIF must be in the Monte Carlo accounts to plot '
+              'bands.')
+        return
+    figure = ('monte_carlo_bands', panels)
+    plt = get_pyplot(headless)
+    draw_figure(plt, figure)
     if args.save_results:
-        plt.savefig('./results/loans_and_gif_v_time.png', format='png')
-
-    plt.show()
+        _save(plt, figure[0],
+              getattr(args, 'plot_formats', None) or ['png'], './results')
+    if headless:
+        plt.close('all')
+    else:
+        plt.show()
+
+
+def get_figures(ds: DailySim, method='minmax') -> list:
+    # [(file name, [(title, [(label, x, y, color)])])] for each figure,
+    # each series downsampled so that drawing time does not grow with
+    # the length of the simulation.
+    results = ds.sim_results
+    days = results.index.to_numpy()
+
+    def series(name, label, color=None):
+        x, y = downsample(days, results[name].to_numpy(), method)
+        return (label, x, y, color)
+
+    loan_names = [name for name in ds.ca.loans if name in results.columns]
+    return [
+        ('chgf_v_time', [
+            ('CHGF Balance Over Time',
+             [series('CHGF', 'CHGF BALANCE')])]),
+        ('loans_and_gif_v_time', [
+            ('Loan Balances Over Time',
+             [series(name, name) for name in loan_names]),
+            ('Gen. Invst. Fund Balance',
+             [series('FGIF', 'GIF BAL', 'g')])])]
+
+
+def draw_figure(plt, figure):
+    _, panels = figure
+    fig = plt.figure(figsize=[10, 8])
+    for i, (title, lines) in enumerate(panels):
+        if len(panels) > 1:
+            plt.subplot(len(panels), 1, i + 1)
+        plt.title(title)
+        for label, x, y, color in lines:
+            plt.plot(x, y, label=label, color=color)
+        plt.legend()
+        plt.gca().yaxis.set_major_formatter('${x:1.0f}')
+    return fig
+
+
+def save_figure(figure, formats: list, directory: str) -> None:
+    # Draws and saves one figure with the Agg backend; runs in a worker
+    # process.
+    plt = get_pyplot(True)
+    fig = draw_figure(plt, figure)
+    _save(plt, figure[0], formats, directory)
+    plt.close(fig)
+
+
+def _save(plt, name: str, formats: list, directory: str) -> None:
+    for fmt in formats:
+        plt.savefig(os.path.join(directory, name + '.' + fmt), format=fmt)
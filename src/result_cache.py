@@ -0,0 +1,266 @@
+# On-disk cache of simulation results. Runs are grouped by a base key:
+# the hash of the simulation source files, the config without its
+# scheduled payments and purchases, and the accounts CSV. Each run in a group stores its
+# recorded results as a column-major .npy file, memory-mapped on load,
+# and state checkpoints at month starts. A new run of the group
+# resumes from the latest checkpoint on or before its first scheduled
+# item that differs, so an identical rerun simulates nothing.
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from bisect import bisect_left
+from datetime import date
+
+import numpy as np
+
+from dailysim import DailySim
+from dailysim import SimSnapshot
+from util.cache import get_cache_dir
+from util.cache import hash_bytes
+from util.daterange import parse_date
+
+SCHEDULED_KEYS = ('payments', 'purchases')
+DEFAULT_MAX_MB = 512
+# Checkpoints are month starts, spaced out to at most this many per run.
+MAX_CHECKPOINTS = 48
+_DATA_FILE = 'results.npy'
+_META_FILE = 'meta.pickle'
+# Source files whose code can change results, relative to this file.
+_SOURCE_DIRS = ('.', 'accounts', 'transaction', 'util')
+_source_hash = None
+
+
+class ResultCache:
+    def __init__(self, directory=None, max_mb=DEFAULT_MAX_MB) -> None:
+        self.directory = directory or get_cache_dir('results')
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+    def simulate(self, config: dict, ds: DailySim) -> DailySim:
+        # `ds`, a new DailySim built from `config`, simulated to its end
+        # date; or a fork of it resumed from the cache.
+        if ds.aggregators or not ds.is_recording():
+            # Aggregators must see every day, and without a daily table
+            # there is nothing to store.
+            ds.simulate()
+            return ds
+        group = os.path.join(self.directory, get_base_key(config))
+        schedule = get_schedule(config)
+        dates = ds.get_dates()
+
+        checkpoints = []
+        cached = self._find_checkpoints(group, schedule, dates)
+        if cached is not None:
+            path, checkpoints = cached
+            resumed = self._resume(path, ds, checkpoints[-1])
+            if resumed is None:
+                checkpoints = []
+            else:
+                ds = resumed
+
+        start = checkpoints[-1].day_index if checkpoints else 0
+        for day_index in _get_checkpoint_days(dates):
+            if day_index > start:
+                ds.simulate(until=dates[day_index])
+                checkpoints.append(_get_checkpoint(ds))
+        if start < len(dates):
+            ds.simulate()
+            checkpoints.append(_get_checkpoint(ds))
+
+        entry = os.path.join(group, hash_bytes(
+            pickle.dumps(sorted(schedule.items()))))
+        if not os.path.isdir(entry):
+            self._store(entry, ds, schedule, checkpoints)
+            self.evict()
+        return ds
+
+    def evict(self) -> None:
+        # Removes least recently used runs until the cache fits in
+        # max_bytes.
+        entries = []
+        total = 0
+        for group in _list_dirs(self.directory):
+            for path in _list_dirs(group):
+                size = sum(_file_size(os.path.join(path, name))
+                           for name in (_DATA_FILE, _META_FILE))
+                entries.append((_mtime(path), size, path))
+                total += size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            try:
+                # Drops the group once its last run is gone.
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
+
+    def _find_checkpoints(self, group: str, schedule: dict, dates: list):
+        # (run path, its checkpoints this run can resume from) for the
+        # cached run that shares the longest prefix, or None.
+        best = None
+        for path in _list_dirs(group):
+            meta = _load_meta(path)
+            if meta is None:
+                continue
+            # Checkpoint i is the state before dates[i] is simulated, so
+            # it is usable if nothing differs before dates[i].
+            last = len(dates)
+            changed = _first_change(schedule, meta['schedule'])
+            if changed is not None:
+                last = bisect_left(dates, changed)
+            usable = [checkpoint for checkpoint in meta['checkpoints']
+                      if checkpoint.day_index <= last]
+            if usable and (best is None or
+                           usable[-1].day_index > best[1][-1].day_index):
+                best = (path, usable)
+        return best
+
+    def _resume(self, path: str, ds: DailySim, checkpoint: SimSnapshot):
+        try:
+            data = np.load(os.path.join(path, _DATA_FILE), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        os.utime(path)
+        # Items not executed before the checkpoint come from this run's
+        # schedule, which may differ from the cached one after it.
+        fresh = ds.snapshot(results=False)
+        dates = ds.get_dates()
+        done = checkpoint.day_index >= len(dates)
+        start = None if done else dates[checkpoint.day_index]
+        resumed = ds.fork(SimSnapshot(
+            checkpoint.day_index,
+            checkpoint.day,
+            checkpoint.accounts,
+            [] if done else [(day, item) for day, item in fresh.payments
+                             if day >= start],
+            [] if done else [(day, item) for day, item in fresh.expenses
+                             if day >= start],
+            checkpoint.piano_sold,
+            checkpoint.payoff_dates,
+            data[:0] if done else data))
+        if done:
+            # Nothing left to simulate; read the results in place.
+            resumed.recorder.data = data
+        return resumed
+
+    def _store(self, entry: str, ds: DailySim, schedule: dict,
+               checkpoints: list) -> None:
+        group = os.path.dirname(entry)
+        try:
+            os.makedirs(group, exist_ok=True)
+            temp = tempfile.mkdtemp(dir=group, prefix='.tmp')
+        except OSError:
+            return
+        try:
+            np.save(os.path.join(temp, _DATA_FILE),
+                    np.asfortranarray(ds.recorder.data))
+            with open(os.path.join(temp, _META_FILE), 'wb') as f:
+                pickle.dump({'schedule': schedule,
+                             'checkpoints': checkpoints},
+                            f, pickle.HIGHEST_PROTOCOL)
+            os.rename(temp, entry)
+        except OSError:
+            # Not writable, or stored meanwhile by another process.
+            shutil.rmtree(temp, ignore_errors=True)
+
+
+def get_base_key(config: dict) -> str:
+    base = {key: value for key, value in config.items()
+            if key not in SCHEDULED_KEYS}
+    with open(config['accounts'], 'rb') as f:
+        accounts = f.read()
+    return hash_bytes(
+        get_source_hash().encode(), b'\0',
+        json.dumps(base, sort_keys=True, default=str).encode(), b'\0',
+        accounts)
+
+
+def get_source_hash() -> str:
+    # Hash of the simulation's Python sources, read once per process, so
+    # that any code change starts new cache groups.
+    global _source_hash
+    if _source_hash is None:
+        root = os.path.dirname(os.path.abspath(__file__))
+        chunks = []
+        for directory in _SOURCE_DIRS:
+            path = os.path.join(root, directory)
+            for name in sorted(os.listdir(path)):
+                if name.endswith('.py'):
+                    with open(os.path.join(path, name), 'rb') as f:
+                        chunks.extend([directory.encode(), name.encode(),
+                                       f.read()])
+        _source_hash = hash_bytes(*chunks)
+    return _source_hash
+
+
+def get_schedule(config: dict) -> dict:
+    # Date ordinal -> the day's scheduled items, in execution order.
+    schedule = {}
+    for kind in SCHEDULED_KEYS:
+        for item in (config.get(kind) or {}).values():
+            day = parse_date(item['date']).toordinal()
+            fields = tuple(sorted((str(key), str(value))
+                                  for key, value in item.items()
+                                  if key != 'date'))
+            schedule.setdefault(day, []).append((kind, fields))
+    return schedule
+
+
+def _get_checkpoint_days(dates: list) -> list:
+    month_starts = [i for i in range(1, len(dates)) if dates[i].day == 1]
+    step = -(-len(month_starts) // MAX_CHECKPOINTS)
+    return month_starts[step - 1::step] if step else []
+
+
+def _get_checkpoint(ds: DailySim) -> SimSnapshot:
+    # Snapshot without results or schedules; a resumed run takes those
+    # from the cached results and its own config.
+    snapshot = ds.snapshot(results=False)
+    snapshot.payments = []
+    snapshot.expenses = []
+    return snapshot
+
+
+def _first_change(schedule: dict, cached: dict):
+    # Earliest date whose scheduled items differ, or None.
+    changed = [day for day in set(schedule) | set(cached)
+               if schedule.get(day) != cached.get(day)]
+    if not changed:
+        return None
+    return date.fromordinal(min(changed))
+
+
+def _load_meta(path: str):
+    try:
+        with open(os.path.join(path, _META_FILE), 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def _list_dirs(directory: str) -> list:
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return [os.path.join(directory, name) for name in names
+            if not name.startswith('.') and
+            os.path.isdir(os.path.join(directory, name))]
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
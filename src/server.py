@@ -0,0 +1,292 @@
+# Long-running simulation server. Keeps worker processes with DailySim,
+# its dependencies and parsed charts of accounts loaded, and takes
+# requests over localhost HTTP or a Unix socket:
+#
+#   python src/server.py --port 8765
+#   curl -d '{"config": "cli/cli.yaml"}' localhost:8765/simulate
+#   python src/server.py --socket /tmp/dailysim.sock
+#   curl --unix-socket /tmp/dailysim.sock -d @request.json \
+#       http://localhost/simulate
+#
+# A request is a JSON object with 'config' (a YAML path, or the config
+# itself), optional 'overrides' merged into it, and 'results': 'summary'
+# (default) for a JSON summary, or 'stream' for the daily results as
+# chunked CSV, sent while the simulation runs. Summaries go through the
+# result cache unless 'cache' is false. Relative paths are resolved
+# against the server's working directory; config files are read as
+# plain YAML, without the Python tags the CLI's loader accepts.
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import queue
+import socketserver
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+from dailysim import DailySim
+from result_cache import DEFAULT_MAX_MB
+from result_cache import ResultCache
+from sweep import load_chart
+from sweep import merge_config
+from sweep import summarize
+from util.config import get_safe_config
+from util.recorder import HEADER
+
+RESULT_MODES = ('summary', 'stream')
+# Rows per streamed chunk.
+STREAM_ROWS = 512
+# Seconds between checks that a streaming worker is still running.
+STREAM_POLL_SECONDS = 1.0
+# Modules each worker imports before its first request.
+WARM_MODULES = ('pandas', 'dateutil.relativedelta')
+
+
+class SimServer:
+    def __init__(self, workers=None) -> None:
+        self.workers = workers or os.cpu_count()
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_warm_up)
+        self._manager = None
+        self._manager_lock = threading.Lock()
+        # Start every worker now so the first requests are not cold.
+        for future in [self.pool.submit(_ping)
+                       for _ in range(self.workers)]:
+            future.result()
+
+    def summary(self, request: dict) -> dict:
+        return self.pool.submit(
+            run_summary, request['config'], request.get('overrides', {}),
+            request.get('cache', True)).result()
+
+    def stream(self, request: dict):
+        # Yields CSV text chunks as a worker produces them. The response
+        # has started by then, so a failure ends the CSV with an
+        # '# Error: ...' line.
+        try:
+            chunks = self._get_manager().Queue()
+            future = self.pool.submit(
+                run_stream, request['config'], request.get('overrides', {}),
+                chunks)
+            while True:
+                # A worker that ended without its final None has died.
+                finished = future.done()
+                try:
+                    chunk = chunks.get(timeout=STREAM_POLL_SECONDS)
+                except queue.Empty:
+                    if finished:
+                        break
+                    continue
+                if chunk is None:
+                    break
+                yield chunk
+            future.result()
+        except Exception as e:
+            yield '# Error: ' + _describe_error(e) + '\n'
+
+    def _get_manager(self):
+        # Started with the first stream; handler threads share it.
+        with self._manager_lock:
+            if self._manager is None:
+                self._manager = multiprocessing.Manager()
+            return self._manager
+
+    def close(self) -> None:
+        self.pool.shutdown()
+        if self._manager is not None:
+            self._manager.shutdown()
+
+
+def run_summary(config, overrides: dict, cache=True) -> dict:
+    try:
+        config = _get_config(config, overrides)
+        ds = DailySim.from_config(
+            config, chart=load_chart(config['accounts']))
+    except Exception as e:
+        # Whatever fails here comes from the config or overrides sent,
+        # YAML tags the safe loader refuses included.
+        return {'Error': _describe_error(e)}
+    try:
+        if cache:
+            ds = ResultCache(max_mb=config.get(
+                'result_cache_max_mb', DEFAULT_MAX_MB)).simulate(config, ds)
+        else:
+            ds.simulate()
+    except ValueError as e:
+        return {'Error': str(e)}
+    summary = summarize(ds)
+    summary['Days'] = len(ds.get_dates())
+    return summary
+
+
+def run_stream(config, overrides: dict, chunks) -> None:
+    # Puts CSV chunks of the daily results on `chunks`, then None. Any
+    # error ends the CSV, after the rows made before it, with an
+    # '# Error: ...' line.
+    lines = []
+    try:
+        config = _get_config(config, overrides)
+        ds = DailySim.from_config(
+            config, chart=load_chart(config['accounts']))
+        chunks.put(','.join(['Date'] + HEADER + ds.get_recorded_accounts())
+                  + '\n')
+        for day, income, expense, balances in ds.simulate_iter():
+            lines.append('{},{:.2f},{:.2f},{}\n'.format(
+                day.isoformat(), income, expense,
+                ','.join('{:.2f}'.format(b) for b in balances)))
+            if len(lines) == STREAM_ROWS:
+                chunks.put(''.join(lines))
+                lines = []
+        chunks.put(''.join(lines))
+    except ValueError as e:
+        chunks.put(''.join(lines) + '# Error: ' + str(e) + '\n')
+    except Exception as e:
+        chunks.put(''.join(lines) + '# Error: ' + _describe_error(e) + '\n')
+    finally:
+        chunks.put(None)
+
+
+def _get_config(config, overrides: dict) -> dict:
+    if isinstance(config, str):
+        config = get_safe_config(config)
+    return merge_config(config, overrides)
+
+
+def _warm_up() -> None:
+    # Imports that a first request would otherwise pay for.
+    for module in WARM_MODULES:
+        importlib.import_module(module)
+
+
+def _ping() -> bool:
+    return True
+
+
+def _describe_error(e: Exception) -> str:
+    return type(e).__name__ + ': ' + str(e)
+
+
+class SimRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok',
+                                  'workers': self.server.sim.workers})
+        else:
+            self._send_json(404, {'Error': 'Not found: ' + self.path})
+
+    def do_POST(self):
+        if self.path != '/simulate':
+            self._send_json(404, {'Error': 'Not found: ' + self.path})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            mode = request.get('results', 'summary')
+            if 'config' not in request:
+                raise ValueError("Request needs a 'config'")
+            if mode not in RESULT_MODES:
+                raise ValueError("Unknown results mode: " + str(mode))
+        except ValueError as e:
+            self._send_json(400, {'Error': str(e)})
+            return
+
+        if mode == 'stream':
+            self._send_stream(self.server.sim.stream(request))
+            return
+        try:
+            summary = self.server.sim.summary(request)
+        except (KeyError, OSError) as e:
+            self._send_json(400, {'Error': _describe_error(e)})
+            return
+        except Exception as e:
+            self._send_json(500, {'Error': _describe_error(e)})
+            return
+        self._send_json(422 if 'Error' in summary else 200, summary)
+
+    def address_string(self) -> str:
+        # Unix socket peers have no address.
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return 'unix'
+
+    def _send_json(self, status: int, body: dict) -> None:
+        data = json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, chunks) -> None:
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                data = chunk.encode()
+                if data:
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        finally:
+            self.wfile.write(b'0\r\n\r\n')
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn,
+                     socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(sim: SimServer, port=8765, socket_path=None):
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        httpd = UnixHTTPServer(socket_path, SimRequestHandler)
+    else:
+        httpd = ThreadingHTTPServer(('127.0.0.1', port), SimRequestHandler)
+    httpd.sim = sim
+    return httpd
+
+
+def main(argv=None) -> int:
+    args = _get_args(argv)
+    sim = SimServer(args.workers)
+    httpd = make_server(sim, args.port, args.socket)
+    print('DailySim server on ' + (
+        args.socket or 'http://127.0.0.1:' + str(args.port)), flush=True)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        sim.close()
+        if args.socket is not None and os.path.exists(args.socket):
+            os.remove(args.socket)
+    return 0
+
+
+def _get_args(argv):
+    parser = argparse.ArgumentParser(description='DailySim server')
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=8765,
+        help='Localhost port to listen on.')
+    parser.add_argument(
+        '--socket',
+        help='Listen on this Unix socket path instead of a port.')
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='Worker processes; defaults to the CPU count.')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
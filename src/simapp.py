@@ -1,52 +1,162 @@
 import argparse
+from accounts.chart_of_accounts import get_chart_of_accounts
 from dailysim import DailySim
 from util.config import get_config
+from postprocess import PLOT_FORMATS
 from postprocess import post_process
+from postprocess import post_process_monte_carlo
+from postprocess import post_process_table
+from postprocess import print_summary
+from util.downsample import METHODS
 
 
 class SimApp():
-    def __init__(self):
-        self.args = self.get_args()
-        self.sim = self.get_sim(self.args)
+    def __init__(self, argv=None):
+        self.args = self.get_args(argv)
+        self.sim = None
+        self.config = None
+        if self.args.sweep is None and self.args.optimize is None:
+            self.sim = self.get_sim(self.args)
+            if self.args.profile is not None:
+                self.sim.enable_profile()
 
     def main(self):
-        self.sim.simulate()
-        post_process(self.args, self.sim)
+        # Sweep, optimizer and sink modules (and pandas with them) are only
+        # imported by the modes that use them.
+        if self.args.sweep is not None:
+            from sweep import load_sweep
+            from sweep import run_sweep
+            table = run_sweep(
+                get_config(self.args.configPath),
+                load_sweep(self.args.sweep),
+                workers=self.args.workers,
+                store=self.args.store)
+            post_process_table(self.args, table, 'sweep')
+            return
+        if self.args.optimize is not None:
+            from optimizer import load_optimizer
+            from optimizer import optimize
+            table = optimize(
+                get_config(self.args.configPath),
+                load_optimizer(self.args.optimize),
+                workers=self.args.workers)
+            post_process_table(self.args, table, 'optimize')
+            return
+        if self.args.monte_carlo:
+            spec = dict(self.config.get('monte_carlo') or {})
+            if self.args.paths is not None:
+                spec['paths'] = self.args.paths
+            if self.args.seed is not None:
+                spec['seed'] = self.args.seed
+            post_process_monte_carlo(
+                self.args, self.sim.get_monte_carlo(spec).run())
+            return
+        if self.args.stream is not None:
+            from util.sink import stream_results
+            stream_results(self.sim, self.args.stream)
+            print_summary(self.sim)
+        elif self.use_result_cache():
+            from result_cache import DEFAULT_MAX_MB
+            from result_cache import ResultCache
+            cache = ResultCache(max_mb=self.config.get(
+                'result_cache_max_mb', DEFAULT_MAX_MB))
+            self.sim = cache.simulate(self.config, self.sim)
+            post_process(self.args, self.sim)
+        else:
+            self.sim.simulate()
+            post_process(self.args, self.sim)
+        if self.sim.profile is not None:
+            self.sim.profile.write(self.args.profile)
 
-    def get_args(self):
+    def use_result_cache(self) -> bool:
+        # Opt-in with --cache-results or the result_cache config key.
+        # Journaled and profiled runs always simulate.
+        if self.args.no_cache or not (
+                self.args.cache_results or self.config.get('result_cache')):
+            return False
+        return self.sim.journal is None and self.sim.profile is None
+
+    def get_args(self, argv=None):
         parser = argparse.ArgumentParser(description='DailySim')
         parser.add_argument('configPath', help='Config yaml path.')
         parser.add_argument(
             '--save-results',
             help='Save output results.',
             action='store_true')
-        return parser.parse_args()
+        parser.add_argument(
+            '--no-plot',
+            help='Skip plotting; matplotlib is never imported.',
+            action='store_true')
+        parser.add_argument(
+            '--headless',
+            help='Render charts with the Agg backend and never open a '
+                 'window. Implied when no display is available.',
+            action='store_true')
+        parser.add_argument(
+            '--plot-formats',
+            nargs='+',
+            choices=PLOT_FORMATS,
+            default=['png'],
+            help='File formats of saved charts.')
+        parser.add_argument(
+            '--downsample',
+            choices=METHODS,
+            default='minmax',
+            help='How long series are reduced before plotting: min/max '
+                 'per bucket, largest-triangle-three-buckets, or none.')
+        parser.add_argument(
+            '--stream',
+            help='Stream daily results, on the days record_every '
+                 'samples, to this .csv or .parquet path while '
+                 'simulating instead of keeping them in memory.')
+        parser.add_argument(
+            '--sweep',
+            help='Sweep yaml path. Runs every scenario it defines.')
+        parser.add_argument(
+            '--store',
+            help='With --sweep, also write the daily results of every '
+                 'scenario into a memory-mapped scenario store at this '
+                 'path, with a .json sidecar.')
+        parser.add_argument(
+            '--optimize',
+            help='Optimizer yaml path. Searches fast payoff strategies for '
+                 'the lowest cumulative interest.')
+        parser.add_argument(
+            '--monte-carlo',
+            help='Run the Monte Carlo paths described by the config\'s '
+                 'monte_carlo section and report percentile bands and '
+                 'shortfall probabilities.',
+            action='store_true')
+        parser.add_argument(
+            '--paths',
+            type=int,
+            help='Monte Carlo paths, overriding the config.')
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Monte Carlo random seed, overriding the config.')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Worker processes for --sweep and --optimize.')
+        parser.add_argument(
+            '--cache-results',
+            help='Reuse and store simulation results in the on-disk result '
+                 'cache, as the result_cache config key does.',
+            action='store_true')
+        parser.add_argument(
+            '--no-cache',
+            help='Parse the accounts CSV and simulate from scratch instead '
+                 'of reusing cached charts and results.',
+            action='store_true')
+        parser.add_argument(
+            '--profile',
+            help='Write per-phase timings and transaction counters of the '
+                 'run to this JSON path.')
+        return parser.parse_args(argv)
 
     def get_sim(self, args):
-        config = get_config(args.configPath)
-        ds = DailySim(
-            config['accounts'],
-            config['start_date'],
-            config['end_date'],
-            fast_payoff=config['fast_payoff_enabled'],
-            max_chgf=config['max_checking_balance']
-        )
-        if 'payments' in list(config.keys()):
-            payments = config['payments']
-            for paymentk in list(payments.keys()):
-                payment = payments[paymentk]
-                ds.schedule_payment(
-                    payment['from'],
-                    payment['to'],
-                    payment['amount'],
-                    payment['date']
-                )
-        if 'purchases' in list(config.keys()):
-            purchases = config['purchases']
-            for purchasek in list(purchases.keys()):
-                purchase = purchases[purchasek]
-                ds.schedule_expense(
-                    purchase['amount'],
-                    purchase['date']
-                )
-        return ds
+        self.config = get_config(args.configPath)
+        chart = get_chart_of_accounts(
+            self.config['accounts'], use_cache=not args.no_cache)
+        return DailySim.from_config(self.config, chart=chart)
@@ -0,0 +1,151 @@
+# Closed-form simulation of the steady tail of a run: every loan paid
+# off and nothing scheduled, so each day only FGIF earns interest,
+# revenue and expense flows move through CHGF and do_transfers sweeps
+# CHGF back into its band through FGIF. Only days with flows are
+# stepped, with plain integers for CHGF and FGIF; FGIF grows in closed
+# form in between. Other savings grow in closed form over the whole
+# tail and every other balance stays as it is.
+import numpy as np
+
+from accounts.er import ExpenseRevenueAccount
+from accounts.savings import SavingsAccount
+from util.money import CENTS_PER_DOLLAR
+from util.money import to_cents
+
+
+class SteadyTail:
+    # Days [start, stop) of a simulation, or the part of them up to the
+    # first day that leaves the steady state: an expense CHGF cannot
+    # cover, or CHGF left outside [chgf_min, max_chgf] after the day's
+    # transfers. `days` is the number of days solved, possibly zero.
+    # The accounts are only changed by apply().
+    def __init__(self, register, timeline, dates: list, start: int,
+                 stop: int, max_chgf: float, chgf_min: float) -> None:
+        self.register = register
+        self.timeline = timeline
+        self.dates = dates
+        self.start = start
+        self._chgf = register.r['CHGF']
+        self._fgif = register.r['FGIF']
+        self._growth = 1.0 + self._fgif._rate
+
+        cents = self._chgf.get_cents()
+        exact = self._fgif._account_balance + self._fgif._interest_carry
+        # Segment i starts on day index _first[i] with CHGF at _cents[i]
+        # and FGIF at _exact[i] before that day's accrual.
+        self._first = [start]
+        self._cents = [cents]
+        self._exact = [exact]
+        end = stop
+        day_index = None
+        if chgf_min <= cents / CENTS_PER_DOLLAR <= max_chgf:
+            day_index = timeline.get_next_day(start)
+        else:
+            end = start
+        while day_index is not None and day_index < stop:
+            day_cents = cents + timeline.get_income_cents(day_index)
+            expense = timeline.get_expense_cents(day_index)
+            if expense and day_cents - expense <= 0:
+                end = day_index
+                break
+            day_cents -= expense
+            exact *= self._growth ** (day_index + 1 - self._first[-1])
+            balance = int(exact)
+            carry = exact - balance
+            day_cents, balance = _transfer(
+                day_cents, balance, max_chgf, chgf_min)
+            if not chgf_min <= day_cents / CENTS_PER_DOLLAR <= max_chgf:
+                end = day_index
+                break
+            cents = day_cents
+            exact = balance + carry
+            self._first.append(day_index + 1)
+            self._cents.append(cents)
+            self._exact.append(exact)
+            day_index = timeline.get_next_day(day_index + 1)
+        self.stop = end
+        self.days = end - start
+
+    def get_income(self) -> np.ndarray:
+        # Income of each solved day, in dollars.
+        return self.timeline.income[self.start:self.stop] / CENTS_PER_DOLLAR
+
+    def get_expense(self) -> np.ndarray:
+        return self.timeline.expense[self.start:self.stop] / CENTS_PER_DOLLAR
+
+    def get_flow_offsets(self) -> list:
+        # Offsets from start of the solved days with flows.
+        entry_days = self.timeline.entry_days
+        entries = entry_days[np.searchsorted(entry_days, self.start):
+                             np.searchsorted(entry_days, self.stop)]
+        return (np.unique(entries) - self.start).tolist()
+
+    def get_balances(self, accounts: list, offsets) -> np.ndarray:
+        # Balances of `accounts` on the days start + offsets as recorded:
+        # after accrual, before the day's flows and transfers.
+        days = self.start + np.asarray(offsets, dtype=np.int64)
+        balances = np.empty((len(days), len(accounts)))
+        if len(days) == 0:
+            return balances
+        segment = np.searchsorted(self._first, days, side='right') - 1
+        for col, acnt in enumerate(accounts):
+            if acnt is self._chgf:
+                balances[:, col] = np.array(self._cents)[segment]
+            elif acnt is self._fgif:
+                first = np.array(self._first)[segment]
+                balances[:, col] = np.trunc(
+                    np.array(self._exact)[segment]
+                    * self._growth ** (days - first + 1))
+            elif isinstance(acnt, SavingsAccount):
+                balances[:, col] = np.trunc(
+                    (acnt._account_balance + acnt._interest_carry)
+                    * (1.0 + acnt._rate) ** (days - self.start + 1))
+            elif isinstance(acnt, ExpenseRevenueAccount):
+                balances[:, col] = self._get_flow_cents(acnt, days)
+            else:
+                balances[:, col] = acnt.get_cents()
+        return balances / CENTS_PER_DOLLAR
+
+    def apply(self) -> None:
+        # Moves the accounts to the state after the solved days.
+        if self.days == 0:
+            return
+        exact = self._exact[-1] \
+            * self._growth ** (self.stop - self._first[-1])
+        self._chgf._account_balance = self._cents[-1]
+        self._fgif._account_balance = int(exact)
+        self._fgif._interest_carry = exact - int(exact)
+        for acnt in self.register.savings.values():
+            if acnt is not self._fgif:
+                acnt.accrue_days(self.days)
+        self.timeline.sync(self.stop)
+
+    def _get_flow_cents(self, acnt, days: np.ndarray) -> np.ndarray:
+        timeline = self.timeline
+        cents = np.zeros(len(days))
+        positions = [k for k, flow in enumerate(timeline.accounts)
+                     if flow is acnt]
+        fires = np.isin(timeline.entry_accounts, positions)
+        fire_days = timeline.entry_days[fires]
+        rows = np.searchsorted(days, fire_days)
+        hit = rows < len(days)
+        hit[hit] = days[rows[hit]] == fire_days[hit]
+        cents[rows[hit]] = timeline.entry_cents[fires][hit]
+        return cents
+
+
+def _transfer(cents: int, balance: int, max_chgf: float,
+              chgf_min: float):
+    # CHGF and FGIF cents after DailySim.do_transfers.
+    chgf = cents / CENTS_PER_DOLLAR
+    if chgf > max_chgf:
+        amount = to_cents(chgf - max_chgf)
+        if cents - amount > 0:
+            return cents - amount, balance + amount
+    elif chgf < chgf_min:
+        required = chgf_min - chgf
+        if balance / CENTS_PER_DOLLAR >= required:
+            amount = to_cents(required)
+            if balance - amount > 0:
+                return cents + amount, balance - amount
+    return cents, balance
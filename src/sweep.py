@@ -0,0 +1,154 @@
+import copy
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from accounts.chart_of_accounts import get_chart_of_accounts
+from dailysim import DailySim
+from util.config import get_config
+from util.recorder import HEADER
+from util.scenario_store import FAILED
+from util.scenario_store import ScenarioStore
+from util.scenario_store import WRITTEN
+from util.scenario_store import get_meta_path
+
+# Charts of accounts parsed by this process, keyed by CSV path, with
+# the file's (mtime, size) when it was parsed.
+_charts = {}
+# Scenario stores opened for writing by this process, keyed by path,
+# with their sidecar's (mtime, inode).
+_stores = {}
+
+
+def get_scenarios(sweep: dict) -> list:
+    # A sweep has a 'grid' of key -> list of values, a list of
+    # 'scenarios' (override dicts), or both; every grid point is
+    # combined with every listed scenario.
+    grid = sweep.get('grid', {})
+    keys = list(grid.keys())
+    grid_points = [dict(zip(keys, values))
+                   for values in itertools.product(*grid.values())]
+    listed = sweep.get('scenarios') or [{}]
+
+    scenarios = []
+    for point in grid_points:
+        for overrides in listed:
+            scenarios.append(merge_config(point, overrides))
+    return scenarios
+
+
+def merge_config(config: dict, overrides: dict) -> dict:
+    merged = dict(config)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def run_sweep(config: dict, sweep: dict, workers=None, store=None):
+    # With `store`, a path, every scenario's daily results are written
+    # into a ScenarioStore there, in scenario order.
+    scenarios = get_scenarios(sweep)
+    if workers is None:
+        workers = sweep.get('workers', os.cpu_count())
+    if store is not None:
+        create_store(store, config, scenarios)
+    jobs = [(config, overrides, store, index)
+            for index, overrides in enumerate(scenarios)]
+    chunksize = max(1, len(jobs) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        summaries = list(pool.map(_run_job, jobs, chunksize=chunksize))
+
+    table = pd.DataFrame(summaries)
+    table.index.name = 'Scenario'
+    return table
+
+
+def run_scenario(config: dict, overrides: dict, store=None,
+                 index=None) -> dict:
+    # A scenario that cannot be built or run, say an unknown rates name
+    # or a missing accounts file, is recorded in its row and the sweep
+    # carries on.
+    scenario_config = merge_config(config, overrides)
+    summary = _flatten(overrides)
+    if store is not None:
+        store = _get_store(store)
+    try:
+        ds = DailySim.from_config(
+            scenario_config, chart=load_chart(scenario_config['accounts']))
+        if store is not None:
+            store.attach(index, ds)
+        ds.simulate()
+    except (ValueError, KeyError, OSError) as e:
+        summary['Error'] = type(e).__name__ + ': ' + str(e)
+        if store is not None:
+            store.set_status(index, FAILED)
+        return summary
+    if store is not None:
+        store.set_status(index, WRITTEN)
+    summary.update(summarize(ds))
+    return summary
+
+
+def create_store(path: str, config: dict, scenarios: list):
+    # ScenarioStore with the days and columns the base config records.
+    ds = DailySim.from_config(config, chart=load_chart(config['accounts']))
+    return ScenarioStore.create(
+        path, ds.get_recorded_days(),
+        HEADER + ds.get_recorded_accounts(), scenarios)
+
+
+def summarize(ds: DailySim) -> dict:
+    summary = {
+        'CumulativeInterest': ds.get_cum_int(),
+        'FGIFFinalBalance': ds.ca.r['FGIF'].get_balance()
+    }
+    for name in ds.ca.loans:
+        summary['Payoff ' + name] = ds.payoff_dates.get(name)
+    summary.update(ds.get_aggregates())
+    return summary
+
+
+def load_chart(path):
+    # Copy of the chart at `path`, parsed once per process and again
+    # only if the file changes, as it may under a long-running server.
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    if path not in _charts or _charts[path][0] != version:
+        _charts[path] = (version, get_chart_of_accounts(path))
+    return copy.deepcopy(_charts[path][1])
+
+
+def _get_store(path: str) -> ScenarioStore:
+    # Mapped once per worker and sweep; every scenario the worker runs
+    # writes through it.
+    stat = os.stat(get_meta_path(path))
+    version = (stat.st_mtime_ns, stat.st_ino)
+    if path not in _stores or _stores[path][0] != version:
+        _stores[path] = (version, ScenarioStore(path, 'r+'))
+    return _stores[path][1]
+
+
+def _run_job(job) -> dict:
+    return run_scenario(*job)
+
+
+def _flatten(overrides: dict, prefix='') -> dict:
+    flat = {}
+    for key, value in overrides.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, prefix + str(key) + '.'))
+        else:
+            flat[prefix + str(key)] = value
+    return flat
+
+
+def load_sweep(path) -> dict:
+    sweep = get_config(path)
+    if isinstance(sweep, list):
+        sweep = {'scenarios': sweep}
+    return sweep
@@ -0,0 +1,160 @@
+# Append-only record of the transfers made by do_transaction, stored
+# column by column in typed arrays.
+from array import array
+from bisect import bisect_left
+from datetime import date
+
+import numpy as np
+
+from .transaction import do_transaction
+from .transaction_states import TransactionState
+from util.daterange import parse_date
+from util.money import CENTS_PER_DOLLAR
+from util.money import to_cents
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_COLUMNS = (('_days', 'i'), ('_from', 'i'), ('_to', 'i'),
+            ('_amount', 'q'), ('_state', 'b'), ('_error', 'b'))
+_STATE_VALUES = {state: state.value for state in TransactionState}
+
+
+class Journal:
+    def __init__(self, max_entries=None) -> None:
+        # With max_entries set the journal is a ring buffer that keeps
+        # only the latest max_entries transfers.
+        if max_entries is not None and max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self.day = None
+        self._day_number = None
+        self.names = []
+        self._ids = {}
+        # Entry numbers of the transfers touching each account, ascending.
+        self._by_account = []
+        self._count = 0
+        for column, typecode in _COLUMNS:
+            values = array(typecode)
+            if max_entries is not None:
+                values = array(typecode, [0]) * max_entries
+            setattr(self, column, values)
+
+    def set_day(self, day) -> None:
+        # Day recorded by do_transaction.
+        self.day = day
+        self._day_number = day.toordinal() - _EPOCH_ORDINAL
+
+    def do_transaction(self, money_from, money_to, amount: float):
+        # do_transaction that records the transfer on the current day.
+        result = do_transaction(money_from, money_to, amount)
+        self._append(
+            self._day_number,
+            self._get_id(money_from.get_name()),
+            self._get_id(money_to.get_name()),
+            to_cents(amount),
+            _STATE_VALUES[result[0]],
+            result[1])
+        return result
+
+    def record(self, day, name_from: str, name_to: str, amount: float,
+               state: TransactionState, error_no: int) -> None:
+        self._append(
+            day.toordinal() - _EPOCH_ORDINAL,
+            self._get_id(name_from),
+            self._get_id(name_to),
+            to_cents(amount),
+            state.value,
+            error_no)
+
+    def _append(self, day_number: int, id_from: int, id_to: int,
+                cents: int, state_value: int, error_no: int) -> None:
+        entry = self._count
+        if self.max_entries is None:
+            self._days.append(day_number)
+            self._from.append(id_from)
+            self._to.append(id_to)
+            self._amount.append(cents)
+            self._state.append(state_value)
+            self._error.append(error_no)
+            self._by_account[id_from].append(entry)
+            if id_to != id_from:
+                self._by_account[id_to].append(entry)
+        else:
+            position = entry % self.max_entries
+            self._days[position] = day_number
+            self._from[position] = id_from
+            self._to[position] = id_to
+            self._amount[position] = cents
+            self._state[position] = state_value
+            self._error[position] = error_no
+            self._add_to_ring_index(id_from, entry)
+            if id_to != id_from:
+                self._add_to_ring_index(id_to, entry)
+        self._count = entry + 1
+
+    def __len__(self) -> int:
+        if self.max_entries is None:
+            return self._count
+        return min(self._count, self.max_entries)
+
+    def entries(self, account=None, start=None, end=None):
+        # DataFrame of the transfers from or to `account` (default: all)
+        # dated in [start, end), oldest first.
+        import pandas as pd
+        first = self._count - len(self)
+        if account is None:
+            numbers = np.arange(first, self._count)
+        elif account in self._ids:
+            numbers = self._by_account[self._ids[account]]
+            numbers = np.frombuffer(numbers, dtype=np.int64)
+            numbers = numbers[np.searchsorted(numbers, first):]
+        else:
+            numbers = np.arange(0)
+        positions = numbers
+        if self.max_entries is not None:
+            positions = numbers % self.max_entries
+
+        days = np.frombuffer(self._days, dtype=np.int32)[positions]
+        keep = np.ones(len(days), dtype=bool)
+        if start is not None:
+            keep &= days >= _get_day_number(start)
+        if end is not None:
+            keep &= days < _get_day_number(end)
+        positions = positions[keep]
+
+        names = np.array(self.names, dtype=object)
+        states = np.array([state.name for state in TransactionState],
+                          dtype=object)
+        ids_from = np.frombuffer(self._from, dtype=np.int32)[positions]
+        ids_to = np.frombuffer(self._to, dtype=np.int32)[positions]
+        cents = np.frombuffer(self._amount, dtype=np.int64)[positions]
+        state_values = np.frombuffer(self._state, dtype=np.int8)[positions]
+        return pd.DataFrame(
+            data={
+                'From': names[ids_from],
+                'To': names[ids_to],
+                'Amount': cents / CENTS_PER_DOLLAR,
+                'State': states[state_values],
+                'Error': np.frombuffer(self._error, dtype=np.int8)[positions]
+            },
+            index=pd.DatetimeIndex(
+                days[keep].astype('datetime64[D]'), name='Day'))
+
+    def _get_id(self, name: str) -> int:
+        account_id = self._ids.get(name)
+        if account_id is None:
+            account_id = len(self.names)
+            self._ids[name] = account_id
+            self.names.append(name)
+            self._by_account.append(array('q'))
+        return account_id
+
+    def _add_to_ring_index(self, account_id: int, entry: int) -> None:
+        numbers = self._by_account[account_id]
+        if len(numbers) >= self.max_entries:
+            # Drop entries the ring buffer has already overwritten.
+            del numbers[:bisect_left(numbers, entry + 1 - self.max_entries)]
+        numbers.append(entry)
+
+
+def _get_day_number(day) -> int:
+    return parse_date(day).toordinal() - _EPOCH_ORDINAL
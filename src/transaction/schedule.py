@@ -0,0 +1,36 @@
+import heapq
+from datetime import date
+
+
+class Schedule:
+    def __init__(self) -> None:
+        self._items = {}
+        self._dates = []
+
+    def add(self, day: date, item) -> None:
+        if day not in self._items:
+            self._items[day] = []
+            heapq.heappush(self._dates, day)
+        self._items[day].append(item)
+
+    def extend(self, entries) -> None:
+        for day, item in entries:
+            self.add(day, item)
+
+    def pop(self, day: date) -> list:
+        return self._items.pop(day, ())
+
+    def next_date(self, day: date):
+        # Earliest date on or after `day` that still has items, or None.
+        while self._dates and (
+                self._dates[0] < day or self._dates[0] not in self._items):
+            heapq.heappop(self._dates)
+        return self._dates[0] if self._dates else None
+
+    def __len__(self) -> int:
+        return sum(len(items) for items in self._items.values())
+
+    def __iter__(self):
+        for day in sorted(self._items):
+            for item in self._items[day]:
+                yield day, item
@@ -1,13 +1,20 @@
 from .transaction_states import TransactionState
 
 from accounts.account import Account
+from util.money import to_cents
+
+# Results are shared rather than built per call.
+_ACCEPTED = (TransactionState.TRANSACTION_ACCEPTED, 0)
+_DECLINED_FROM = (TransactionState.TRANSACTION_DECLINED, 1)
+_DECLINED_TO = (TransactionState.TRANSACTION_DECLINED, 2)
 
 
 def do_transaction(money_from: Account, money_to: Account, amount: float):
-    ts = money_from.credit(amount=amount)
+    cents = to_cents(amount)
+    ts = money_from.credit_cents(cents)
     if ts == TransactionState.TRANSACTION_DECLINED:
-        return (TransactionState.TRANSACTION_DECLINED, 1)
-    ts = money_to.debit(amount=amount)
+        return _DECLINED_FROM
+    ts = money_to.debit_cents(cents)
     if ts == TransactionState.TRANSACTION_DECLINED:
-        return (TransactionState.TRANSACTION_DECLINED, 2)
-    return (TransactionState.TRANSACTION_ACCEPTED, 0)
+        return _DECLINED_TO
+    return _ACCEPTED
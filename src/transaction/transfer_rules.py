@@ -0,0 +1,200 @@
+# Cash movement between cash and savings accounts after each day's
+# flows, declared as rules in the config:
+#
+#   transfer_rules:
+#     - account: CHGF
+#       ceiling: 7500         # what is above goes to sweep_to, in order,
+#       sweep_to:             # each filled up to its own ceiling
+#         - {account: SAV1, ceiling: 20000}
+#         - FGIF
+#       floor: 1000           # what is below is drawn from draw_from:
+#       draw_from:            # from the first source that covers it all
+#         - {account: SAV1, floor: 5000}     # and keeps its own floor,
+#         - FGIF              # or with partial, from each in turn
+#       partial: false
+#       priority: 0           # lower runs first; ties run as listed
+#   expense_fallback: [SAV1, FGIF]
+#
+# Rules are compiled once into a flat list of operations bound to their
+# accounts, which DailySim.do_transfers runs in order every day.
+import numpy as np
+
+from accounts.checking import CheckingAccount
+from accounts.savings import SavingsAccount
+from util.money import CENTS_PER_DOLLAR
+from util.money import to_cents
+
+RULE_KEYS = ('account', 'ceiling', 'sweep_to', 'floor', 'draw_from',
+             'partial', 'priority')
+
+
+class SweepExcess:
+    # Moves what `source` holds above `ceiling` into `targets`, a list of
+    # (account, ceiling or None), filling each up to its ceiling in turn.
+    # Amounts are whole cents.
+    __slots__ = ('source', 'ceiling', 'targets', '_transfer')
+
+    def __init__(self, transfer, source, ceiling: int, targets: list):
+        self._transfer = transfer
+        self.source = source
+        self.ceiling = ceiling
+        self.targets = targets
+
+    def __call__(self) -> None:
+        excess = self.source.get_cents() - self.ceiling
+        if excess <= 0:
+            return
+        for target, ceiling in self.targets:
+            amount = excess
+            if ceiling is not None:
+                amount = min(excess, ceiling - target.get_cents())
+            if amount > 0:
+                self._transfer(self.source, target,
+                               amount / CENTS_PER_DOLLAR)
+                excess -= amount
+                if excess <= 0:
+                    return
+
+    def get_quiet_span(self, span: int) -> int:
+        # Days of a quiet span, in which only interest accrues, before
+        # this moves money.
+        path = _get_cents_path(self.source, span)
+        if path is None:
+            return 0 if self.source.get_cents() > self.ceiling else span
+        return _first(path > self.ceiling, span)
+
+
+class TopUp:
+    # Draws what `target` lacks below `floor` from `sources`, a list of
+    # (account, floor). A source never drops below its floor, nor to
+    # zero, which CheckingAccount.credit_cents declines.
+    __slots__ = ('target', 'floor', 'sources', 'partial', '_transfer')
+
+    def __init__(self, transfer, target, floor: int, sources: list,
+                 partial=False):
+        self._transfer = transfer
+        self.target = target
+        self.floor = floor
+        self.sources = sources
+        self.partial = partial
+
+    def __call__(self) -> None:
+        need = self.floor - self.target.get_cents()
+        if need <= 0:
+            return
+        for source, floor in self.sources:
+            if source.get_cents() - max(floor, 1) >= need:
+                self._transfer(source, self.target, need / CENTS_PER_DOLLAR)
+                return
+        if not self.partial:
+            return
+        for source, floor in self.sources:
+            amount = min(need, source.get_cents() - max(floor, 1))
+            if amount > 0:
+                self._transfer(source, self.target,
+                               amount / CENTS_PER_DOLLAR)
+                need -= amount
+                if need <= 0:
+                    return
+
+    def get_quiet_span(self, span: int) -> int:
+        need = self.floor - self.target.get_cents()
+        if need <= 0:
+            return span
+        if isinstance(self.target, SavingsAccount):
+            # Its shortfall shrinks as it earns interest.
+            return 0
+        for source, floor in self.sources:
+            path = _get_cents_path(source, span)
+            if path is None:
+                path = np.full(span, source.get_cents())
+            available = path - max(floor, 1)
+            if self.partial:
+                span = _first(available > 0, span)
+            else:
+                span = _first(available >= need, span)
+        return span
+
+
+def get_default_rules(max_chgf: float, chgf_min: float) -> list:
+    # The built-in sweep: CHGF kept between chgf_min and max_chgf
+    # through FGIF.
+    return [{'account': 'CHGF', 'ceiling': max_chgf, 'sweep_to': ['FGIF'],
+             'floor': chgf_min, 'draw_from': ['FGIF']}]
+
+
+def compile_transfer_rules(rules: list, register, transfer) -> list:
+    # Operations of `rules`, in the order they run. `transfer` is called
+    # as transfer(from, to, dollars) for every movement.
+    ops = []
+    order = sorted(range(len(rules)),
+                   key=lambda i: (rules[i].get('priority', 0), i))
+    for i in order:
+        rule = rules[i]
+        unknown = set(rule) - set(RULE_KEYS)
+        if unknown:
+            raise ValueError("Unknown transfer rule keys: " +
+                             ', '.join(sorted(map(str, unknown))))
+        if 'account' not in rule:
+            raise ValueError("Transfer rule needs an 'account'")
+        account = _get_account(register, rule['account'])
+        if 'ceiling' in rule and 'floor' in rule \
+                and rule['floor'] > rule['ceiling']:
+            raise ValueError("Transfer rule floor above its ceiling: " +
+                             rule['account'])
+        if 'ceiling' in rule:
+            ops.append(SweepExcess(
+                transfer, account, to_cents(rule['ceiling']),
+                _get_chain(register, rule, 'sweep_to', 'ceiling', None)))
+        if 'floor' in rule:
+            ops.append(TopUp(
+                transfer, account, to_cents(rule['floor']),
+                _get_chain(register, rule, 'draw_from', 'floor', 0),
+                bool(rule.get('partial', False))))
+    return ops
+
+
+def get_fallback_accounts(names: list, register) -> list:
+    # Accounts that pay, in order, what CHGF cannot.
+    return [_get_account(register, name) for name in names]
+
+
+def _get_chain(register, rule: dict, key: str, limit: str, default):
+    # [(account, limit in cents)] of a rule's sweep_to or draw_from list,
+    # whose entries are account names or {account, limit} mappings.
+    chain = rule.get(key)
+    if not chain:
+        raise ValueError("Transfer rule for " + str(rule['account']) +
+                         " needs '" + key + "'")
+    if isinstance(chain, (str, dict)):
+        chain = [chain]
+    accounts = []
+    for entry in chain:
+        if not isinstance(entry, dict):
+            entry = {'account': entry}
+        value = entry.get(limit)
+        accounts.append((_get_account(register, entry.get('account')),
+                         default if value is None else to_cents(value)))
+    return accounts
+
+
+def _get_account(register, name):
+    acnt = register.r.get(name)
+    if acnt is None:
+        raise ValueError("Unknown account in transfer rules: " + str(name))
+    if not isinstance(acnt, CheckingAccount):
+        raise ValueError("Transfer rules move money between CASH and "
+                         "SAVINGS accounts only: " + str(name))
+    return acnt
+
+
+def _get_cents_path(acnt, span: int):
+    # Balances in cents after each accrual of a quiet span, or None if
+    # the balance does not change.
+    if not isinstance(acnt, SavingsAccount):
+        return None
+    return np.rint(acnt.get_balance_path(span) * CENTS_PER_DOLLAR)
+
+
+def _first(hits: np.ndarray, span: int) -> int:
+    return int(np.argmax(hits)) if hits.any() else span
@@ -0,0 +1,197 @@
+# Online summaries of a DailySim run, updated as each day is simulated,
+# so they need neither the recorded daily table nor a scan of it:
+#
+#   ds.add_aggregator(MinBalance('CHGF'))
+#   ds.add_aggregator(Threshold('FGIF', 100000))
+#   ds.simulate()
+#   ds.get_aggregates(), ds.get_milestones()
+#
+# or from a config:
+#
+#   aggregators:
+#     - {type: min_balance, account: CHGF}
+#     - {type: threshold, account: FGIF, amount: 100000}
+import numpy as np
+
+
+class Aggregator:
+    # Sees every simulated day once, in order, with the day's income and
+    # expense and the balances of `accounts` as sim_results records them:
+    # after accrual, before the day's flows and transfers. `columns` are
+    # the positions of `accounts` in the balances passed in; DailySim
+    # sets them in add_aggregator. Milestones are (day, text) pairs.
+    def __init__(self, accounts=()) -> None:
+        self.accounts = list(accounts)
+        self.columns = []
+        self.milestones = []
+
+    def update(self, day, income: float, expense: float, balances) -> None:
+        pass
+
+    def update_quiet(self, days: list, balances: np.ndarray) -> None:
+        # Days without income or expense, with one row of balances each.
+        for day, row in zip(days, balances):
+            self.update(day, 0.0, 0.0, row)
+
+    def on_loan_paid(self, day, name: str) -> None:
+        pass
+
+    def result(self) -> dict:
+        return {}
+
+
+class MinBalance(Aggregator):
+    def __init__(self, account='CHGF') -> None:
+        super().__init__([account])
+        self.minimum = None
+        self.day = None
+
+    def update(self, day, income, expense, balances) -> None:
+        balance = balances[self.columns[0]]
+        if self.minimum is None or balance < self.minimum:
+            self.minimum = balance
+            self.day = day
+
+    def update_quiet(self, days, balances) -> None:
+        i = int(np.argmin(balances[:, self.columns[0]]))
+        self.update(days[i], 0.0, 0.0, balances[i].tolist())
+
+    def result(self) -> dict:
+        name = self.accounts[0]
+        return {'Min' + name: self.minimum, 'Min' + name + 'Date': self.day}
+
+
+class Threshold(Aggregator):
+    # Milestone on the first day the balance of `account` is above (or,
+    # with above=False, below) `amount`.
+    def __init__(self, account: str, amount: float, above=True) -> None:
+        super().__init__([account])
+        self.amount = amount
+        self.above = above
+        self.day = None
+        self._key = account + ('Above ' if above else 'Below ') \
+            + '{:g}'.format(amount)
+
+    def update(self, day, income, expense, balances) -> None:
+        if self.day is None and self._crossed(balances[self.columns[0]]):
+            self._reached(day)
+
+    def update_quiet(self, days, balances) -> None:
+        if self.day is not None:
+            return
+        crossed = np.flatnonzero(self._crossed(balances[:, self.columns[0]]))
+        if len(crossed):
+            self._reached(days[crossed[0]])
+
+    def result(self) -> dict:
+        return {self._key: self.day}
+
+    def _crossed(self, balance):
+        if self.above:
+            return balance > self.amount
+        return balance < self.amount
+
+    def _reached(self, day) -> None:
+        self.day = day
+        self.milestones.append((day, '{} first {} ${:,.2f}'.format(
+            self.accounts[0], 'exceeds' if self.above else 'falls below',
+            self.amount)))
+
+
+class LoanPayoffs(Aggregator):
+    # Milestone for each loan on the day it is paid off.
+    def __init__(self) -> None:
+        super().__init__()
+        self.payoff_dates = {}
+
+    def on_loan_paid(self, day, name) -> None:
+        if name not in self.payoff_dates:
+            self.payoff_dates[name] = day
+            self.milestones.append((day, name + ' paid off'))
+
+    def result(self) -> dict:
+        return {'PaidOff ' + name: day
+                for name, day in self.payoff_dates.items()}
+
+
+class NegativeCashMonths(Aggregator):
+    # Months whose income minus expense is negative.
+    def __init__(self) -> None:
+        super().__init__()
+        self.count = 0
+        self._month = None
+        self._net = 0.0
+
+    def update(self, day, income, expense, balances) -> None:
+        month = (day.year, day.month)
+        if month != self._month:
+            if self._net < 0:
+                self.count += 1
+            self._month = month
+            self._net = 0.0
+        self._net += income - expense
+
+    def update_quiet(self, days, balances) -> None:
+        # Months inside a quiet span have no flows, so only the first and
+        # last day can change the count.
+        self.update(days[0], 0.0, 0.0, None)
+        self.update(days[-1], 0.0, 0.0, None)
+
+    def result(self) -> dict:
+        # Includes the current, possibly partial, month.
+        return {'NegativeCashMonths': self.count + (self._net < 0)}
+
+
+class Rollup(Aggregator):
+    # Income and expense totals per month or per year.
+    def __init__(self, period='month') -> None:
+        if period not in PERIODS:
+            raise ValueError("Unknown rollup period: " + str(period))
+        super().__init__()
+        self.period = period
+        self.name = PERIODS[period]
+        # [first simulated day of the period, income, expense]
+        self.rows = []
+        self._key = None
+
+    def update(self, day, income, expense, balances) -> None:
+        key = day.year if self.period == 'year' else (day.year, day.month)
+        if key != self._key:
+            self._key = key
+            self.rows.append([day, 0.0, 0.0])
+        row = self.rows[-1]
+        row[1] += income
+        row[2] += expense
+
+    def to_frame(self):
+        import pandas as pd
+        frame = pd.DataFrame(
+            data=[row[1:] for row in self.rows],
+            columns=['Income', 'Expense'],
+            index=pd.DatetimeIndex([row[0] for row in self.rows],
+                                   name='Start'))
+        frame['Net'] = frame['Income'] - frame['Expense']
+        return frame.round(2)
+
+
+# Rollup period -> name of its saved table.
+PERIODS = {'month': 'monthly', 'year': 'annual'}
+AGGREGATORS = {
+    'min_balance': MinBalance,
+    'threshold': Threshold,
+    'loan_payoffs': LoanPayoffs,
+    'negative_cash_months': NegativeCashMonths,
+    'rollup': Rollup
+}
+
+
+def make_aggregator(spec: dict) -> Aggregator:
+    # Aggregator from a config entry: its 'type' and keyword arguments.
+    spec = dict(spec)
+    kind = spec.pop('type', None)
+    if kind not in AGGREGATORS:
+        raise ValueError("Unknown aggregator type: " + str(kind))
+    try:
+        return AGGREGATORS[kind](**spec)
+    except TypeError as e:
+        raise ValueError("Bad " + kind + " aggregator: " + str(e))
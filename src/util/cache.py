@@ -0,0 +1,57 @@
+# On-disk cache shared by DailySim runs, sweep workers and cron jobs.
+# Entries are written atomically, so concurrent processes never see a
+# partial file, and an unusable cache only costs the work it would save.
+import hashlib
+import os
+import tempfile
+
+CACHE_DIR_ENV = 'DAILYSIM_CACHE_DIR'
+
+
+def get_cache_dir(*parts: str) -> str:
+    # $DAILYSIM_CACHE_DIR, else $XDG_CACHE_HOME/dailysim, else
+    # ~/.cache/dailysim.
+    root = os.environ.get(CACHE_DIR_ENV)
+    if not root:
+        base = os.environ.get('XDG_CACHE_HOME') or \
+            os.path.join(os.path.expanduser('~'), '.cache')
+        root = os.path.join(base, 'dailysim')
+    return os.path.join(root, *parts)
+
+
+def hash_bytes(*chunks: bytes) -> str:
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_entry(path: str):
+    # Bytes stored at `path`, or None.
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def write_entry(path: str, data: bytes) -> bool:
+    # Stores `data` at `path` atomically. False if the cache is not
+    # writable.
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    except OSError:
+        return False
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        return False
+    return True
@@ -3,6 +3,10 @@ try:
     from yaml import CLoader as Loader, CDumper as Dumper
 except ImportError:
     from yaml import Loader, Dump
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
 
 def get_config(path):
@@ -10,3 +14,10 @@ def get_config(path):
     with open(path, 'r') as f:
         config = yaml.load(f, Loader=Loader)
     return config
+
+
+def get_safe_config(path):
+    # get_config limited to plain YAML types, for configs named by
+    # requests from other processes.
+    with open(path, 'r') as f:
+        return yaml.load(f, Loader=SafeLoader)
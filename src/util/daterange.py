@@ -1,5 +1,7 @@
+from datetime import date
 from datetime import datetime as dt
 from datetime import timedelta
+from functools import lru_cache
 
 
 def get_date_range(sdate: str, edate: str):
@@ -7,3 +9,23 @@ def get_date_range(sdate: str, edate: str):
     edate = dt.strptime(edate, "%m/%d/%Y")
     return [(sdate + timedelta(days=x)).date()
             for x in range((edate - sdate).days)]
+
+
+def parse_date(day) -> date:
+    if isinstance(day, dt):
+        return day.date()
+    if isinstance(day, date):
+        return day
+    return _parse_date_str(day)
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_str(day: str) -> date:
+    # Same format as strptime("%m/%d/%Y") at a fraction of the cost.
+    try:
+        month, mday, year = day.split('/')
+        if len(year) != 4:
+            raise ValueError
+        return date(int(year), int(month), int(mday))
+    except ValueError:
+        raise ValueError("Invalid date '" + str(day) + "', expected MM/DD/YYYY")
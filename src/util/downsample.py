@@ -0,0 +1,72 @@
+# Reduces long series to a bounded number of points for plotting while
+# keeping their visible shape.
+import numpy as np
+
+METHODS = ('minmax', 'lttb', 'none')
+# About two points per pixel column of a 10 inch, 100 dpi figure.
+MAX_POINTS = 2000
+
+
+def downsample(x: np.ndarray, y: np.ndarray, method='minmax',
+               max_points=MAX_POINTS):
+    # (x, y) reduced to at most about max_points points.
+    if method == 'minmax':
+        index = minmax_indices(y, max_points)
+    elif method == 'lttb':
+        index = lttb_indices(_as_numbers(x), y, max_points)
+    elif method == 'none':
+        return x, y
+    else:
+        raise ValueError("Unknown downsample method: " + str(method))
+    return x[index], y[index]
+
+
+def minmax_indices(y: np.ndarray, max_points: int) -> np.ndarray:
+    # First and last points plus the lowest and highest point of each of
+    # (max_points - 2) / 2 equal buckets, so every peak and trough is
+    # kept.
+    n = len(y)
+    buckets = (max_points - 2) // 2
+    if n <= max_points or buckets < 1:
+        return np.arange(n)
+    inner = np.arange(1, n - 1)
+    bucket = (inner - 1) * buckets // (n - 2)
+    order = inner[np.lexsort((y[inner], bucket))]
+    starts = np.searchsorted(bucket, np.arange(buckets))
+    ends = np.append(starts[1:], len(inner)) - 1
+    # `bucket` is ascending, so sorting by it keeps each bucket's slice;
+    # its first point is the lowest and its last the highest.
+    return np.unique(np.concatenate(
+        ([0], order[starts], order[ends], [n - 1])))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int):
+    # Largest-Triangle-Three-Buckets: one point per bucket, the one that
+    # forms the largest triangle with the previous pick and the average
+    # of the next bucket.
+    n = len(y)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    picked = np.empty(max_points, dtype=np.int64)
+    picked[0] = 0
+    a = 0
+    for i in range(max_points - 2):
+        start, stop = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[stop:edges[i + 2]].mean()
+            next_y = y[stop:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+        area = np.abs((x[a] - next_x) * (y[start:stop] - y[a])
+                      - (x[a] - x[start:stop]) * (next_y - y[a]))
+        a = start + int(np.argmax(area))
+        picked[i + 1] = a
+    picked[-1] = n - 1
+    return picked
+
+
+def _as_numbers(x: np.ndarray) -> np.ndarray:
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[D]').astype(np.float64)
+    return x.astype(np.float64)
@@ -1,2 +1,23 @@
+import math
+
+# Account balances are kept as integer cents. Interest accrues in
+# fractional cents. Loan interest is rounded half up to a whole cent
+# when it is billed or settled; savings interest is posted in whole
+# cents, truncated, and the fraction is carried to the next day.
+CENTS_PER_DOLLAR = 100
+
+
 def format_currency(c):
     return '${:,.2f}'.format(c)
+
+
+def to_cents(dollars: float) -> int:
+    return math.floor(dollars * CENTS_PER_DOLLAR + 0.5)
+
+
+def to_dollars(cents) -> float:
+    return cents / CENTS_PER_DOLLAR
+
+
+def round_cents(cents: float) -> int:
+    return math.floor(cents + 0.5)
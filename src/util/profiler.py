@@ -0,0 +1,71 @@
+# Opt-in timers and counters for a DailySim run. Nothing here is on the
+# simulation path unless DailySim.enable_profile() is called.
+import json
+import time
+from collections import Counter
+
+
+class SimProfile:
+    def __init__(self) -> None:
+        self.seconds = {}
+        self.calls = Counter()
+        self.counters = Counter()
+        # (TransactionState name, error number) -> declined transfers.
+        self.declines = Counter()
+
+    def timed(self, phase: str, func):
+        # func wrapped to add its run time to `phase`.
+        seconds = self.seconds
+        calls = self.calls
+        seconds.setdefault(phase, 0.0)
+        perf_counter = time.perf_counter
+
+        def timed_func(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                seconds[phase] += perf_counter() - start
+                calls[phase] += 1
+        return timed_func
+
+    def counted(self, do_transaction):
+        # do_transaction wrapped to count transfers and declines.
+        counters = self.counters
+        declines = self.declines
+        counters.setdefault('transactions', 0)
+
+        def counted_transaction(money_from, money_to, amount):
+            result = do_transaction(money_from, money_to, amount)
+            counters['transactions'] += 1
+            if result[1]:
+                declines[(result[0].name, result[1])] += 1
+            return result
+        return counted_transaction
+
+    def count(self, name: str, n=1) -> None:
+        self.counters[name] += n
+
+    def to_dict(self) -> dict:
+        phases = {}
+        for phase, seconds in self.seconds.items():
+            calls = self.calls[phase]
+            if not calls:
+                continue
+            phases[phase] = {
+                'calls': calls,
+                'seconds': seconds,
+                'us_per_call': 1e6 * seconds / calls
+            }
+        declines = {}
+        for (state, error_no), n in sorted(self.declines.items()):
+            declines.setdefault(state, {})[str(error_no)] = n
+        return {
+            'phases': phases,
+            'counters': dict(self.counters),
+            'declines': declines
+        }
+
+    def write(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
@@ -0,0 +1,83 @@
+from bisect import bisect_left
+
+import numpy as np
+
+HEADER = ['Income', 'Expense']
+
+
+class ResultRecorder:
+    # `out`, if given, is the (recorded days, columns) float array rows
+    # are written into, such as a ScenarioStore slice.
+    def __init__(self, dates, accounts, every=1, out=None) -> None:
+        self.accounts = list(accounts)
+        self.columns = HEADER + self.accounts
+        day_rows = get_sampled_days(dates, every)
+        self._day_rows = day_rows
+        # For bisecting without numpy call overhead.
+        self._day_list = day_rows.tolist()
+
+        self._row_of_day = np.full(len(dates), -1, dtype=np.int64)
+        self._row_of_day[day_rows] = np.arange(len(day_rows))
+        shape = (len(day_rows), len(self.columns))
+        if out is None:
+            out = np.zeros(shape)
+        elif out.shape != shape:
+            raise ValueError("Result array of shape " + str(out.shape) +
+                             " does not fit " + str(shape) + " results")
+        self.data = out
+        self.days = get_days(dates)[day_rows]
+
+    def row_of(self, day_index: int) -> int:
+        return self._row_of_day[day_index]
+
+    def rows_before(self, day_index: int) -> int:
+        return bisect_left(self._day_list, day_index)
+
+    def rows_between(self, start: int, stop: int):
+        # (day offsets from start, slice of result rows) recorded in
+        # [start, stop).
+        first = bisect_left(self._day_list, start)
+        last = bisect_left(self._day_list, stop, first)
+        return self._day_rows[first:last] - start, slice(first, last)
+
+    def record(self, row: int, income: float, expense: float, balances):
+        data = self.data[row]
+        data[0] = income
+        data[1] = expense
+        data[2:] = balances
+
+    def record_rows(self, rows, income, expense, balances):
+        self.data[rows, 0] = income
+        self.data[rows, 1] = expense
+        self.data[rows, 2:] = balances
+
+    def to_frame(self, day_index=None, decimals=2):
+        # Rows recorded before `day_index`, or all rows.
+        import pandas as pd
+        rows = len(self.data)
+        if day_index is not None:
+            rows = self.rows_before(day_index)
+        return pd.DataFrame(
+            data=np.round(self.data[:rows], decimals),
+            columns=self.columns,
+            index=pd.DatetimeIndex(self.days[:rows]))
+
+
+def get_days(dates) -> np.ndarray:
+    # `dates`, consecutive days, as datetime64[D] without converting
+    # each date.
+    if not len(dates):
+        return np.array([], dtype='datetime64[D]')
+    return np.datetime64(dates[0], 'D') + np.arange(len(dates))
+
+
+def get_sampled_days(dates, every) -> np.ndarray:
+    if every == 'month_end':
+        days = get_days(dates)
+        next_days = days + np.timedelta64(1, 'D')
+        is_month_end = next_days.astype('datetime64[M]') \
+            != days.astype('datetime64[M]')
+        return np.flatnonzero(is_month_end)
+    if isinstance(every, int) and every > 0:
+        return np.arange(0, len(dates), every)
+    raise ValueError("record_every must be a positive int or 'month_end'")
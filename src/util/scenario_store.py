@@ -0,0 +1,128 @@
+# Daily results of many scenarios in one memory-mapped file, a
+# scenario x day x column cube of float64, next to a JSON sidecar with
+# its columns, days and the overrides of each scenario:
+#
+#   store = ScenarioStore.create('results/sweep.dat', days, columns,
+#                                scenarios)
+#   store.attach(i, ds); ds.simulate(); store.set_status(i, WRITTEN)
+#
+#   store = ScenarioStore('results/sweep.dat')
+#   store.get_scenario(3)         # (days, columns) view
+#   store.get_account('FGIF')     # (scenarios, days) view
+#
+# Slices are views of the mapping, so reading one account across every
+# scenario never copies the cube. Each scenario's rows are contiguous,
+# so processes can write different scenarios at the same time; a byte
+# per scenario ahead of the cube records which ones are complete.
+import json
+import mmap
+import os
+
+import numpy as np
+
+from .recorder import HEADER
+
+STORE_VERSION = 1
+# Scenario status bytes.
+EMPTY = 0
+WRITTEN = 1
+FAILED = 2
+
+
+class ScenarioStore:
+    def __init__(self, path: str, mode='r') -> None:
+        # Opens an existing store; mode is 'r' or 'r+' to write.
+        with open(get_meta_path(path)) as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_VERSION:
+            raise ValueError("Unsupported scenario store version: " +
+                             str(meta.get('version')))
+        self.path = path
+        self.columns = meta['columns']
+        self.days = np.array(meta['days'], dtype='datetime64[D]')
+        self.scenarios = meta['scenarios']
+        shape = (len(self.scenarios), len(self.days), len(self.columns))
+        self.status = np.memmap(path, dtype=np.uint8, mode=mode,
+                                shape=(shape[0],))
+        self.data = np.memmap(path, dtype=np.float64, mode=mode,
+                              offset=meta['offset'], shape=shape)
+        self._column_of = {name: i for i, name in enumerate(self.columns)}
+
+    @classmethod
+    def create(cls, path: str, days, columns: list, scenarios: list):
+        # Empty store for `scenarios` (override dicts), replacing any
+        # store at `path`, opened for writing.
+        days = np.asarray(days, dtype='datetime64[D]')
+        offset = _align(len(scenarios))
+        size = offset + len(scenarios) * len(days) * len(columns) * 8
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # The file is sparse until scenarios are written.
+        with open(path, 'wb') as f:
+            f.truncate(max(size, 1))
+        meta = {
+            'version': STORE_VERSION,
+            'offset': offset,
+            'columns': list(columns),
+            'days': [str(day) for day in days],
+            'scenarios': scenarios
+        }
+        # The sidecar appears last and whole: it marks a usable store.
+        temp_path = get_meta_path(path) + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(meta, f, default=str)
+        os.replace(temp_path, get_meta_path(path))
+        return cls(path, 'r+')
+
+    def __len__(self) -> int:
+        return len(self.scenarios)
+
+    def get_scenario(self, index: int) -> np.ndarray:
+        # (days, columns) view of one scenario.
+        return self.data[index]
+
+    def get_account(self, name: str) -> np.ndarray:
+        # (scenarios, days) view of one column across every scenario.
+        if name not in self._column_of:
+            raise ValueError("Not in the scenario store: " + str(name))
+        return self.data[:, :, self._column_of[name]]
+
+    def get_written(self) -> np.ndarray:
+        # Indices of the scenarios written in full.
+        return np.flatnonzero(self.status == WRITTEN)
+
+    def set_status(self, index: int, status: int) -> None:
+        self.status[index] = status
+
+    def attach(self, index: int, ds) -> None:
+        # Makes DailySim `ds` record its run into scenario `index`.
+        columns = HEADER + ds.get_recorded_accounts()
+        if columns != self.columns:
+            raise ValueError("Scenario records other columns than the "
+                             "store: " + ', '.join(columns))
+        if not np.array_equal(ds.get_recorded_days(), self.days):
+            raise ValueError("Scenario records other days than the store")
+        self.set_status(index, EMPTY)
+        ds.record_into(self.get_scenario(index))
+
+    def to_frame(self, index: int):
+        # DataFrame of one scenario, like DailySim.sim_results.
+        import pandas as pd
+        return pd.DataFrame(
+            data=np.round(self.get_scenario(index), 2),
+            columns=self.columns,
+            index=pd.DatetimeIndex(self.days))
+
+    def flush(self) -> None:
+        self.status.flush()
+        self.data.flush()
+
+
+def get_meta_path(path: str) -> str:
+    return path + '.json'
+
+
+def _align(size: int) -> int:
+    # Cube offset: the status bytes rounded up to a whole mapping unit.
+    unit = mmap.ALLOCATIONGRANULARITY
+    return (size + unit - 1) // unit * unit
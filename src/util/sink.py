@@ -0,0 +1,100 @@
+# Streaming writers for DailySim.simulate_iter() rows. Rows are buffered
+# in a fixed size batch, so memory stays flat however long the run is.
+import numpy as np
+import pandas as pd
+
+from .recorder import HEADER
+
+
+class ResultSink:
+    def __init__(self, path: str, accounts, batch_rows=4096) -> None:
+        self.path = path
+        self.columns = HEADER + list(accounts)
+        self._dates = np.empty(batch_rows, dtype='datetime64[D]')
+        self._data = np.empty((batch_rows, len(self.columns)))
+        self._rows = 0
+
+    def write(self, day, income: float, expense: float, balances) -> None:
+        data = self._data[self._rows]
+        data[0] = income
+        data[1] = expense
+        data[2:] = balances
+        self._dates[self._rows] = day
+        self._rows += 1
+        if self._rows == len(self._data):
+            self.flush()
+
+    def flush(self) -> None:
+        if self._rows:
+            self._write_batch(pd.DataFrame(
+                data=np.round(self._data[:self._rows], 2),
+                columns=self.columns,
+                index=pd.DatetimeIndex(self._dates[:self._rows])))
+            self._rows = 0
+
+    def close(self) -> None:
+        self.flush()
+
+    def _write_batch(self, batch: pd.DataFrame) -> None:
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class CsvSink(ResultSink):
+    def __init__(self, path: str, accounts, batch_rows=4096) -> None:
+        super().__init__(path, accounts, batch_rows)
+        self._header = True
+
+    def _write_batch(self, batch: pd.DataFrame) -> None:
+        batch.to_csv(self.path, mode='w' if self._header else 'a',
+                     header=self._header)
+        self._header = False
+
+    def close(self) -> None:
+        super().close()
+        if self._header:
+            pd.DataFrame(columns=self.columns).to_csv(self.path)
+            self._header = False
+
+
+class ParquetSink(ResultSink):
+    def __init__(self, path: str, accounts, batch_rows=4096) -> None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError(
+                "Writing Parquet results requires the pyarrow package.")
+        super().__init__(path, accounts, batch_rows)
+        self._pa = pyarrow
+        self._writer = None
+
+    def _write_batch(self, batch: pd.DataFrame) -> None:
+        table = self._pa.Table.from_pandas(batch)
+        if self._writer is None:
+            self._writer = self._pa.parquet.ParquetWriter(
+                self.path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        super().close()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def open_sink(path: str, accounts, batch_rows=4096) -> ResultSink:
+    if path.endswith('.parquet'):
+        return ParquetSink(path, accounts, batch_rows)
+    return CsvSink(path, accounts, batch_rows)
+
+
+def stream_results(ds, path: str, batch_rows=4096) -> None:
+    with open_sink(path, ds.get_recorded_accounts(), batch_rows) as sink:
+        for day, income, expense, balances in ds.simulate_iter():
+            sink.write(day, income, expense, balances)
@@ -0,0 +1,145 @@
+# Synthetic charts of accounts and configs, sized so that income always
+# covers expenses and loan payments, for benchmarking DailySim.
+import os
+import random
+from datetime import date
+from datetime import timedelta
+
+import yaml
+
+HEADER = 'Type,Name,AmountDue,NextDate,Frequency,Timebase,EndDate,Balance,Rate'
+WEEKS_PER_MONTH = 52 / 12
+
+
+def write_scenario(
+        directory: str,
+        revenue=2,
+        expense=10,
+        loans=4,
+        payments=0,
+        purchases=0,
+        years=30,
+        start=date(2025, 1, 1),
+        seed=0,
+        weekly=0.5) -> str:
+    # Writes accounts.csv and config.yaml to `directory` and returns the
+    # config path. `weekly` is the share of expenses billed weekly, and
+    # half of it the share of loans; with none, pay is monthly too.
+    rnd = random.Random(seed)
+    end = _add_years(start, years)
+    lines, loan_names, outflow = _get_chart_lines(
+        rnd, revenue, expense, loans, start, end, weekly)
+    csv_path = os.path.join(directory, 'accounts.csv')
+    with open(csv_path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    config = {
+        'start_date': _format_date(start),
+        'end_date': _format_date(end),
+        'accounts': os.path.abspath(csv_path),
+        'fast_payoff_enabled': True,
+        'max_checking_balance': round(3 * outflow, 2),
+        'payments': {},
+        'purchases': {}
+    }
+    days = (end - start).days
+    for i in range(payments if loan_names else 0):
+        config['payments']['payment' + str(i)] = {
+            'date': _format_date(start + timedelta(rnd.randrange(days))),
+            'from': 'CHGF',
+            'to': rnd.choice(loan_names),
+            'amount': round(rnd.uniform(0.1, 1.0) * outflow, 2)
+        }
+    for i in range(purchases):
+        # After two years of savings, and at most two months of outflow.
+        day = start + timedelta(min(730 + rnd.randrange(days), days - 1))
+        config['purchases']['purchase' + str(i)] = {
+            'date': _format_date(day),
+            'amount': round(rnd.uniform(0.1, 2.0) * outflow, 2)
+        }
+    config_path = os.path.join(directory, 'config.yaml')
+    with open(config_path, 'w') as f:
+        yaml.safe_dump(config, f, sort_keys=False)
+    return config_path
+
+
+def _get_chart_lines(rnd, revenue, expense, loans, start, end, weekly):
+    # Returns (CSV lines, loan names, monthly outflow).
+    ends = _format_date(_add_years(end, 1))
+    expense_lines = []
+    outflow = 0.0
+    for i in range(expense):
+        amount = rnd.uniform(5, 500)
+        if rnd.random() < weekly:
+            frequency = rnd.choice((1, 2))
+            outflow += amount * WEEKS_PER_MONTH / frequency
+            timebase = 'w'
+        else:
+            frequency = rnd.choice((1, 3))
+            outflow += amount / frequency
+            timebase = 'm'
+        expense_lines.append(_er_line(
+            'EXPENSE', 'E' + str(i), amount, _first_due(rnd, start),
+            frequency, timebase, ends))
+
+    loan_lines = []
+    loan_names = []
+    for i in range(loans):
+        principal = rnd.uniform(2000, 30000)
+        rate = rnd.uniform(3, 25)
+        payment = principal * (rate / 1200 + 1 / rnd.uniform(24, 120))
+        if rnd.random() < weekly / 2:
+            frequency = rnd.choice((1, 2))
+            payment *= frequency / WEEKS_PER_MONTH
+            outflow += payment * WEEKS_PER_MONTH / frequency
+            timebase = 'w'
+        else:
+            frequency = 1
+            outflow += payment
+            timebase = 'm'
+        name = 'L' + str(i)
+        loan_names.append(name)
+        loan_lines.append('SIMPLE LOAN,{},{},{},{},{},N/A,{},{:.2f}'.format(
+            name, _dollars(payment), _first_due(rnd, start), frequency,
+            timebase, _dollars(principal), rate))
+
+    revenue_lines = []
+    for i in range(revenue):
+        # Biweekly pay that covers 1.5 times the outflow between them.
+        amount = 1.5 * outflow / max(revenue, 1) / WEEKS_PER_MONTH * 2
+        frequency, timebase = 2, 'w'
+        if not weekly:
+            amount *= WEEKS_PER_MONTH / 2
+            frequency, timebase = 1, 'm'
+        revenue_lines.append(_er_line(
+            'REVENUE', 'JOB' + str(i), amount, _first_due(rnd, start),
+            frequency, timebase, ends))
+
+    lines = [HEADER] + revenue_lines + expense_lines + [
+        'CASH,CHGF,-,-,-,-,-,{},-'.format(_dollars(2 * outflow + 1000)),
+        'SAVINGS,FGIF,-,-,-,-,-,$0.00,{:.2f}'.format(rnd.uniform(2, 6))
+    ] + loan_lines
+    return lines, loan_names, outflow
+
+
+def _er_line(account_type, name, amount, next_date, frequency, timebase,
+             end_date) -> str:
+    return '{},{},{},{},{},{},{},-,-'.format(
+        account_type, name, _dollars(amount), next_date, frequency,
+        timebase, end_date)
+
+
+def _first_due(rnd, start: date) -> str:
+    return _format_date(start + timedelta(rnd.randint(1, 28)))
+
+
+def _dollars(amount: float) -> str:
+    return '"${:,.2f}"'.format(amount)
+
+
+def _format_date(day: date) -> str:
+    return '{}/{}/{}'.format(day.month, day.day, day.year)
+
+
+def _add_years(day: date, years: int) -> date:
+    return day.replace(year=day.year + years, day=min(day.day, 28))
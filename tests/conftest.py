@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+
+@pytest.fixture
+def cli_config():
+    # cli/cli.yaml with its chart found from any working directory.
+    from util.config import get_config
+    config = get_config(os.path.join(ROOT, 'cli', 'cli.yaml'))
+    config['accounts'] = os.path.join(ROOT, 'cli', 'accounts.csv')
+    return config
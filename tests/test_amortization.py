@@ -0,0 +1,42 @@
+import math
+import os
+
+import pytest
+
+from accounts.amortization import amortize
+from accounts.amortization import get_total_interest
+from accounts.chart_of_accounts import get_chart_of_accounts
+
+CHART = os.path.join(os.path.dirname(__file__), '..', 'cli', 'accounts.csv')
+
+
+@pytest.fixture
+def loans():
+    return get_chart_of_accounts(CHART, use_cache=False).loans
+
+
+def test_payment_below_interest_is_never_paid_off(loans):
+    # CreditCard1 pays $100 a month against about $119 of interest.
+    schedule = amortize(loans['CreditCard1'], '10/01/2024')
+    assert schedule.payoff_date is None
+    assert len(schedule.rows) == 1
+
+
+def test_until_keeps_growing_balance(loans):
+    schedule = amortize(loans['CreditCard1'], '10/01/2024',
+                        until='10/01/2026')
+    assert schedule.payoff_date is None
+    assert len(schedule.rows) == 23
+    assert schedule.rows[-1][4] > 5000
+
+
+def test_extra_payment_pays_off(loans):
+    schedule = amortize(loans['CreditCard1'], '10/01/2024',
+                        extra_payments=[('1/16/2025', 6000)])
+    assert schedule.payoff_date is not None
+
+
+def test_total_interest_of_shipped_chart(loans):
+    total_interest = get_total_interest(loans.values(), '10/01/2024')
+    assert math.isinf(total_interest['CreditCard1'])
+    assert 0 < total_interest['CreditCard2'] < math.inf
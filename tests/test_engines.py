@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+import dailysim
+from dailysim import CHGF_MIN
+from dailysim import DailySim
+from transaction.transfer_rules import get_default_rules
+
+# Largest difference in a recorded balance for a mode to match the
+# daily loop, as in benchmark.MATCH_TOLERANCE.
+TOLERANCE = 0.01 + 1e-6
+MODES = {
+    'event': {'engine': 'event'},
+    'daily+book': {'loan_book': True},
+    'event+book': {'engine': 'event', 'loan_book': True},
+    'daily+flows': {'cash_flow_timeline': True},
+    'event+flows': {'engine': 'event', 'cash_flow_timeline': True},
+    'daily+steady': {'steady_state': True},
+    'event+steady': {'engine': 'event', 'steady_state': True},
+}
+
+
+def run(config, **overrides):
+    ds = DailySim.from_config(dict(config, **overrides))
+    ds.simulate()
+    return ds
+
+
+def assert_same_run(ds, expected, tolerance=0.0):
+    assert list(ds.sim_results.index) == list(expected.sim_results.index)
+    assert np.abs(ds.sim_results.values -
+                  expected.sim_results.values).max() <= tolerance
+    assert ds.get_cum_int() == pytest.approx(expected.get_cum_int(),
+                                             abs=0.005)
+    assert ds.payoff_dates == expected.payoff_dates
+
+
+@pytest.mark.parametrize('mode', list(MODES))
+def test_modes_match_daily_loop(cli_config, monkeypatch, mode):
+    # The event engine always runs its own loop here, however few days
+    # are quiet.
+    monkeypatch.setattr(dailysim, 'MIN_QUIET_SHARE', 0.0)
+    expected = run(cli_config, loan_book=False)
+    assert_same_run(run(cli_config, **MODES[mode]), expected, TOLERANCE)
+
+
+@pytest.mark.parametrize('overrides', [{}, {'engine': 'event'}])
+def test_fork_continues_like_one_run(cli_config, overrides):
+    expected = run(cli_config, **overrides)
+    ds = DailySim.from_config(dict(cli_config, **overrides))
+    ds.simulate(until='02/01/2025')
+    snapshot = ds.snapshot()
+    ds.simulate()
+    fork = ds.fork(snapshot)
+    fork.simulate()
+    assert_same_run(fork, expected)
+    assert_same_run(ds, expected)
+
+
+def test_default_transfer_rules_match_built_in_sweep(cli_config):
+    rules = get_default_rules(cli_config['max_checking_balance'], CHGF_MIN)
+    assert_same_run(run(cli_config, transfer_rules=rules), run(cli_config))
@@ -0,0 +1,33 @@
+from dailysim import DailySim
+
+
+def test_scheduled_purchase_is_journaled(cli_config):
+    cli_config['journal'] = True
+    ds = DailySim.from_config(cli_config)
+    ds.simulate()
+    entries = ds.journal.entries('CHGF', start='10/10/2025',
+                                 end='10/11/2025')
+    purchases = entries[entries.To == 'Purchases']
+    assert purchases.Amount.tolist() == [11000.0]
+
+
+def test_purchase_fallback_is_journaled(cli_config):
+    cli_config['journal'] = True
+    cli_config['purchases']['big_purchase']['amount'] = 30000
+    ds = DailySim.from_config(cli_config)
+    ds.simulate()
+    entries = ds.journal.entries('Purchases')
+    assert entries.From.tolist() == ['CHGF', 'FGIF']
+    assert entries.State.tolist() == ['TRANSACTION_DECLINED',
+                                      'TRANSACTION_ACCEPTED']
+    assert entries.Amount.tolist() == [30000.0, 30000.0]
+
+
+def test_profile_counts_every_journaled_transfer(cli_config):
+    cli_config['journal'] = True
+    cli_config['purchases']['big_purchase']['amount'] = 30000
+    ds = DailySim.from_config(cli_config)
+    profile = ds.enable_profile()
+    ds.simulate()
+    assert profile.counters['transactions'] == len(ds.journal)
+    assert profile.declines[('TRANSACTION_DECLINED', 1)] >= 1
@@ -0,0 +1,25 @@
+from accounts.loan import SimpleLoan
+from accounts.loan_book import BookLoan
+from dailysim import DailySim
+from util.config import get_config
+from util.synthetic import write_scenario
+
+
+def test_loan_book_follows_loan_count(cli_config, tmp_path):
+    assert DailySim.from_config(cli_config)._loan_book is None
+    config = get_config(write_scenario(str(tmp_path), loans=80, years=1))
+    assert DailySim.from_config(config)._loan_book is not None
+    config['loan_book'] = False
+    assert DailySim.from_config(config)._loan_book is None
+
+
+def test_book_getters_match_properties(cli_config):
+    cli_config['loan_book'] = True
+    ds = DailySim.from_config(cli_config)
+    ds.simulate(until='06/15/2025')
+    for loan in ds.ca.loans.values():
+        assert isinstance(loan, BookLoan)
+        for name in ('get_balance', 'get_cents', 'get_amt_due',
+                     'get_payoff', 'is_loan_paid', 'is_payment_due'):
+            assert getattr(loan, name)() == \
+                getattr(SimpleLoan, name)(loan), name
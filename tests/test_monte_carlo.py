@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from dailysim import DailySim
+
+ACCOUNTS = ['CHGF', 'FGIF']
+
+
+@pytest.mark.parametrize('every', [1, 'month_end'])
+def test_run_without_distributions_reproduces_daily_sim(cli_config, every):
+    ds = DailySim.from_config(cli_config)
+    result = ds.get_monte_carlo({'paths': 3, 'seed': 1, 'every': every,
+                                 'accounts': ACCOUNTS}).run()
+    ds.simulate()
+
+    expected = ds.sim_results.loc[result.days, ACCOUNTS].values
+    # Every percentile of identical paths is the DailySim balance.
+    for k in range(len(result.percentiles)):
+        assert np.abs(result.bands[:, :, k] - expected).max() < 0.005
+    assert result.cumulative_interest == pytest.approx(
+        [ds.get_cum_int()] * 3, abs=0.005)
+    assert result.final['FGIF'] == pytest.approx(
+        [ds.ca.r['FGIF'].get_balance()] * 3, abs=0.005)
+    assert not (result.failed_day >= 0).any()
@@ -0,0 +1,16 @@
+import multiprocessing
+
+from optimizer import evaluate
+
+
+def test_evaluate_outside_a_pool(cli_config):
+    result = evaluate(cli_config, {'fast_payoff_enabled': True}, {}, 365)
+    assert result['Status'] == 'ok'
+    assert round(result['CumulativeInterest'], 2) == 401.77
+
+
+def test_evaluate_prunes_against_best(cli_config):
+    best = multiprocessing.Value('d', 1.0)
+    result = evaluate(cli_config, {'fast_payoff_enabled': True}, {}, 30,
+                      best)
+    assert result['Status'] == 'pruned'
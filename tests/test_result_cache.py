@@ -0,0 +1,32 @@
+import numpy as np
+
+import result_cache
+from dailysim import DailySim
+from result_cache import ResultCache
+from result_cache import get_base_key
+
+
+def simulate_cached(cache, config):
+    return cache.simulate(config, DailySim.from_config(config))
+
+
+def test_resumed_run_matches_fresh_run(cli_config, tmp_path):
+    cache = ResultCache(str(tmp_path))
+    simulate_cached(cache, cli_config)
+    cli_config['purchases']['big_purchase']['amount'] = 12000
+    resumed = simulate_cached(cache, cli_config)
+    repeated = simulate_cached(cache, cli_config)
+
+    fresh = DailySim.from_config(cli_config)
+    fresh.simulate()
+    for ds in (resumed, repeated):
+        assert np.array_equal(ds.sim_results.values,
+                              fresh.sim_results.values)
+        assert ds.get_cum_int() == fresh.get_cum_int()
+        assert ds.payoff_dates == fresh.payoff_dates
+
+
+def test_source_change_starts_new_group(cli_config, monkeypatch):
+    key = get_base_key(cli_config)
+    monkeypatch.setattr(result_cache, '_source_hash', 'edited')
+    assert get_base_key(cli_config) != key
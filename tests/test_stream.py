@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dailysim import DailySim
+from util.sink import stream_results
+
+
+@pytest.mark.parametrize('every', [1, 7, 'month_end'])
+@pytest.mark.parametrize('overrides', [
+    {},
+    {'engine': 'event'},
+    {'engine': 'event', 'steady_state': True},
+])
+def test_stream_matches_sim_results(cli_config, tmp_path, every, overrides):
+    cli_config.update(overrides, record_every=every)
+    path = str(tmp_path / 'results.csv')
+    stream_results(DailySim.from_config(cli_config), path)
+    streamed = pd.read_csv(path, index_col=0, parse_dates=True)
+
+    ds = DailySim.from_config(cli_config)
+    ds.simulate()
+    expected = ds.sim_results
+    assert list(streamed.index) == list(expected.index)
+    assert np.allclose(streamed.values, expected.values, atol=0.005)
@@ -0,0 +1,37 @@
+import numpy as np
+
+from dailysim import DailySim
+from sweep import merge_config
+from sweep import run_sweep
+from util.scenario_store import FAILED
+from util.scenario_store import ScenarioStore
+
+SCENARIOS = [
+    {},
+    {'max_checking_balance': 25000},
+    {'purchases': {'big_purchase': {'amount': 30000}}},
+    {'rates': {'NOPE': 1.0}},
+]
+
+
+def test_store_round_trip(cli_config, tmp_path):
+    path = str(tmp_path / 'sweep.dat')
+    table = run_sweep(cli_config, {'scenarios': SCENARIOS}, workers=2,
+                      store=path)
+    store = ScenarioStore(path)
+    assert store.get_written().tolist() == [0, 1, 2]
+    # The unknown rates name fails alone, with its exception type.
+    assert store.status[3] == FAILED
+    assert table.Error.iloc[3] == "KeyError: 'NOPE'"
+    assert table.Error.iloc[:3].isna().all()
+
+    for index in store.get_written():
+        ds = DailySim.from_config(merge_config(cli_config,
+                                               SCENARIOS[index]))
+        ds.simulate()
+        frame = store.to_frame(index)
+        assert list(frame.columns) == list(ds.sim_results.columns)
+        assert np.array_equal(frame.values, ds.sim_results.values)
+        assert np.array_equal(store.get_account('FGIF')[index],
+                              ds.sim_results['FGIF'].values)
+        assert table.CumulativeInterest[index] == ds.get_cum_int()